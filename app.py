@@ -1,11 +1,22 @@
 """
 Streamlit application for the Gromo RAG Chatbot.
+
+One RAG system is shared by every browser session through st.cache_resource,
+so new sessions do not reload the embeddings model or the vector store. Chat
+history is rendered with native chat elements, and each answer is streamed
+into its placeholder as it is generated.
 """
 import os
 import streamlit as st
 from dotenv import load_dotenv
 
-from src.utils import initialize_rag_system, format_chat_history, get_timestamp
+from src.admission import AdmissionRejected, get_admission_controller
+from src.conversation import get_conversation_store
+from src.data_loader import prepare_faq_documents
+from src.embeddings import create_vector_store
+from src.query_log import get_query_log
+from src.rag_chain import ERROR_RESPONSE
+from src.utils import initialize_rag_system, get_timestamp
 
 # Load environment variables
 load_dotenv()
@@ -26,54 +37,36 @@ st.markdown("""
     .stTextInput>div>div>input {
         background-color: white;
     }
-    .chat-message {
-        padding: 1.5rem;
-        border-radius: 0.5rem;
-        margin-bottom: 1rem;
-        display: flex;
-        flex-direction: column;
-    }
-    .chat-message.user {
-        background-color: #e6f3ff;
-        border-left: 5px solid #2b6cb0;
-    }
-    .chat-message.bot {
-        background-color: #f0f0f0;
-        border-left: 5px solid #718096;
-    }
-    .chat-message .message-content {
-        display: flex;
-        margin-top: 0.5rem;
-    }
-    .avatar {
-        width: 40px;
-        height: 40px;
-        border-radius: 50%;
-        object-fit: cover;
-        margin-right: 1rem;
-    }
-    .message {
-        flex: 1;
-    }
-    .timestamp {
-        font-size: 0.8rem;
-        color: #718096;
-    }
 </style>
 """, unsafe_allow_html=True)
 
+def get_session_id() -> str:
+    """
+    Get an identifier for the current browser session, used for per-client rate limiting.
+    """
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx()
+        return ctx.session_id if ctx else "anonymous"
+    except Exception:
+        return "anonymous"
+
+@st.cache_resource(show_spinner="Initializing chatbot...")
+def get_rag_system():
+    """
+    Get the RAG system shared by all sessions, initializing it once per process.
+    """
+    return initialize_rag_system()
+
 # Initialize session state
 if "messages" not in st.session_state:
     st.session_state.messages = []
 
-if "rag_chain" not in st.session_state:
-    try:
-        with st.spinner("Initializing chatbot..."):
-            st.session_state.rag_chain = initialize_rag_system()
-        st.success("Chatbot initialized successfully!")
-    except Exception as e:
-        st.error(f"Error initializing chatbot: {e}")
-        st.stop()
+try:
+    rag_chain = get_rag_system()
+except Exception as e:
+    st.error(f"Error initializing chatbot: {e}")
+    st.stop()
 
 # App header
 st.title("💰 Gromo FAQ Chatbot")
@@ -104,104 +97,68 @@ with st.sidebar:
     st.header("Settings")
     if st.button("Reset Chat"):
         st.session_state.messages = []
-        st.experimental_rerun()
+        get_conversation_store().clear(get_session_id())
+        st.rerun()
     
     if st.button("Rebuild Vector Store"):
         with st.spinner("Rebuilding vector store..."):
-            st.session_state.rag_chain = initialize_rag_system(force_rebuild=True)
+            create_vector_store(prepare_faq_documents())
+            # Every session picks up the rebuilt store on its next run
+            get_rag_system.clear()
+            rag_chain = get_rag_system()
         st.success("Vector store rebuilt successfully!")
 
-# Display chat messages
+# Display chat messages; native chat elements keep reruns cheap as the history grows
 for message in st.session_state.messages:
-    role = message["role"]
-    content = message["content"]
-    timestamp = message.get("timestamp", "")
-    
-    if role == "user":
-        with st.container():
-            st.markdown(f"""
-            <div class="chat-message user">
-                <div class="message-content">
-                    <img src="https://api.dicebear.com/7.x/personas/svg?seed=user" class="avatar" alt="User Avatar">
-                    <div class="message">
-                        <div>{content}</div>
-                        <div class="timestamp">{timestamp}</div>
-                    </div>
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
-    elif role == "assistant":
-        with st.container():
-            st.markdown(f"""
-            <div class="chat-message bot">
-                <div class="message-content">
-                    <img src="https://api.dicebear.com/7.x/bottts/svg?seed=gromo" class="avatar" alt="Bot Avatar">
-                    <div class="message">
-                        <div>{content}</div>
-                        <div class="timestamp">{timestamp}</div>
-                    </div>
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
+    with st.chat_message(message["role"]):
+        st.markdown(message["content"])
+        st.caption(message.get("timestamp", ""))
 
 # Chat input
-with st.container():
-    user_input = st.text_input("Ask a question about Gromo:", key="user_input", placeholder="e.g., What investment options does Gromo offer?")
+user_input = st.chat_input("e.g., What investment options does Gromo offer?")
+
+if user_input:
+    # Add user message to chat history and render only the new turn
+    st.session_state.messages.append({
+        "role": "user",
+        "content": user_input,
+        "timestamp": get_timestamp()
+    })
+    with st.chat_message("user"):
+        st.markdown(user_input)
+        st.caption(st.session_state.messages[-1]["timestamp"])
     
-    if user_input:
-        # Add user message to chat history
-        timestamp = get_timestamp()
-        st.session_state.messages.append({
-            "role": "user",
-            "content": user_input,
-            "timestamp": timestamp
-        })
-        
-        # Display user message
-        with st.container():
-            st.markdown(f"""
-            <div class="chat-message user">
-                <div class="message-content">
-                    <img src="https://api.dicebear.com/7.x/personas/svg?seed=user" class="avatar" alt="User Avatar">
-                    <div class="message">
-                        <div>{user_input}</div>
-                        <div class="timestamp">{timestamp}</div>
-                    </div>
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
+    # Stream the response into its placeholder
+    with st.chat_message("assistant"):
+        session_id = get_session_id()
+        conversations = get_conversation_store()
+        try:
+            with get_admission_controller().admit(session_id):
+                response = st.write_stream(rag_chain.stream(
+                    user_input,
+                    history=conversations.history_for_prompt(session_id),
+                    retrieval_query=conversations.rewrite_query(session_id, user_input)
+                ))
+            # A failed turn would otherwise become context for the next question
+            if response and response != ERROR_RESPONSE:
+                conversations.add_turn(session_id, user_input, response)
+            get_query_log().record(user_input)
+        except AdmissionRejected as e:
+            response = f"I'm sorry, the chatbot is handling a lot of requests right now. {str(e)}"
+            st.markdown(response)
+        except Exception as e:
+            response = f"I'm sorry, I encountered an error while processing your request: {str(e)}"
+            st.markdown(response)
         
-        # Generate response
-        with st.spinner("Thinking..."):
-            try:
-                response = st.session_state.rag_chain.invoke(user_input)
-            except Exception as e:
-                response = f"I'm sorry, I encountered an error while processing your request: {str(e)}"
-        
-        # Add assistant message to chat history
         timestamp = get_timestamp()
-        st.session_state.messages.append({
-            "role": "assistant",
-            "content": response,
-            "timestamp": timestamp
-        })
-        
-        # Display assistant message
-        with st.container():
-            st.markdown(f"""
-            <div class="chat-message bot">
-                <div class="message-content">
-                    <img src="https://api.dicebear.com/7.x/bottts/svg?seed=gromo" class="avatar" alt="Bot Avatar">
-                    <div class="message">
-                        <div>{response}</div>
-                        <div class="timestamp">{timestamp}</div>
-                    </div>
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        # Clear input
-        st.rerun()
+        st.caption(timestamp)
+    
+    # Add assistant message to chat history
+    st.session_state.messages.append({
+        "role": "assistant",
+        "content": response,
+        "timestamp": timestamp
+    })
 
 # Footer
 st.markdown("---")
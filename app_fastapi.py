@@ -1,20 +1,54 @@
 """
 FastAPI application for the Gromo RAG Chatbot.
 """
+import hmac
+import json
 import os
-from typing import Dict, Any, Optional
-from fastapi import FastAPI, HTTPException
+import threading
+import time
+import uuid
+from typing import Dict, Any, List, Optional
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
-from src.utils import initialize_rag_system
+from src.admission import AdmissionRejected, get_admission_controller
+from src.batching import get_batching_stats
+from src.config import ADMIN_TOKEN, BATCH_MAX_QUERIES, DEFAULT_TENANT_ID, SUGGEST_MAX_RESULTS, TRUSTED_PROXIES
+from src.conversation import get_conversation_store
+from src.profiler import ProfilerUnavailable, get_profiler
+from src.prompts import get_prompt_cache_stats
+from src.rag_chain import ERROR_RESPONSE
+from src.query_log import get_query_log
+from src.resilience import get_resilience_stats
+from src.tenants import UnknownTenant, get_tenant_manager
+from src.warmup import Warmup
+from src.web_corpus import get_web_corpus
+from src.web_prefetch import get_web_prefetcher
+from src.web_search import get_speculation_budget
 
 # Load environment variables
 load_dotenv()
 
-# Initialize the RAG system
-rag_chain = initialize_rag_system()
+# Per-tenant RAG chains, loaded on first use; the default tenant is loaded now and never unloaded
+tenants = get_tenant_manager()
+rag_chain = tenants.get(DEFAULT_TENANT_ID)
+
+# Admission controller shared by all chat requests
+admission = get_admission_controller()
+
+# Per-conversation memory shared by all chat requests
+conversations = get_conversation_store()
+
+# On-demand sampling profiler (off unless PROFILING_ENABLED is set)
+profiler = get_profiler()
+
+# Served queries are logged and the most frequent are replayed at startup; /ready waits for the warm-up
+query_log = get_query_log()
+warmup = Warmup(tenants.get)
+warmup.start()
 
 # Create FastAPI app
 app = FastAPI(
@@ -36,11 +70,20 @@ app.add_middleware(
 class ChatRequest(BaseModel):
     query: str
     conversation_id: Optional[str] = None
+    tenant_id: Optional[str] = None
 
 class ChatResponse(BaseModel):
     response: str
     conversation_id: str
 
+class BatchChatRequest(BaseModel):
+    queries: List[str]
+    stream: bool = False
+    tenant_id: Optional[str] = None
+
+class BatchChatResponse(BaseModel):
+    responses: List[str]
+
 @app.get("/")
 async def root():
     """
@@ -48,26 +91,178 @@ async def root():
     """
     return {"message": "Gromo FAQ Chatbot API is running"}
 
+@app.get("/ready")
+async def ready():
+    """
+    Readiness endpoint for load balancers; fails until the startup warm-up has finished.
+
+    Returns:
+        dict or JSONResponse: The warm-up report, with status 503 while warming up
+    """
+    if not warmup.ready:
+        return JSONResponse({"status": "warming_up", "warmup": warmup.report()}, status_code=503)
+    return {"status": "ready", "warmup": warmup.report()}
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Metrics endpoint exposing runtime statistics of the serving components.
+    """
+    return {
+        "batching": get_batching_stats(),
+        "admission": admission.stats(),
+        "resilience": get_resilience_stats(),
+        "speculative_web_search": get_speculation_budget().stats(),
+        "web_corpus": get_web_corpus().stats(),
+        "web_prefetch": get_web_prefetcher().stats(),
+        "conversations": conversations.stats(),
+        "tenants": tenants.stats(),
+        "spelling": rag_chain.spelling.stats(),
+        "chunk_store": rag_chain.chunk_store.stats(),
+        "prompt_cache": get_prompt_cache_stats().stats(),
+        "query_log": query_log.stats(),
+        "warmup": warmup.report()
+    }
+
+@app.get("/suggest")
+async def suggest(http_request: Request, q: str = Query(..., description="Partially typed question"),
+                  limit: int = SUGGEST_MAX_RESULTS, tenant_id: Optional[str] = None):
+    """
+    Suggest FAQ questions matching a partially typed question.
+
+    Lookups are in-memory and take well under a millisecond, so this runs
+    directly on the event loop without admission control. Suggestions come
+    only from tenants that are already loaded; a cold tenant gets none until
+    its first chat request loads it.
+
+    Args:
+        http_request (Request): The raw HTTP request, checked for an X-Tenant-Id header
+        q (str): Text typed so far
+        limit (int, optional): Maximum suggestions
+        tenant_id (str, optional): Tenant whose FAQ to suggest from
+
+    Returns:
+        dict: Suggestions and the lookup time in milliseconds
+    """
+    tenant_id = get_tenant_id(http_request, tenant_id)
+    if not tenants.is_loaded(tenant_id):
+        if tenant_id not in tenants.tenants:
+            raise HTTPException(status_code=404, detail=f"Unknown tenant: {tenant_id}")
+        return {"suggestions": [], "elapsed_ms": 0.0}
+
+    started = time.perf_counter()
+    suggestions = get_tenant_chain(tenant_id).suggestion_index.suggest(q, max(1, min(limit, 20)))
+    return {"suggestions": suggestions, "elapsed_ms": round(1000 * (time.perf_counter() - started), 3)}
+
+def get_tenant_id(http_request: Request, tenant_id: Optional[str] = None) -> str:
+    """
+    Identify the tenant a request is for.
+
+    Args:
+        http_request (Request): The incoming HTTP request
+        tenant_id (str, optional): Tenant id from the request body or query string
+
+    Returns:
+        str: The given tenant id, else the X-Tenant-Id header, else DEFAULT_TENANT_ID
+    """
+    return tenant_id or http_request.headers.get("X-Tenant-Id") or DEFAULT_TENANT_ID
+
+def get_tenant_chain(tenant_id: str):
+    """
+    Get a tenant's RAG chain, loading it if it is cold.
+
+    Args:
+        tenant_id (str): Tenant id
+
+    Returns:
+        RAGChain: The tenant's chain
+
+    Raises:
+        HTTPException: 404 for an unknown tenant, 503 if the tenant's indexes cannot be loaded
+    """
+    try:
+        return tenants.get(tenant_id)
+    except UnknownTenant as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        print(f"Error loading tenant {tenant_id}: {e}")
+        raise HTTPException(status_code=503, detail=f"Tenant {tenant_id} is unavailable")
+
+def get_client_id(http_request: Request) -> str:
+    """
+    Identify the client for per-client rate limiting.
+
+    Args:
+        http_request (Request): The incoming HTTP request
+
+    Returns:
+        str: The X-Client-Id header if set by a trusted proxy, otherwise the client address
+    """
+    host = http_request.client.host if http_request.client else "anonymous"
+    # Any other client could rotate the header to get a fresh token bucket per request
+    client_id = http_request.headers.get("X-Client-Id")
+    if client_id and host in TRUSTED_PROXIES:
+        return client_id
+    return host
+
 @app.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+def chat(request: ChatRequest, http_request: Request):
     """
     Chat endpoint to get a response from the chatbot.
+
+    Declared synchronous so FastAPI runs it in its threadpool; concurrent
+    requests then reach the RAG chain (and the local batching scheduler)
+    in parallel instead of blocking the event loop one at a time.
     
     Args:
         request (ChatRequest): The chat request containing the query
+        http_request (Request): The raw HTTP request, used to identify the client
         
     Returns:
         ChatResponse: The chat response containing the answer
     """
+    try:
+        with admission.admit(get_client_id(http_request)), profiler.track_request():
+            started = time.perf_counter()
+            response = answer_chat_request(request, get_tenant_id(http_request, request.tenant_id))
+            warmup.record_first_request(1000 * (time.perf_counter() - started))
+            return response
+    except AdmissionRejected as e:
+        headers = {"Retry-After": str(max(1, int(e.retry_after + 0.5)))} if e.retry_after else None
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers=headers)
+
+def answer_chat_request(request: ChatRequest, tenant_id: str = DEFAULT_TENANT_ID) -> ChatResponse:
+    """
+    Generate the chat response for an admitted request.
+
+    Args:
+        request (ChatRequest): The chat request containing the query
+        tenant_id (str, optional): Tenant whose FAQ answers the query
+
+    Returns:
+        ChatResponse: The chat response containing the answer
+    """
+    tenant_chain = get_tenant_chain(tenant_id)
     try:
         # Get query from request
         query = request.query
         
-        # Generate response using RAG chain
-        response = rag_chain.invoke(query)
-        
         # Create conversation ID if not provided
-        conversation_id = request.conversation_id or "new_conversation"
+        conversation_id = request.conversation_id or uuid.uuid4().hex
+        # Conversations are scoped to their tenant, so an id cannot read another tenant's history
+        conversation_key = conversation_id if tenant_id == DEFAULT_TENANT_ID else f"{tenant_id}:{conversation_id}"
+        
+        # Resolve follow-ups against the conversation so far
+        retrieval_query = conversations.rewrite_query(conversation_key, query)
+        history = conversations.history_for_prompt(conversation_key)
+        
+        # Generate response using RAG chain; the prompt keeps the user's own wording
+        response = tenant_chain.invoke(query, history=history, retrieval_query=retrieval_query)
+        # A failed turn would otherwise become context for the next question
+        if response != ERROR_RESPONSE:
+            conversations.add_turn(conversation_key, query, response)
+        # Log what the user asked; warm-up replays logged queries without conversation context
+        query_log.record(request.query, tenant_id)
         
         # Return response
         return ChatResponse(
@@ -85,6 +280,140 @@ async def chat(request: ChatRequest):
             detail=f"Error processing chat request: {str(e)}"
         )
 
+def require_admin(http_request: Request):
+    """
+    Reject requests without the admin token.
+
+    Args:
+        http_request (Request): The incoming HTTP request
+
+    Raises:
+        HTTPException: 403 if ADMIN_TOKEN is unset or the X-Admin-Token header does not match
+    """
+    token = http_request.headers.get("X-Admin-Token", "")
+    if not ADMIN_TOKEN or not hmac.compare_digest(token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+@app.post("/admin/profile")
+def profile(http_request: Request,
+            seconds: Optional[float] = Query(None, description="Sample all threads for this many seconds"),
+            requests: Optional[int] = Query(None, description="Sample only the threads serving the next N /chat requests"),
+            format: str = Query("speedscope", pattern="^(speedscope|collapsed)$")):
+    """
+    Admin endpoint that runs a sampling profiler session and returns a flamegraph.
+
+    Blocks until the session ends. Returns 404 while PROFILING_ENABLED is off
+    and 409 if another session is running.
+
+    Args:
+        http_request (Request): The raw HTTP request, checked for the admin token
+        seconds (float, optional): Session length in duration mode (default 10 seconds)
+        requests (int, optional): Number of requests to profile in request mode
+        format (str, optional): "speedscope" (JSON for speedscope.app) or "collapsed" (flamegraph.pl input)
+
+    Returns:
+        JSONResponse or PlainTextResponse: The flamegraph
+    """
+    require_admin(http_request)
+    try:
+        if requests is not None:
+            result = profiler.profile_requests(requests)
+        else:
+            result = profiler.profile_for(seconds if seconds is not None else 10.0)
+    except ProfilerUnavailable as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+    if format == "collapsed":
+        return PlainTextResponse(result.to_collapsed())
+    return JSONResponse(result.to_speedscope(),
+                        headers={"Content-Disposition": 'attachment; filename="profile.speedscope.json"'})
+
+class _AdmittedStream:
+    """
+    Streaming body that releases its admission slot exactly once.
+
+    The slot is released when the stream ends or fails, or when the body is
+    discarded unread: a client that disconnects before the first line means
+    the generator never starts (so its finally block would never run), and
+    Starlette skips background tasks after a disconnect.
+    """
+
+    def __init__(self, lines):
+        self._lines = lines
+        self._lock = threading.Lock()
+        self._released = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        try:
+            return next(self._lines)
+        except BaseException:
+            self.release()
+            raise
+
+    def release(self):
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        self._lines.close()
+        # Batch service times would skew the single-query queue-wait estimate
+        admission.release()
+
+    def __del__(self):
+        self.release()
+
+@app.post("/chat/batch", response_model=BatchChatResponse)
+def chat_batch(request: BatchChatRequest, http_request: Request):
+    """
+    Batch chat endpoint answering many queries in one request.
+
+    Queries share one embedding call and one stacked vector search, and
+    their LLM calls run concurrently (up to BATCH_LLM_PARALLELISM). The
+    batch takes one admission slot. With "stream": true, results are sent
+    as NDJSON lines in input order as soon as each is ready.
+
+    Args:
+        request (BatchChatRequest): The queries and whether to stream
+        http_request (Request): The raw HTTP request, used to identify the client
+
+    Returns:
+        BatchChatResponse or StreamingResponse: Responses in input order
+    """
+    if not request.queries:
+        raise HTTPException(status_code=400, detail="queries must not be empty")
+    if len(request.queries) > BATCH_MAX_QUERIES:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_QUERIES} queries per batch")
+
+    try:
+        admission.acquire(get_client_id(http_request))
+    except AdmissionRejected as e:
+        headers = {"Retry-After": str(max(1, int(e.retry_after + 0.5)))} if e.retry_after else None
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers=headers)
+
+    try:
+        tenant_chain = get_tenant_chain(get_tenant_id(http_request, request.tenant_id))
+    except HTTPException:
+        admission.release()
+        raise
+
+    if request.stream:
+        lines = (
+            json.dumps({"index": position, "query": request.queries[position], "response": response}) + "\n"
+            for position, response in tenant_chain.stream_batch(request.queries)
+        )
+        return StreamingResponse(_AdmittedStream(lines), media_type="application/x-ndjson")
+
+    try:
+        started = time.monotonic()
+        responses = tenant_chain.invoke_batch(request.queries)
+        print(f"Answered batch of {len(responses)} queries in {time.monotonic() - started:.2f}s")
+        return BatchChatResponse(responses=responses)
+    finally:
+        admission.release()
+
 if __name__ == "__main__":
     import uvicorn
     # Run the FastAPI app with uvicorn
@@ -1,48 +1,126 @@
 """
 Gradio application for the Gromo RAG Chatbot.
+
+Chat handlers are async generators: the blocking RAG chain runs in worker
+threads and its tokens are streamed into the chatbot, so one slow answer does
+not hold up other sessions. Each browser session keeps its own conversation
+id in gr.State, and the Gradio queue bounds how many chats run at once.
 """
+import asyncio
 import os
+import time
+import uuid
 import gradio as gr
 from datetime import datetime
 
+from src.admission import AdmissionRejected, get_admission_controller
+from src.config import DEFAULT_TENANT_ID, GRADIO_CONCURRENCY_LIMIT, GRADIO_MAX_QUEUE_SIZE
+from src.conversation import get_conversation_store
+from src.query_log import get_query_log
+from src.rag_chain import ERROR_RESPONSE
 from src.utils import initialize_rag_system, get_timestamp
+from src.warmup import Warmup
 
 # Initialize the RAG system
 print("Initializing RAG system...")
 rag_chain = initialize_rag_system()
 print("RAG system initialized successfully!")
 
-# Define chat history
-chat_history = []
+# Admission controller shared by all chat requests
+admission = get_admission_controller()
+
+# Per-session conversation memory, keyed by the conversation id held in each session's gr.State
+conversations = get_conversation_store()
 
-def respond(message, chat_history):
+# Served queries are logged so the next startup can warm up with them
+query_log = get_query_log()
+
+async def iterate_in_thread(iterator):
     """
-    Generate a response to the user's message.
+    Consume a blocking iterator from worker threads without blocking the event loop.
+    
+    Args:
+        iterator: Blocking iterator, e.g. RAGChain.stream()
+        
+    Yields:
+        Items of the iterator
+    """
+    done = object()
+    while True:
+        item = await asyncio.to_thread(next, iterator, done)
+        if item is done:
+            break
+        yield item
+
+async def respond(message, chat_history, conversation_id, request: gr.Request):
+    """
+    Stream a response to the user's message.
     
     Args:
         message (str): User's message
-        chat_history (list): Chat history
+        chat_history (list): Chat history of this session
+        conversation_id (str): Conversation id of this session, or None for a new conversation
+        request (gr.Request): Incoming request, used to identify the client
         
-    Returns:
-        tuple: Updated chat history with new message and response
+    Yields:
+        tuple: Cleared textbox, chat history with the partial response, and the conversation id
     """
-    # Get response from RAG chain
-    bot_response = rag_chain.invoke(message)
+    if not message or not message.strip():
+        yield "", chat_history, conversation_id
+        return
     
-    # Extract content if it's a structured response
-    if hasattr(bot_response, 'content'):
-        response_text = bot_response.content
-    else:
-        response_text = str(bot_response)
+    client_id = request.client.host if request and request.client else "anonymous"
+    conversation_id = conversation_id or uuid.uuid4().hex
+    chat_history = (chat_history or []) + [
+        {"role": "user", "content": message},
+        {"role": "assistant", "content": ""}
+    ]
+    
+    # Waiting for a slot blocks, so do it off the event loop
+    try:
+        await asyncio.to_thread(admission.acquire, client_id)
+    except AdmissionRejected as e:
+        raise gr.Error(str(e))
+    
+    started = time.monotonic()
+    response_text = ""
+    try:
+        query = conversations.rewrite_query(conversation_id, message)
+        history = conversations.history_for_prompt(conversation_id)
+        yield "", chat_history, conversation_id
+        
+        async for chunk in iterate_in_thread(rag_chain.stream(message, history=history, retrieval_query=query)):
+            response_text += chunk
+            chat_history[-1]["content"] = response_text
+            yield "", chat_history, conversation_id
+    finally:
+        admission.release(time.monotonic() - started)
     
-    # Format as messages for Gradio chatbot
-    chat_history.append({"role": "user", "content": message})
-    chat_history.append({"role": "assistant", "content": response_text})
+    # A failed turn would otherwise become context for the next question
+    if response_text and response_text != ERROR_RESPONSE:
+        conversations.add_turn(conversation_id, message, response_text)
+    query_log.record(message)
+
+def suggest_questions(partial_message):
+    """
+    Suggest FAQ questions for the text typed so far.
     
-    return "", chat_history
+    Args:
+        partial_message (str): Current textbox content
+        
+    Returns:
+        gr.Dataset: Suggestions to show under the textbox
+    """
+    suggestions = rag_chain.suggestion_index.suggest(partial_message or "")
+    return gr.Dataset(samples=[[s["question"]] for s in suggestions])
+
+def use_suggestion(suggestion):
+    return suggestion[0]
 
-def clear_history():
-    return None
+def clear_history(conversation_id):
+    if conversation_id:
+        conversations.clear(conversation_id)
+    return None, None
 
 # Create Gradio interface
 with gr.Blocks(css="footer {visibility: hidden}") as demo:
@@ -51,6 +129,7 @@ with gr.Blocks(css="footer {visibility: hidden}") as demo:
     with gr.Row():
         with gr.Column(scale=4):
             chatbot = gr.Chatbot(type="messages", height=600)
+            conversation_id = gr.State(None)
             
             with gr.Row():
                 message = gr.Textbox(
@@ -60,6 +139,8 @@ with gr.Blocks(css="footer {visibility: hidden}") as demo:
                 )
                 submit_btn = gr.Button("Submit", scale=1)
             
+            suggestions = gr.Dataset(components=[message], samples=[], label="Suggested questions", type="values")
+            
             clear_btn = gr.Button("Clear Conversation")
             
         with gr.Column(scale=1):
@@ -83,24 +164,52 @@ with gr.Blocks(css="footer {visibility: hidden}") as demo:
                 For the most accurate information, please refer to Gromo's official website or contact customer support.
                 """)
 
-    # Set up event handlers
+    # Set up event handlers; both chat triggers share one concurrency pool
     submit_btn.click(
         respond,
-        inputs=[message, chatbot],
-        outputs=[message, chatbot]
+        inputs=[message, chatbot, conversation_id],
+        outputs=[message, chatbot, conversation_id],
+        concurrency_id="chat",
+        api_name=False
     )
     
     message.submit(
         respond,
-        inputs=[message, chatbot],
-        outputs=[message, chatbot]
+        inputs=[message, chatbot, conversation_id],
+        outputs=[message, chatbot, conversation_id],
+        concurrency_id="chat",
+        api_name="chat"
+    )
+    
+    # Suggestions are in-memory lookups; skip the queue so they keep up with typing
+    message.change(
+        suggest_questions,
+        inputs=[message],
+        outputs=[suggestions],
+        queue=False,
+        show_progress="hidden",
+        trigger_mode="always_last"
+    )
+    
+    suggestions.click(
+        use_suggestion,
+        inputs=[suggestions],
+        outputs=[message],
+        queue=False
     )
     
     clear_btn.click(
         clear_history,
-        outputs=[chatbot]
+        inputs=[conversation_id],
+        outputs=[chatbot, conversation_id],
+        queue=False
     )
 
+# Bound concurrent chats and the number of events waiting for a slot
+demo.queue(default_concurrency_limit=GRADIO_CONCURRENCY_LIMIT, max_size=GRADIO_MAX_QUEUE_SIZE)
+
 # Launch the app
 if __name__ == "__main__":
+    # Replay the most frequent logged queries before accepting users
+    Warmup(lambda tenant_id: rag_chain, tenant_ids=[DEFAULT_TENANT_ID]).run()
     demo.launch(share=True) 
\ No newline at end of file
@@ -0,0 +1,87 @@
+"""
+Benchmark throughput and latency of the embedding backends on CPU.
+
+Measures single-query latency (the per-request path) and bulk throughput
+(the ingestion path) on the FAQ texts for the PyTorch model and the ONNX
+Runtime backends, sweeping ONNX intra-op thread counts.
+
+Usage:
+    python benchmark_embeddings.py
+    python benchmark_embeddings.py --backends torch onnx-int8 --threads 1 2 4 --queries 200
+"""
+import argparse
+import time
+
+from src.config import ONNX_EMBEDDING_DIR
+from src.data_loader import load_faq_data
+from src.embeddings import get_embeddings_model
+from src.onnx_embeddings import OnnxEmbeddings, load_onnx_embeddings
+
+
+def benchmark(name: str, embeddings, queries: list, documents: list, repeats: int = 3) -> dict:
+    """
+    Time query and bulk embedding for one backend configuration.
+
+    Args:
+        name (str): Label of the configuration
+        embeddings: Embeddings model
+        queries (list): Short texts embedded one at a time
+        documents (list): Texts embedded in bulk
+        repeats (int, optional): Bulk runs; the fastest is reported. Defaults to 3.
+
+    Returns:
+        dict: Latency percentiles and throughput
+    """
+    # Warm up lazy initialization and caches
+    embeddings.embed_documents(documents[:8])
+
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        embeddings.embed_query(query)
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+
+    bulk_seconds = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        embeddings.embed_documents(documents)
+        bulk_seconds = min(bulk_seconds, time.perf_counter() - started)
+
+    return {
+        "backend": name,
+        "query_p50_ms": round(1000 * latencies[len(latencies) // 2], 2),
+        "query_p95_ms": round(1000 * latencies[int(0.95 * (len(latencies) - 1))], 2),
+        "bulk_texts_per_s": round(len(documents) / bulk_seconds, 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark embedding backends")
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "onnx-int8"], help="Embedding backends")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4], help="ONNX intra-op thread counts to sweep")
+    parser.add_argument("--queries", type=int, default=100, help="Single-query calls timed per configuration")
+    args = parser.parse_args()
+
+    df = load_faq_data()
+    queries = (df["question"].tolist() * (args.queries // len(df) + 1))[:args.queries]
+    documents = df["question"].tolist() + df["answer"].tolist()
+    results = []
+
+    for backend in args.backends:
+        if backend == "torch":
+            print("Benchmarking torch...")
+            results.append(benchmark("torch", get_embeddings_model("torch"), queries, documents))
+            continue
+
+        quantized = backend == "onnx-int8"
+        load_onnx_embeddings(quantized=quantized)  # Exports the model if needed
+        for threads in args.threads:
+            print(f"Benchmarking {backend} with {threads} threads...")
+            embeddings = OnnxEmbeddings(ONNX_EMBEDDING_DIR, quantized=quantized, intra_op_threads=threads)
+            results.append(benchmark(f"{backend}(threads={threads})", embeddings, queries, documents))
+
+    columns = list(results[0].keys()) if results else []
+    print("\n" + " | ".join(columns))
+    for row in results:
+        print(" | ".join(str(row[c]) for c in columns))
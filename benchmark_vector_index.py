@@ -0,0 +1,179 @@
+"""
+Benchmark build time, query latency, recall and memory of the array vector indexes.
+
+Uses synthetic clustered, normalized vectors shaped like the embedding model
+output, written to a memory-mapped file so multi-million-vector runs do not
+need the whole corpus in RAM. Ground truth is an exact streaming scan.
+
+Usage:
+    python benchmark_vector_index.py --sizes 100000 1000000 5000000 --backends ivf int8 binary
+    python benchmark_vector_index.py --sizes 1000000 --backends ivf --nprobe 4 16 64
+    python benchmark_vector_index.py --sizes 1000000 --backends exact sharded
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from src.embeddings import create_index
+from src.vector_index import load_index, top_k
+
+# Vectors generated and added per batch
+BATCH_SIZE = 100000
+
+
+def generate_corpus(path: str, size: int, dim: int, clusters: int = 1000, seed: int = 0) -> np.ndarray:
+    """
+    Write a synthetic clustered corpus of normalized vectors to a memory-mapped file.
+
+    Args:
+        path (str): Output .npy path
+        size (int): Number of vectors
+        dim (int): Vector dimension
+        clusters (int, optional): Number of topic clusters. Defaults to 1000.
+        seed (int, optional): Random seed. Defaults to 0.
+
+    Returns:
+        np.ndarray: Read-only memory map of the corpus
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    corpus = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(size, dim))
+
+    for start in range(0, size, BATCH_SIZE):
+        n = min(BATCH_SIZE, size - start)
+        batch = centers[rng.integers(0, clusters, n)] + rng.normal(scale=0.8, size=(n, dim)).astype(np.float32)
+        corpus[start:start + n] = batch / np.linalg.norm(batch, axis=1, keepdims=True)
+
+    corpus.flush()
+    del corpus
+    return np.load(path, mmap_mode="r")
+
+
+def exact_neighbors(corpus: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """
+    Compute exact top-k ids by streaming over the corpus.
+
+    Args:
+        corpus (np.ndarray): Corpus vectors
+        queries (np.ndarray): Query vectors
+        k (int): Number of neighbours
+
+    Returns:
+        np.ndarray: Ids of shape (queries, k)
+    """
+    best_scores = np.full((queries.shape[0], k), -np.inf, dtype=np.float32)
+    best_ids = np.zeros((queries.shape[0], k), dtype=np.int64)
+
+    for start in range(0, corpus.shape[0], BATCH_SIZE):
+        block = np.asarray(corpus[start:start + BATCH_SIZE])
+        scores = np.hstack([best_scores, queries @ block.T])
+        ids = np.hstack([best_ids, np.broadcast_to(np.arange(start, start + block.shape[0]), (queries.shape[0], block.shape[0]))])
+        best_scores, order = top_k(scores, k)
+        best_ids = np.take_along_axis(ids, order, axis=1)
+
+    return best_ids
+
+
+def benchmark(backend: str, corpus: np.ndarray, queries: np.ndarray, truth: np.ndarray, k: int, nprobes: list) -> list:
+    """
+    Build, persist, reload and query one index backend.
+
+    Args:
+        backend (str): Index backend name
+        corpus (np.ndarray): Corpus vectors
+        queries (np.ndarray): Query vectors
+        truth (np.ndarray): Exact top-k ids for the queries
+        k (int): Number of neighbours
+        nprobes (list): nprobe values to sweep (IVF only)
+
+    Returns:
+        list: One result row per configuration
+    """
+    index = create_index(backend)
+    started = time.perf_counter()
+    if hasattr(index, "train"):
+        sample = np.random.default_rng(1).choice(corpus.shape[0], size=min(corpus.shape[0], index.train_sample), replace=False)
+        index.train(np.asarray(corpus[np.sort(sample)]))
+    for start in range(0, corpus.shape[0], BATCH_SIZE):
+        index.add(np.asarray(corpus[start:start + BATCH_SIZE]))
+    build_seconds = time.perf_counter() - started
+
+    directory = tempfile.mkdtemp(prefix=f"bench_{backend}_")
+    try:
+        index.save(directory)
+        started = time.perf_counter()
+        index = load_index(directory)
+        load_seconds = time.perf_counter() - started
+
+        rows = []
+        for nprobe in (nprobes if backend == "ivf" else [None]):
+            if nprobe is not None:
+                index.nprobe = nprobe
+
+            latencies = []
+            found = []
+            for query in queries:
+                started = time.perf_counter()
+                _, ids = index.search(query[None, :], k)
+                latencies.append(time.perf_counter() - started)
+                found.append(ids[0])
+
+            hits = sum(len(set(f.tolist()) & set(t.tolist())) for f, t in zip(found, truth))
+            latencies.sort()
+            rows.append({
+                "backend": backend if nprobe is None else f"{backend}(nprobe={nprobe})",
+                "size": corpus.shape[0],
+                "build_s": round(build_seconds, 2),
+                "load_s": round(load_seconds, 3),
+                "p50_ms": round(1000 * latencies[len(latencies) // 2], 2),
+                "p95_ms": round(1000 * latencies[int(0.95 * (len(latencies) - 1))], 2),
+                f"recall@{k}": round(hits / truth.size, 4),
+                "resident_mb": round(index.memory_bytes() / 2 ** 20, 1),
+            })
+        return rows
+    finally:
+        if hasattr(index, "close"):
+            index.close()
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark array vector index backends")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100000], help="Corpus sizes")
+    parser.add_argument("--backends", nargs="+", default=["ivf", "int8", "binary"], help="Index backends")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 16, 64], help="IVF nprobe values to sweep")
+    parser.add_argument("--dim", type=int, default=384, help="Vector dimension")
+    parser.add_argument("--queries", type=int, default=100, help="Number of queries")
+    parser.add_argument("--k", type=int, default=10, help="Neighbours per query")
+    parser.add_argument("--workdir", default=None, help="Directory for the memory-mapped corpus")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="bench_corpus_")
+    os.makedirs(workdir, exist_ok=True)
+    results = []
+
+    for size in args.sizes:
+        print(f"\nGenerating {size} vectors...")
+        corpus = generate_corpus(os.path.join(workdir, f"corpus_{size}.npy"), size, args.dim)
+
+        rng = np.random.default_rng(2)
+        queries = np.asarray(corpus[rng.choice(size, size=args.queries, replace=False)])
+        queries = queries + rng.normal(scale=0.05, size=queries.shape).astype(np.float32)
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+        truth = exact_neighbors(corpus, queries, args.k)
+
+        for backend in args.backends:
+            print(f"Benchmarking {backend} at {size} vectors...")
+            results.extend(benchmark(backend, corpus, queries, truth, args.k, args.nprobe))
+
+        del corpus
+        os.remove(os.path.join(workdir, f"corpus_{size}.npy"))
+
+    columns = list(results[0].keys()) if results else []
+    print("\n" + " | ".join(columns))
+    for row in results:
+        print(" | ".join(str(row[c]) for c in columns))
@@ -41,8 +41,10 @@ pip3 install bitsandbytes
 # Set up environment variables
 echo "OPENAI_API_KEY=your_openai_api_key" > .env
 
-# Initialize the vector store
-python3 init_vector_store.py
+# Install the prebuilt index artifact (built once with: python index_artifact.py build)
+# instead of re-embedding the FAQ on boot; the app re-verifies it at startup
+echo "INDEX_ARTIFACT_PATH=s3://your-bucket/gromo-index.tar.gz" >> .env
+python3 index_artifact.py install s3://your-bucket/gromo-index.tar.gz || python3 init_vector_store.py
 
 # Install and configure Nginx
 sudo yum install -y nginx
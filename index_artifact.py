@@ -0,0 +1,111 @@
+"""
+Build, verify, install and benchmark prebuilt index artifacts.
+
+Build the artifact once (on a build machine or in CI), upload it together
+with its published manifest (<artifact>.manifest.json), and let new instances
+install it instead of re-embedding the FAQ on boot.
+
+Usage:
+    python index_artifact.py build --output artifacts/gromo-index.tar.gz
+    python index_artifact.py verify artifacts/gromo-index.tar.gz
+    python index_artifact.py install s3://your-bucket/gromo-index.tar.gz
+    python index_artifact.py benchmark artifacts/gromo-index.tar.gz
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+
+from src.config import VECTOR_STORE_DIR
+from src.embeddings import get_stored_documents
+from src.index_artifact import ArtifactError, build_artifact, install_artifact, verify_artifact
+from src.utils import initialize_rag_system
+
+
+def build(output: str, rebuild: bool):
+    """
+    Build the indexes (unless they already exist) and package them.
+
+    Args:
+        output (str): Target .tar.gz file
+        rebuild (bool): Whether to delete the existing vector store and re-embed from scratch
+    """
+    if rebuild and os.path.exists(VECTOR_STORE_DIR):
+        print(f"Removing existing vector store {VECTOR_STORE_DIR} for a clean rebuild...")
+        shutil.rmtree(VECTOR_STORE_DIR)
+
+    # Builds the vector store, entity index and intent router if they are missing
+    rag_chain = initialize_rag_system()
+    manifest = build_artifact(output, get_stored_documents(rag_chain.vector_store))
+    print(json.dumps({key: value for key, value in manifest.items() if key != "files"}, indent=2))
+
+
+def verify(source: str):
+    """
+    Verify an artifact without installing it.
+
+    Args:
+        source (str): Local .tar.gz path or s3:// URL
+    """
+    manifest = verify_artifact(source)
+    print(f"Artifact OK: {len(manifest['files'])} files, {manifest['chunks']} chunks, "
+          f"model {manifest['embedding_model']}, backend {manifest['vector_index_backend']}")
+
+
+def benchmark(source: str):
+    """
+    Time a fresh install of the artifact and the RAG system startup that follows.
+
+    Args:
+        source (str): Local .tar.gz path or s3:// URL
+    """
+    if os.path.exists(VECTOR_STORE_DIR):
+        shutil.rmtree(VECTOR_STORE_DIR)
+
+    started = time.perf_counter()
+    install_artifact(source)
+    install_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    initialize_rag_system()
+    startup_seconds = time.perf_counter() - started
+
+    print(json.dumps({
+        "install_seconds": round(install_seconds, 2),
+        "startup_seconds": round(startup_seconds, 2),
+        "time_to_ready_seconds": round(install_seconds + startup_seconds, 2),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage prebuilt index artifacts")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Build the indexes and package them")
+    build_parser.add_argument("--output", default="artifacts/gromo-index.tar.gz", help="Target .tar.gz file")
+    build_parser.add_argument("--rebuild", action="store_true", help="Delete the existing vector store and re-embed")
+
+    verify_parser = subparsers.add_parser("verify", help="Check an artifact's checksums and configuration")
+    verify_parser.add_argument("source", help="Local .tar.gz file or s3:// URL")
+
+    install_parser = subparsers.add_parser("install", help="Verify an artifact and install it as the vector store")
+    install_parser.add_argument("source", help="Local .tar.gz file or s3:// URL")
+
+    benchmark_parser = subparsers.add_parser("benchmark", help="Time a fresh install and startup (replaces the vector store)")
+    benchmark_parser.add_argument("source", help="Local .tar.gz file or s3:// URL")
+
+    args = parser.parse_args()
+    try:
+        if args.command == "build":
+            build(args.output, args.rebuild)
+        elif args.command == "verify":
+            verify(args.source)
+        elif args.command == "install":
+            install_artifact(args.source)
+        else:
+            benchmark(args.source)
+    except ArtifactError as e:
+        print(f"Artifact error: {e}")
+        sys.exit(1)
@@ -0,0 +1,161 @@
+"""
+Load generator for the Gromo RAG Chatbot FastAPI /chat endpoint.
+
+Sends requests at a fixed target rate (open loop) and reports throughput and
+latency percentiles. Latency is measured from each request's scheduled send
+time, so queueing inside the load generator is not hidden.
+
+Usage:
+    python load_test.py --url http://localhost:8000/chat --rps 5 --duration 60
+    python load_test.py --url http://localhost:8000/chat/batch --batch-size 16 --rps 0.5 --duration 60
+"""
+import argparse
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+# Queries cycled through by the load generator
+LOAD_TEST_QUERIES = [
+    "What is GroMo?",
+    "How can I earn through Gromo?",
+    "When will I receive my payout?",
+    "What are GroMo Points?",
+    "How is the payout calculated?",
+    "What is Zest Money?",
+    "What is the payout for Personal and Business Loans?",
+    "How do I track my sales on Gromo?",
+    "Is Fi a bank?",
+    "What financial products can I sell through Gromo?",
+]
+
+
+def percentile(values: list, pct: float) -> float:
+    """
+    Compute a nearest-rank percentile.
+
+    Args:
+        values (list): Sorted list of values
+        pct (float): Percentile between 0 and 100
+
+    Returns:
+        float: The percentile value, or 0.0 for an empty list
+    """
+    if not values:
+        return 0.0
+    rank = max(0, min(len(values) - 1, int(round(pct / 100.0 * len(values) + 0.5)) - 1))
+    return values[rank]
+
+
+def send_request(url: str, query, timeout: float, client_id: str = "load-test") -> int:
+    """
+    Send a single chat request.
+
+    Args:
+        url (str): Chat endpoint URL
+        query (str or list): Query to send, or a list of queries for the batch endpoint
+        timeout (float): Request timeout in seconds
+        client_id (str, optional): Value of the X-Client-Id header used for per-client rate limiting
+
+    Returns:
+        int: HTTP status code, or 0 for connection errors and timeouts
+    """
+    payload = {"queries": query} if isinstance(query, list) else {"query": query}
+    data = json.dumps(payload).encode("utf-8")
+    request = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json", "X-Client-Id": client_id})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except Exception:
+        return 0
+
+
+def run_load_test(url: str, rps: float, duration: float, max_in_flight: int = 64, timeout: float = 120.0,
+                  clients: int = 100, batch_size: int = 1) -> dict:
+    """
+    Drive the chat endpoint at a target request rate.
+
+    Args:
+        url (str): Chat endpoint URL
+        rps (float): Target requests per second
+        duration (float): Test duration in seconds
+        max_in_flight (int, optional): Maximum concurrent requests. Defaults to 64.
+        timeout (float, optional): Per-request timeout in seconds. Defaults to 120.0.
+        clients (int, optional): Number of simulated clients requests are spread across. Defaults to 100.
+        batch_size (int, optional): Queries per request; above 1, requests use the /chat/batch format. Defaults to 1.
+
+    Returns:
+        dict: Summary with throughput, status counts and latency percentiles
+    """
+    latencies = []
+    statuses = Counter()
+    lock = threading.Lock()
+
+    def worker(scheduled_at: float, query, client_id: str):
+        status = send_request(url, query, timeout, client_id)
+        latency = time.perf_counter() - scheduled_at
+        with lock:
+            statuses[status] += 1
+            if status == 200:
+                latencies.append(latency)
+
+    total_requests = int(rps * duration)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        for i in range(total_requests):
+            scheduled_at = start + i / rps
+            delay = scheduled_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            if batch_size > 1:
+                query = [LOAD_TEST_QUERIES[(i * batch_size + j) % len(LOAD_TEST_QUERIES)] for j in range(batch_size)]
+            else:
+                query = LOAD_TEST_QUERIES[i % len(LOAD_TEST_QUERIES)]
+            executor.submit(worker, scheduled_at, query, f"load-test-{i % clients}")
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    succeeded = statuses.get(200, 0)
+    return {
+        "target_rps": rps,
+        "sent": total_requests,
+        "succeeded": succeeded,
+        "statuses": {str(k): v for k, v in sorted(statuses.items())},
+        "elapsed_seconds": round(elapsed, 2),
+        "throughput_rps": round(succeeded / elapsed, 2) if elapsed > 0 else 0.0,
+        "queries_per_second": round(succeeded * batch_size / elapsed, 2) if elapsed > 0 else 0.0,
+        "latency_seconds": {
+            "p50": round(percentile(latencies, 50), 3),
+            "p90": round(percentile(latencies, 90), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "p99": round(percentile(latencies, 99), 3),
+            "max": round(latencies[-1], 3) if latencies else 0.0,
+        },
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the Gromo RAG Chatbot /chat endpoint")
+    parser.add_argument("--url", default="http://localhost:8000/chat", help="Chat endpoint URL")
+    parser.add_argument("--rps", type=float, default=2.0, help="Target requests per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="Test duration in seconds")
+    parser.add_argument("--max-in-flight", type=int, default=64, help="Maximum concurrent requests")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds")
+    parser.add_argument("--clients", type=int, default=100, help="Number of simulated clients (X-Client-Id values; honoured only from TRUSTED_PROXIES)")
+    parser.add_argument("--batch-size", type=int, default=1, help="Queries per request (use with the /chat/batch URL)")
+    parser.add_argument("--output", default=None, help="Optional path to write the JSON summary")
+    args = parser.parse_args()
+
+    print(f"Sending {args.rps} requests/second to {args.url} for {args.duration} seconds...")
+    summary = run_load_test(args.url, args.rps, args.duration, args.max_in_flight, args.timeout, args.clients, args.batch_size)
+    print(json.dumps(summary, indent=2))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
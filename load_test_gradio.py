@@ -0,0 +1,134 @@
+"""
+Multi-client load generator for the Gradio chat app.
+
+Each simulated user opens its own Gradio session and holds a short
+conversation, sending its next message as soon as the previous answer has
+finished streaming (closed loop). Reports time to first token, full response
+latency and throughput, so concurrency limits and streaming can be checked
+against the mock LLM server without spending tokens.
+
+Usage:
+    python mock_servers.py --port 8100 --mistral-latency lognormal:0.8,0.5
+    MISTRAL_API_ENDPOINT=http://localhost:8100/v1 SERPAPI_BACKEND=http://localhost:8100 python app_gradio.py
+    python load_test_gradio.py --url http://localhost:7860 --users 20 --turns 3
+"""
+import argparse
+import json
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from gradio_client import Client
+
+from load_test import LOAD_TEST_QUERIES, percentile
+
+
+def run_session(url: str, user: int, turns: int) -> list:
+    """
+    Hold one conversation in a fresh Gradio session.
+
+    Args:
+        url (str): Gradio app URL
+        user (int): Index of the simulated user, used to pick its questions
+        turns (int): Messages sent in the conversation
+
+    Returns:
+        list: One (status, time to first token, total latency, streamed updates) tuple per message
+    """
+    results = []
+    try:
+        client = Client(url, verbose=False)
+    except Exception as e:
+        print(f"User {user} could not connect: {e}")
+        return [("connect_error", None, None, 0)] * turns
+
+    chat_history = []
+    for turn in range(turns):
+        query = LOAD_TEST_QUERIES[(user + turn) % len(LOAD_TEST_QUERIES)]
+        started = time.perf_counter()
+        first_token = None
+        updates = 0
+        try:
+            job = client.submit(query, chat_history, api_name="/chat")
+            for _, history in job:
+                updates += 1
+                if first_token is None and history and history[-1].get("content"):
+                    first_token = time.perf_counter() - started
+            outputs = job.outputs()
+            if outputs:
+                chat_history = outputs[-1][1]
+            results.append(("ok", first_token, time.perf_counter() - started, updates))
+        except Exception as e:
+            print(f"User {user} turn {turn} failed: {e}")
+            results.append(("error", None, None, updates))
+    return results
+
+
+def run_load_test(url: str, users: int, turns: int) -> dict:
+    """
+    Run concurrent conversations against the Gradio app.
+
+    Args:
+        url (str): Gradio app URL
+        users (int): Number of concurrent sessions
+        turns (int): Messages per session
+
+    Returns:
+        dict: Summary with throughput, status counts and latency percentiles
+    """
+    results = []
+    lock = threading.Lock()
+
+    def worker(user: int):
+        session_results = run_session(url, user, turns)
+        with lock:
+            results.extend(session_results)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as executor:
+        for user in range(users):
+            executor.submit(worker, user)
+    elapsed = time.perf_counter() - start
+
+    statuses = Counter(status for status, _, _, _ in results)
+    first_tokens = sorted(ttft for status, ttft, _, _ in results if status == "ok" and ttft is not None)
+    latencies = sorted(latency for status, _, latency, _ in results if status == "ok")
+    updates = [count for status, _, _, count in results if status == "ok"]
+
+    def summarize(values: list) -> dict:
+        return {
+            "p50": round(percentile(values, 50), 3),
+            "p90": round(percentile(values, 90), 3),
+            "p99": round(percentile(values, 99), 3),
+            "max": round(values[-1], 3) if values else 0.0,
+        }
+
+    return {
+        "users": users,
+        "turns_per_user": turns,
+        "sent": len(results),
+        "statuses": dict(sorted(statuses.items())),
+        "elapsed_seconds": round(elapsed, 2),
+        "throughput_rps": round(statuses.get("ok", 0) / elapsed, 2) if elapsed > 0 else 0.0,
+        "avg_streamed_updates": round(sum(updates) / len(updates), 1) if updates else 0.0,
+        "time_to_first_token_seconds": summarize(first_tokens),
+        "latency_seconds": summarize(latencies),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the Gromo RAG Chatbot Gradio app with concurrent sessions")
+    parser.add_argument("--url", default="http://localhost:7860", help="Gradio app URL")
+    parser.add_argument("--users", type=int, default=10, help="Number of concurrent sessions")
+    parser.add_argument("--turns", type=int, default=3, help="Messages sent per session")
+    parser.add_argument("--output", default=None, help="Optional path to write the JSON summary")
+    args = parser.parse_args()
+
+    print(f"Running {args.users} concurrent sessions of {args.turns} messages against {args.url}...")
+    summary = run_load_test(args.url, args.users, args.turns)
+    print(json.dumps(summary, indent=2))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
@@ -0,0 +1,278 @@
+"""
+Local mock Mistral AI and SERP API servers for reproducible load testing.
+
+The server speaks the Mistral chat-completions API (including streaming) and
+the SERP API JSON shape consumed by WebSearchTool, so the RAG chain can be
+load-tested without spending tokens or search credits.
+
+Usage:
+    python mock_servers.py --port 8100 --mistral-latency lognormal:0.8,0.5 --mistral-error-rate 0.01
+
+Then point the chatbot at it in your .env file:
+    MISTRAL_API_ENDPOINT=http://localhost:8100/v1
+    SERPAPI_BACKEND=http://localhost:8100
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+class LatencyDistribution:
+    """
+    Latency distribution parsed from a spec such as "lognormal:0.8,0.5".
+
+    Supported specs:
+        fixed:SECONDS
+        uniform:LOW,HIGH
+        normal:MEAN,STDDEV
+        lognormal:MEDIAN,SIGMA
+    """
+
+    def __init__(self, spec: str):
+        """
+        Initialize the latency distribution.
+
+        Args:
+            spec (str): Distribution spec
+        """
+        kind, _, args = spec.partition(":")
+        self.kind = kind.strip().lower()
+        self.args = [float(a) for a in args.split(",") if a.strip()]
+        self.spec = spec
+
+        expected_args = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2}
+        if self.kind not in expected_args or len(self.args) != expected_args[self.kind]:
+            raise ValueError(f"Invalid latency spec: {spec}")
+
+    def sample(self) -> float:
+        """
+        Draw a latency sample.
+
+        Returns:
+            float: Latency in seconds (never negative)
+        """
+        if self.kind == "fixed":
+            value = self.args[0]
+        elif self.kind == "uniform":
+            value = random.uniform(self.args[0], self.args[1])
+        elif self.kind == "normal":
+            value = random.gauss(self.args[0], self.args[1])
+        else:
+            value = random.lognormvariate(0.0, self.args[1]) * self.args[0]
+
+        return max(0.0, value)
+
+
+class MockSettings:
+    """
+    Runtime behaviour of the mock servers.
+    """
+
+    def __init__(
+        self,
+        mistral_latency: str = "lognormal:0.8,0.5",
+        serpapi_latency: str = "lognormal:0.6,0.4",
+        mistral_error_rate: float = 0.0,
+        serpapi_error_rate: float = 0.0,
+        tokens_per_second: float = 50.0,
+        completion_tokens: int = 150,
+    ):
+        """
+        Initialize the mock settings.
+
+        Args:
+            mistral_latency (str): Time-to-first-token distribution spec
+            serpapi_latency (str): Search latency distribution spec
+            mistral_error_rate (float): Fraction of chat requests that fail
+            serpapi_error_rate (float): Fraction of search requests that fail
+            tokens_per_second (float): Generation speed after the first token
+            completion_tokens (int): Number of tokens in each completion
+        """
+        self.mistral_latency = LatencyDistribution(mistral_latency)
+        self.serpapi_latency = LatencyDistribution(serpapi_latency)
+        self.mistral_error_rate = mistral_error_rate
+        self.serpapi_error_rate = serpapi_error_rate
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens
+
+
+def _completion_tokens(prompt: str, count: int) -> list:
+    """
+    Build a deterministic-looking completion as a list of word tokens.
+
+    Args:
+        prompt (str): The last user message
+        count (int): Number of tokens to produce
+
+    Returns:
+        list: Tokens, each including its leading space
+    """
+    seed_words = prompt.split()[-20:] or ["Gromo"]
+    filler = "This is a mock GromoBot answer generated for load testing".split()
+    words = [(filler + seed_words)[i % (len(filler) + len(seed_words))] for i in range(count)]
+    return [word if i == 0 else f" {word}" for i, word in enumerate(words)]
+
+
+def create_app(settings: MockSettings) -> FastAPI:
+    """
+    Create the mock server application.
+
+    Args:
+        settings (MockSettings): Latency, error and token rate settings
+
+    Returns:
+        FastAPI: The mock application
+    """
+    app = FastAPI(title="Gromo mock Mistral AI and SERP API servers")
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        """
+        Mock of the Mistral AI chat-completions endpoint.
+        """
+        body = await request.json()
+        model = body.get("model", "mistral-mock")
+        messages = body.get("messages", [])
+        prompt = messages[-1].get("content", "") if messages else ""
+        if isinstance(prompt, list):
+            prompt = " ".join(part.get("text", "") for part in prompt if isinstance(part, dict))
+
+        await asyncio.sleep(settings.mistral_latency.sample())
+
+        if random.random() < settings.mistral_error_rate:
+            return JSONResponse(
+                status_code=random.choice([429, 500, 503]),
+                content={"object": "error", "message": "Mock Mistral AI error", "type": "mock_error"}
+            )
+
+        max_tokens = body.get("max_tokens") or settings.completion_tokens
+        tokens = _completion_tokens(prompt, min(settings.completion_tokens, max_tokens))
+        usage = {
+            "prompt_tokens": len(" ".join(m.get("content", "") for m in messages if isinstance(m.get("content"), str)).split()),
+            "completion_tokens": len(tokens),
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        completion_id = f"cmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        token_delay = 1.0 / settings.tokens_per_second if settings.tokens_per_second > 0 else 0.0
+
+        if body.get("stream"):
+            async def event_stream():
+                for i, token in enumerate(tokens):
+                    delta = {"content": token}
+                    if i == 0:
+                        delta["role"] = "assistant"
+                    chunk = {
+                        "id": completion_id,
+                        "object": "chat.completion.chunk",
+                        "created": created,
+                        "model": model,
+                        "choices": [{"index": 0, "delta": delta, "finish_reason": None}],
+                    }
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                    await asyncio.sleep(token_delay)
+
+                final_chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {"content": ""}, "finish_reason": "stop"}],
+                    "usage": usage,
+                }
+                yield f"data: {json.dumps(final_chunk)}\n\n"
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+        await asyncio.sleep(token_delay * len(tokens))
+
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "".join(tokens)},
+                "finish_reason": "stop",
+            }],
+            "usage": usage,
+        }
+
+    @app.get("/search")
+    @app.get("/search.json")
+    async def search(request: Request):
+        """
+        Mock of the SERP API Google search endpoint.
+        """
+        params = dict(request.query_params)
+        query = params.get("q", "")
+        num = int(params.get("num", 3))
+
+        await asyncio.sleep(settings.serpapi_latency.sample())
+
+        if random.random() < settings.serpapi_error_rate:
+            return JSONResponse(status_code=500, content={"error": "Mock SERP API error"})
+
+        organic_results = []
+        for position in range(1, num + 1):
+            organic_results.append({
+                "position": position,
+                "title": f"{query} - mock result {position}",
+                "link": f"https://example.com/mock/{position}?q={query.replace(' ', '+')}",
+                "snippet": f"Mock snippet {position} about {query} for local load testing.",
+            })
+
+        return {
+            "search_metadata": {"id": uuid.uuid4().hex, "status": "Success"},
+            "search_parameters": {"engine": params.get("engine", "google"), "q": query},
+            "organic_results": organic_results,
+        }
+
+    @app.get("/health")
+    async def health():
+        """
+        Health check endpoint.
+        """
+        return {"status": "ok"}
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run local mock Mistral AI and SERP API servers")
+    parser.add_argument("--host", default="127.0.0.1", help="Host to bind")
+    parser.add_argument("--port", type=int, default=8100, help="Port to bind")
+    parser.add_argument("--mistral-latency", default="lognormal:0.8,0.5", help="Mistral time-to-first-token distribution")
+    parser.add_argument("--serpapi-latency", default="lognormal:0.6,0.4", help="SERP API latency distribution")
+    parser.add_argument("--mistral-error-rate", type=float, default=0.0, help="Fraction of chat requests that fail")
+    parser.add_argument("--serpapi-error-rate", type=float, default=0.0, help="Fraction of search requests that fail")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0, help="Mock generation speed")
+    parser.add_argument("--completion-tokens", type=int, default=150, help="Tokens per mock completion")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducible runs")
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    mock_settings = MockSettings(
+        mistral_latency=args.mistral_latency,
+        serpapi_latency=args.serpapi_latency,
+        mistral_error_rate=args.mistral_error_rate,
+        serpapi_error_rate=args.serpapi_error_rate,
+        tokens_per_second=args.tokens_per_second,
+        completion_tokens=args.completion_tokens,
+    )
+
+    print(f"Mock Mistral AI endpoint: http://{args.host}:{args.port}/v1")
+    print(f"Mock SERP API backend: http://{args.host}:{args.port}")
+    uvicorn.run(create_app(mock_settings), host=args.host, port=args.port)
@@ -0,0 +1,272 @@
+"""
+Module for admission control and backpressure in front of the RAG chain.
+
+Every chat front end (FastAPI, Gradio, Streamlit) passes requests through a
+shared AdmissionController. It caps concurrent RAG chain calls, keeps a
+bounded FIFO wait queue with a queue-time SLO, applies a per-client token
+bucket and rejects quickly when a request cannot be served in time, so
+admitted requests keep a flat latency under bursts.
+"""
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from src.config import (
+    ADMISSION_MAX_CONCURRENCY,
+    ADMISSION_MAX_QUEUE,
+    ADMISSION_QUEUE_TIMEOUT,
+    ADMISSION_RATE_PER_CLIENT,
+    ADMISSION_BURST_PER_CLIENT
+)
+
+
+class AdmissionRejected(Exception):
+    """
+    Raised when a request is not admitted.
+    """
+
+    status_code = 503
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RateLimitExceeded(AdmissionRejected):
+    """
+    Raised when a client exceeds its request rate.
+    """
+
+    status_code = 429
+
+
+class QueueFull(AdmissionRejected):
+    """
+    Raised when the wait queue is full or the queue-time SLO cannot be met.
+    """
+
+
+class QueueTimeout(AdmissionRejected):
+    """
+    Raised when a queued request waits longer than the queue-time SLO.
+    """
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        """
+        Initialize a full token bucket.
+
+        Args:
+            rate (float): Tokens added per second
+            capacity (float): Maximum tokens (burst size)
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def try_acquire(self) -> float:
+        """
+        Take one token if available.
+
+        Returns:
+            float: 0.0 if a token was taken, otherwise seconds until one is available
+        """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        return (1.0 - self.tokens) / self.rate if self.rate > 0 else float("inf")
+
+
+class AdmissionController:
+    """
+    Concurrency limiter with a bounded wait queue and per-client rate limits.
+    """
+
+    def __init__(self, max_concurrency: int = ADMISSION_MAX_CONCURRENCY, max_queue: int = ADMISSION_MAX_QUEUE,
+                 queue_timeout: float = ADMISSION_QUEUE_TIMEOUT, rate_per_client: float = ADMISSION_RATE_PER_CLIENT,
+                 burst_per_client: float = ADMISSION_BURST_PER_CLIENT, max_tracked_clients: int = 10000):
+        """
+        Initialize the admission controller.
+
+        Args:
+            max_concurrency (int, optional): Maximum requests running at once
+            max_queue (int, optional): Maximum requests waiting for a slot
+            queue_timeout (float, optional): Queue-time SLO in seconds
+            rate_per_client (float, optional): Sustained requests per second per client (0 disables rate limiting)
+            burst_per_client (float, optional): Burst size per client
+            max_tracked_clients (int, optional): Number of client buckets kept before evicting the oldest
+        """
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.rate_per_client = rate_per_client
+        self.burst_per_client = burst_per_client
+        self.max_tracked_clients = max_tracked_clients
+
+        self._cond = threading.Condition()
+        self._buckets = OrderedDict()
+        self._active = 0
+        self._waiting = 0
+        self._service_time = 0.0  # EWMA of time spent holding a slot
+        self._counters = {"admitted": 0, "rate_limited": 0, "queue_full": 0, "queue_timeout": 0}
+        self._total_queue_wait = 0.0
+
+    def _check_rate(self, client_id: str):
+        """
+        Apply the client's token bucket.
+
+        Args:
+            client_id (str): Client identifier
+
+        Raises:
+            RateLimitExceeded: If the client has no tokens left
+        """
+        if self.rate_per_client <= 0:
+            return
+
+        bucket = self._buckets.get(client_id)
+        if bucket is None:
+            bucket = TokenBucket(self.rate_per_client, self.burst_per_client)
+            self._buckets[client_id] = bucket
+            if len(self._buckets) > self.max_tracked_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client_id)
+
+        retry_after = bucket.try_acquire()
+        if retry_after > 0:
+            self._counters["rate_limited"] += 1
+            raise RateLimitExceeded("Too many requests from this client. Please slow down.", retry_after)
+
+    def acquire(self, client_id: str = "anonymous") -> float:
+        """
+        Wait for a slot, or raise if the request cannot be admitted.
+
+        Args:
+            client_id (str, optional): Client identifier for rate limiting
+
+        Returns:
+            float: Seconds spent waiting in the queue
+
+        Raises:
+            AdmissionRejected: If the request is rate limited, the queue is full or the SLO is missed
+        """
+        started = time.monotonic()
+
+        with self._cond:
+            self._check_rate(client_id)
+
+            if self._active < self.max_concurrency and self._waiting == 0:
+                self._active += 1
+                self._counters["admitted"] += 1
+                return 0.0
+
+            if self._waiting >= self.max_queue:
+                self._counters["queue_full"] += 1
+                raise QueueFull("Server is busy. Please try again shortly.", self.queue_timeout)
+
+            # Reject up front if the expected wait already exceeds the queue-time SLO
+            expected_wait = (self._waiting + 1) * self._service_time / self.max_concurrency
+            if expected_wait > self.queue_timeout:
+                self._counters["queue_full"] += 1
+                raise QueueFull("Server is busy. Please try again shortly.", expected_wait)
+
+            self._waiting += 1
+            try:
+                deadline = started + self.queue_timeout
+                while self._active >= self.max_concurrency:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._counters["queue_timeout"] += 1
+                        raise QueueTimeout("Request timed out waiting for capacity. Please try again.", self.queue_timeout)
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+
+            self._active += 1
+            self._counters["admitted"] += 1
+            waited = time.monotonic() - started
+            self._total_queue_wait += waited
+            return waited
+
+    def release(self, service_time: Optional[float] = None):
+        """
+        Release a slot and wake the next queued request.
+
+        Args:
+            service_time (float, optional): Seconds the slot was held, used to estimate queue waits
+        """
+        with self._cond:
+            self._active -= 1
+            if service_time is not None:
+                self._service_time = service_time if self._service_time == 0 else 0.8 * self._service_time + 0.2 * service_time
+            self._cond.notify()
+
+    @contextmanager
+    def admit(self, client_id: str = "anonymous"):
+        """
+        Context manager that holds a slot for the duration of the block.
+
+        Args:
+            client_id (str, optional): Client identifier for rate limiting
+
+        Raises:
+            AdmissionRejected: If the request is not admitted
+        """
+        self.acquire(client_id)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - started)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get admission metrics.
+
+        Returns:
+            Dict[str, Any]: Active and queued requests, counters and timings
+        """
+        with self._cond:
+            admitted = self._counters["admitted"]
+            return {
+                "active": self._active,
+                "queued": self._waiting,
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+                **self._counters,
+                "avg_queue_wait_ms": round(1000 * self._total_queue_wait / admitted, 2) if admitted else 0.0,
+                "avg_service_seconds": round(self._service_time, 3),
+            }
+
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def get_admission_controller() -> AdmissionController:
+    """
+    Get the process-wide admission controller.
+
+    Returns:
+        AdmissionController: The shared controller
+    """
+    global _controller
+
+    with _controller_lock:
+        if _controller is None:
+            _controller = AdmissionController()
+
+    return _controller
@@ -0,0 +1,354 @@
+"""
+Module for dynamic micro-batching of prompts for the local HuggingFace model.
+
+Concurrent callers submit prompts to a shared queue. A single worker thread
+groups prompts that arrive within a small time window into one padded batch,
+runs one generate call per batch and routes each output back to its caller.
+For decoder-only models, the KV cache of the shared prompt prefix (the system
+message) is computed once and reused by every batch.
+"""
+import copy
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional
+
+from langchain_core.language_models.llms import LLM
+
+from src.config import (
+    LOCAL_MODEL_NAME,
+    LOCAL_MAX_NEW_TOKENS,
+    LOCAL_BATCH_MAX_SIZE,
+    LOCAL_BATCH_WINDOW_MS,
+    LOCAL_PREFIX_CACHE_ENABLED
+)
+from src.prompts import get_prompt_prefix
+
+
+class MicroBatchScheduler:
+    """
+    Scheduler that batches concurrent generation requests for a local model.
+    """
+
+    def __init__(self, model, tokenizer, max_batch_size: int = LOCAL_BATCH_MAX_SIZE,
+                 batch_window_ms: float = LOCAL_BATCH_WINDOW_MS, max_new_tokens: int = LOCAL_MAX_NEW_TOKENS,
+                 prefix: Optional[str] = None):
+        """
+        Initialize the scheduler and start its worker thread.
+
+        Args:
+            model: HuggingFace model with a generate method
+            tokenizer: Tokenizer matching the model
+            max_batch_size (int, optional): Maximum prompts per generate call
+            batch_window_ms (float, optional): How long to wait for more prompts after the first one arrives
+            max_new_tokens (int, optional): Maximum tokens generated per prompt
+            prefix (str, optional): Prompt prefix shared by most requests, whose KV cache is reused
+        """
+        self.model = model
+        self.tokenizer = tokenizer
+        self.max_batch_size = max_batch_size
+        self.batch_window = batch_window_ms / 1000.0
+        self.max_new_tokens = max_new_tokens
+        self.is_encoder_decoder = getattr(model.config, "is_encoder_decoder", False)
+
+        if not self.is_encoder_decoder:
+            # Decoder-only models must be left-padded so generation continues right after each prompt
+            self.tokenizer.padding_side = "left"
+            if self.tokenizer.pad_token is None:
+                self.tokenizer.pad_token = self.tokenizer.eos_token
+
+        # Encoder-decoder models attend bidirectionally, so a prefix's encoder states depend on the rest of the prompt
+        self.prefix = prefix if prefix and LOCAL_PREFIX_CACHE_ENABLED and not self.is_encoder_decoder else None
+        self._prefix_ids = None
+        self._prefix_cache = None
+        self._prefix_tokens_saved = 0
+
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._batch_sizes = Counter()
+        self._requests_served = 0
+        self._last_batch_seconds = 0.0
+        self._total_queue_wait = 0.0
+        self._running = True
+
+        self._worker = threading.Thread(target=self._worker_loop, name="micro-batch-scheduler", daemon=True)
+        self._worker.start()
+
+    def submit(self, prompt: str) -> Future:
+        """
+        Queue a prompt for generation.
+
+        Args:
+            prompt (str): Prompt to generate from
+
+        Returns:
+            Future: Resolves to the generated text
+        """
+        future = Future()
+        self._queue.put((prompt, future, time.perf_counter()))
+        return future
+
+    def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        """
+        Generate text for a prompt, blocking until its batch completes.
+
+        Args:
+            prompt (str): Prompt to generate from
+            timeout (float, optional): Maximum seconds to wait for the result
+
+        Returns:
+            str: Generated text
+        """
+        return self.submit(prompt).result(timeout=timeout)
+
+    def _collect_batch(self) -> List[tuple]:
+        """
+        Block for the first request, then gather more until the batch is full or the window closes.
+
+        Returns:
+            List[tuple]: Batch of (prompt, future, enqueued_at) tuples
+        """
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.batch_window
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return [item for item in batch if item is not None]
+
+    def _tokenize(self, prompts: List[str], **kwargs):
+        """
+        Tokenize prompts into one padded batch, without truncation.
+
+        Truncating to the tokenizer's model_max_length would cut the end of a
+        long prompt, where the user's question is, so prompts are passed whole
+        as the unbatched pipeline did.
+
+        Args:
+            prompts (List[str]): Prompts in the batch
+            **kwargs: Extra tokenizer arguments
+
+        Returns:
+            BatchEncoding: Padded input ids and attention mask
+        """
+        return self.tokenizer(prompts, padding=True, **kwargs)
+
+    def _get_prefix_cache(self):
+        """
+        Compute the prefix KV cache on first use.
+
+        Returns:
+            tuple: Prefix token ids of shape (1, prefix_len) and the model's cache for them
+        """
+        if self._prefix_cache is None:
+            import torch
+
+            self._prefix_ids = self.tokenizer(self.prefix, return_tensors="pt")["input_ids"]
+            with torch.no_grad():
+                self._prefix_cache = self.model(self._prefix_ids, use_cache=True).past_key_values
+            print(f"Cached KV for the {self._prefix_ids.shape[1]}-token prompt prefix")
+        return self._prefix_ids, self._prefix_cache
+
+    def _run_batch_with_prefix(self, suffixes: List[str]) -> List[str]:
+        """
+        Run one generate call that starts from the cached prefix KV.
+
+        Suffixes are left-padded and placed after the prefix, so the prefix
+        occupies the same positions in every row and its cache can be shared;
+        the attention mask hides the padding and position ids follow the mask.
+
+        Args:
+            suffixes (List[str]): Prompts with the prefix removed
+
+        Returns:
+            List[str]: Generated texts in the same order
+        """
+        import torch
+
+        prefix_ids, prefix_cache = self._get_prefix_cache()
+        rows = len(suffixes)
+        suffix_inputs = self._tokenize(suffixes, return_tensors="pt", add_special_tokens=False)
+
+        input_ids = torch.cat([prefix_ids.expand(rows, -1), suffix_inputs["input_ids"]], dim=1)
+        attention_mask = torch.cat([
+            torch.ones((rows, prefix_ids.shape[1]), dtype=suffix_inputs["attention_mask"].dtype),
+            suffix_inputs["attention_mask"]
+        ], dim=1)
+
+        # generate extends the cache in place, so each batch works on its own copy
+        cache = copy.deepcopy(prefix_cache)
+        if rows > 1:
+            cache.batch_repeat_interleave(rows)
+
+        with torch.no_grad():
+            outputs = self.model.generate(
+                input_ids=input_ids,
+                attention_mask=attention_mask,
+                past_key_values=cache,
+                max_new_tokens=self.max_new_tokens
+            )
+
+        with self._stats_lock:
+            self._prefix_tokens_saved += rows * prefix_ids.shape[1]
+        return self.tokenizer.batch_decode(outputs[:, input_ids.shape[1]:], skip_special_tokens=True)
+
+    def _run_batch(self, prompts: List[str]) -> List[str]:
+        """
+        Run one padded generate call for a batch of prompts.
+
+        Args:
+            prompts (List[str]): Prompts in the batch
+
+        Returns:
+            List[str]: Generated texts in the same order
+        """
+        import torch
+
+        if self.prefix and all(prompt.startswith(self.prefix) for prompt in prompts):
+            try:
+                return self._run_batch_with_prefix([prompt[len(self.prefix):] for prompt in prompts])
+            except Exception as e:
+                # Models whose cache cannot be copied or expanded fall back to full prompts
+                print(f"Prefix KV cache unavailable for this model, disabling it: {e}")
+                self.prefix = None
+
+        inputs = self._tokenize(prompts, return_tensors="pt")
+
+        with torch.no_grad():
+            outputs = self.model.generate(**inputs, max_new_tokens=self.max_new_tokens)
+
+        if not self.is_encoder_decoder:
+            # Drop the echoed prompt tokens from decoder-only outputs
+            outputs = outputs[:, inputs["input_ids"].shape[1]:]
+
+        return self.tokenizer.batch_decode(outputs, skip_special_tokens=True)
+
+    def _worker_loop(self):
+        """
+        Worker thread: collect batches, run them and resolve the waiting futures.
+        """
+        while self._running:
+            batch = self._collect_batch()
+            if not batch:
+                continue
+
+            # Skip requests whose callers have already given up
+            batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            try:
+                results = self._run_batch([prompt for prompt, _, _ in batch])
+            except Exception as e:
+                print(f"Error in batched generation: {e}")
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            elapsed = time.perf_counter() - started
+
+            for (_, future, _), text in zip(batch, results):
+                future.set_result(text)
+
+            with self._stats_lock:
+                self._batch_sizes[len(batch)] += 1
+                self._requests_served += len(batch)
+                self._last_batch_seconds = elapsed
+                self._total_queue_wait += sum(started - enqueued_at for _, _, enqueued_at in batch)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get queue depth and batch size metrics.
+
+        Returns:
+            Dict[str, Any]: Scheduler metrics
+        """
+        with self._stats_lock:
+            batches_run = sum(self._batch_sizes.values())
+            return {
+                "queue_depth": self._queue.qsize(),
+                "batches_run": batches_run,
+                "requests_served": self._requests_served,
+                "avg_batch_size": round(self._requests_served / batches_run, 2) if batches_run else 0.0,
+                "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+                "avg_queue_wait_ms": round(1000 * self._total_queue_wait / self._requests_served, 2) if self._requests_served else 0.0,
+                "last_batch_seconds": round(self._last_batch_seconds, 3),
+                "prefix_cache": {
+                    "enabled": self.prefix is not None,
+                    "prefix_tokens": int(self._prefix_ids.shape[1]) if self._prefix_ids is not None else None,
+                    "tokens_saved": self._prefix_tokens_saved,
+                },
+            }
+
+    def shutdown(self):
+        """
+        Stop the worker thread after the current batch.
+        """
+        self._running = False
+        self._queue.put(None)
+
+
+class BatchedHuggingFaceLLM(LLM):
+    """
+    LangChain LLM that routes prompts through a MicroBatchScheduler.
+    """
+
+    scheduler: Any
+    timeout: Optional[float] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "batched_huggingface"
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> str:
+        return self.scheduler.generate(prompt, timeout=self.timeout)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_batch_scheduler() -> MicroBatchScheduler:
+    """
+    Get the process-wide scheduler, loading the local model on first use.
+
+    Returns:
+        MicroBatchScheduler: The shared scheduler
+    """
+    global _scheduler
+
+    with _scheduler_lock:
+        if _scheduler is None:
+            from transformers import AutoConfig, AutoModelForCausalLM, AutoModelForSeq2SeqLM, AutoTokenizer
+
+            print(f"Loading local model for batched generation: {LOCAL_MODEL_NAME}")
+            tokenizer = AutoTokenizer.from_pretrained(LOCAL_MODEL_NAME)
+            if AutoConfig.from_pretrained(LOCAL_MODEL_NAME).is_encoder_decoder:
+                model = AutoModelForSeq2SeqLM.from_pretrained(LOCAL_MODEL_NAME)
+            else:
+                model = AutoModelForCausalLM.from_pretrained(LOCAL_MODEL_NAME)
+            model.eval()
+
+            _scheduler = MicroBatchScheduler(model, tokenizer, prefix=get_prompt_prefix())
+
+    return _scheduler
+
+
+def get_batching_stats() -> Optional[Dict[str, Any]]:
+    """
+    Get metrics for the shared scheduler.
+
+    Returns:
+        Optional[Dict[str, Any]]: Scheduler metrics, or None if the scheduler has not been started
+    """
+    if _scheduler is None:
+        return None
+    return _scheduler.stats()
@@ -0,0 +1,223 @@
+"""
+Module for the compact, array-backed store of FAQ chunks used during retrieval.
+
+Chunks are addressed by integer id. Their texts live in one contiguous UTF-8
+buffer with an offsets array, next to precomputed lowercase copies of the full
+text and of the FAQ question part, so keyword matching is a scan of one
+buffer instead of lowercasing every candidate per query. Metadata is stored
+column by column as dictionary-encoded codes. Retrieval passes ids around and
+only builds LangChain Documents when the prompt is assembled.
+"""
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+
+# Separates chunks in the search buffers, so a match cannot span two chunks
+_SEPARATOR = b"\x00"
+
+
+def question_part(text_lower: str) -> str:
+    """
+    Extract the question part of a lowercased "Question: ... Answer: ..." chunk.
+
+    Args:
+        text_lower (str): Lowercased chunk text
+
+    Returns:
+        str: Text between "question:" and "answer:", or "" if the chunk lacks either marker
+    """
+    if "question:" not in text_lower or "answer:" not in text_lower:
+        return ""
+    return text_lower.split("question:")[1].split("answer:")[0]
+
+
+class _Buffer:
+    """
+    Strings packed into one bytes buffer with start and end offsets.
+    """
+
+    def __init__(self, strings: Iterable[str]):
+        encoded = [s.encode("utf-8") for s in strings]
+        lengths = np.fromiter((len(e) for e in encoded), dtype=np.int64, count=len(encoded))
+        self.starts = np.zeros(len(encoded), dtype=np.int64)
+        if len(encoded) > 1:
+            self.starts[1:] = np.cumsum(lengths[:-1] + len(_SEPARATOR))
+        self.ends = self.starts + lengths
+        self.data = _SEPARATOR.join(encoded)
+
+    def get(self, i: int) -> str:
+        return self.data[self.starts[i]:self.ends[i]].decode("utf-8")
+
+    def ids_containing(self, term: str) -> np.ndarray:
+        """
+        Ids of the strings that contain term, each reported once.
+        """
+        needle = term.encode("utf-8")
+        ids = []
+        position = self.data.find(needle)
+        while position != -1:
+            i = int(np.searchsorted(self.starts, position, side="right")) - 1
+            ids.append(i)
+            # Skip the rest of this string
+            position = self.data.find(needle, int(self.ends[i]) + 1)
+        return np.asarray(ids, dtype=np.int64)
+
+    def nbytes(self) -> int:
+        return len(self.data) + self.starts.nbytes + self.ends.nbytes
+
+
+class ChunkStore:
+    """
+    Columnar store of chunk texts, their search variants and metadata.
+    """
+
+    def __init__(self, texts: List[str], metadatas: Optional[List[dict]] = None):
+        """
+        Pack chunks into the store.
+
+        Args:
+            texts (List[str]): Chunk texts; id i is the i-th text
+            metadatas (List[dict], optional): Metadata per chunk
+        """
+        metadatas = metadatas or [{} for _ in texts]
+        lowered = [text.lower() for text in texts]
+        self._texts = _Buffer(texts)
+        self._lower = _Buffer(lowered)
+        self._question_lower = _Buffer(question_part(text) for text in lowered)
+
+        # Metadata key -> (distinct values, code per chunk or -1 if the chunk lacks the key)
+        self._columns = {}
+        for key in dict.fromkeys(key for metadata in metadatas for key in metadata):
+            values, codes, positions = [], np.full(len(texts), -1, dtype=np.int32), {}
+            for i, metadata in enumerate(metadatas):
+                if key in metadata:
+                    value = metadata[key]
+                    if value not in positions:
+                        positions[value] = len(values)
+                        values.append(value)
+                    codes[i] = positions[value]
+            self._columns[key] = (values, codes)
+
+        # Text hash -> first id with that text, so identical chunks share one id
+        self._ids_by_hash = {}
+        for i, text in enumerate(texts):
+            self._ids_by_hash.setdefault(hash(text), []).append(i)
+
+    @classmethod
+    def from_documents(cls, documents: List[Document]) -> "ChunkStore":
+        """
+        Build the store from documents.
+
+        Args:
+            documents (List[Document]): Stored FAQ chunks
+
+        Returns:
+            ChunkStore: The store
+        """
+        store = cls([doc.page_content for doc in documents], [doc.metadata for doc in documents])
+        print(f"Packed {len(store)} chunks into the chunk store ({store.memory_bytes() / 2 ** 20:.2f} MB)")
+        return store
+
+    def __len__(self) -> int:
+        return len(self._texts.starts)
+
+    def text(self, chunk_id: int) -> str:
+        return self._texts.get(chunk_id)
+
+    def metadata(self, chunk_id: int) -> dict:
+        return {
+            key: values[codes[chunk_id]]
+            for key, (values, codes) in self._columns.items()
+            if codes[chunk_id] >= 0
+        }
+
+    def id_for_text(self, text: str) -> Optional[int]:
+        """
+        Find the id of a chunk by its text.
+
+        Args:
+            text (str): Chunk text, e.g. from a vector search hit
+
+        Returns:
+            Optional[int]: The first chunk with exactly this text, or None if it is not stored
+        """
+        for i in self._ids_by_hash.get(hash(text), ()):
+            if self.text(i) == text:
+                return i
+        return None
+
+    def ids_for_texts(self, texts: Iterable[str]) -> List[int]:
+        """
+        Map search hit texts to chunk ids, dropping texts that are not stored.
+
+        Args:
+            texts (Iterable[str]): Chunk texts
+
+        Returns:
+            List[int]: Chunk ids in the same order
+        """
+        ids = (self.id_for_text(text) for text in texts)
+        return [i for i in ids if i is not None]
+
+    def ids_containing(self, term: str) -> np.ndarray:
+        """
+        Ids of chunks whose lowercased text contains a lowercase term.
+
+        Args:
+            term (str): Lowercase term
+
+        Returns:
+            np.ndarray: Matching ids in ascending order
+        """
+        return self._lower.ids_containing(term)
+
+    def ids_with_question_containing(self, term: str) -> np.ndarray:
+        """
+        Ids of chunks whose lowercased FAQ question part contains a lowercase term.
+
+        Args:
+            term (str): Lowercase term
+
+        Returns:
+            np.ndarray: Matching ids in ascending order
+        """
+        return self._question_lower.ids_containing(term)
+
+    def document(self, chunk_id: int) -> Document:
+        return Document(page_content=self.text(chunk_id), metadata=self.metadata(chunk_id))
+
+    def documents(self, chunk_ids: Iterable[int]) -> List[Document]:
+        """
+        Materialize Documents for the chunks that made it into a prompt.
+
+        Args:
+            chunk_ids (Iterable[int]): Chunk ids
+
+        Returns:
+            List[Document]: Documents in the same order
+        """
+        return [self.document(i) for i in chunk_ids]
+
+    def memory_bytes(self) -> int:
+        """
+        Approximate memory held by the buffers and metadata codes.
+
+        Returns:
+            int: Bytes
+        """
+        buffers = sum(buffer.nbytes() for buffer in (self._texts, self._lower, self._question_lower))
+        return buffers + sum(codes.nbytes for _, codes in self._columns.values())
+
+    def stats(self) -> Dict[str, object]:
+        """
+        Get store size metrics.
+
+        Returns:
+            Dict[str, object]: Number of chunks, metadata columns and memory used
+        """
+        return {
+            "chunks": len(self),
+            "metadata_columns": sorted(self._columns),
+            "memory_mb": round(self.memory_bytes() / 2 ** 20, 2),
+        }
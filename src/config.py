@@ -13,6 +13,19 @@ USE_MISTRAL_API = True  # Set to True to use Mistral AI API
 QWEN_MODEL_NAME = "Qwen/Qwen2-7B-Instruct"  # Qwen model
 MISTRAL_MODEL_NAME = "mistral-large-latest"  # Mistral AI model
 EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"  # Embedding model for vector store
+EMBEDDING_BACKEND = "torch"  # Options: "torch", "onnx", "onnx-int8" (ONNX Runtime, optionally with int8 dynamic quantization)
+ONNX_EMBEDDING_DIR = "models/onnx_embeddings"  # Exported ONNX embedding model and tokenizer
+ONNX_INTRA_OP_THREADS = 0  # ONNX Runtime intra-op threads (0 lets ONNX Runtime use one per physical core)
+EMBEDDING_BATCH_SIZE = 32  # Texts encoded per ONNX Runtime call
+EMBEDDING_MAX_SEQ_LENGTH = 256  # Token limit per text, matching the sentence-transformers model
+
+# Local model settings (used when USE_MISTRAL_API is False)
+LOCAL_MODEL_NAME = "google/flan-t5-small"  # Local text generation model
+LOCAL_MAX_NEW_TOKENS = 512  # Maximum tokens generated per prompt
+LOCAL_BATCHING_ENABLED = True  # Group concurrent prompts into padded batches for one generate call
+LOCAL_BATCH_MAX_SIZE = 8  # Maximum prompts per batch
+LOCAL_BATCH_WINDOW_MS = 20  # Time to wait for more prompts after the first one arrives
+LOCAL_PREFIX_CACHE_ENABLED = True  # Reuse the system-message KV cache across requests (decoder-only models)
 
 # Quantization settings
 QUANTIZATION_TYPE = "4bit"  # Options: "4bit", "8bit"
@@ -31,17 +44,131 @@ TOP_K_RETRIEVAL = 10  # Number of documents to retrieve from vector store
 # Web search settings
 WEB_SEARCH_ENABLED = True  # Enable/disable web search
 WEB_SEARCH_NUM_RESULTS = 3  # Number of web search results to retrieve
+SPECULATIVE_WEB_SEARCH_ENABLED = True  # Start web search in parallel with FAQ retrieval for queries unlikely to be in the FAQ
+SPECULATIVE_WEB_SEARCH_WASTE_BUDGET = 50  # Maximum discarded speculative searches per budget window
+SPECULATIVE_WEB_SEARCH_BUDGET_WINDOW = 3600  # Budget window in seconds
+WEB_CORPUS_ENABLED = True  # Keep fetched web results in a local embedded corpus and answer repeat web queries from it
+WEB_CORPUS_DIR = "web_corpus"  # Directory holding the corpus records and vectors
+WEB_CORPUS_MAX_AGE_SECONDS = 7 * 24 * 3600  # Results fetched longer ago than this are not served from the corpus
+WEB_CORPUS_MIN_SIMILARITY = 0.6  # Minimum query-result cosine similarity for a corpus result to count as relevant
+WEB_CORPUS_MIN_RESULTS = 2  # Fresh, relevant corpus results needed to skip the SERP API call
+WEB_CORPUS_MAX_RESULTS = 50000  # Results kept in the corpus; expired and superseded results are dropped first, then the oldest
+WEB_PREFETCH_ENABLED = True  # Refresh web results of popular queries in the background before they expire from the web corpus
+WEB_PREFETCH_INTERVAL_SECONDS = 300  # Time between prefetch passes
+WEB_PREFETCH_TOP_N = 20  # Most popular web queries kept fresh
+WEB_PREFETCH_REFRESH_MARGIN_SECONDS = 6 * 3600  # Refresh a popular query this long before its corpus results would expire
+WEB_PREFETCH_MAX_CALLS_PER_HOUR = 30  # SERP API calls the prefetcher may make per hour, on top of inline searches
+WEB_PREFETCH_POPULARITY_HALF_LIFE = 3600  # Half-life in seconds of a query's popularity score
+WEB_PREFETCH_MIN_POPULARITY = 2.0  # Decayed request count below which a query is not prefetched
+WEB_PREFETCH_MAX_TRACKED_QUERIES = 1000  # Distinct queries whose popularity is tracked; the least popular are dropped
+
+# Resilience settings for external calls
+SERPAPI_TIMEOUT = 5.0  # Deadline per SERP API attempt in seconds
+SERPAPI_RETRIES = 1  # Extra SERP API attempts after a failure
+SERPAPI_TOTAL_TIMEOUT = 8.0  # Deadline across all SERP API attempts and backoff in seconds
+SERPAPI_MAX_IN_FLIGHT = 8  # SERP API calls running at once, including ones abandoned at their deadline
+SERPAPI_HEDGE_ENABLED = True  # Send a duplicate SERP API request once the first is slower than the observed p95
+LLM_TIMEOUT = 45.0  # Deadline per LLM attempt in seconds
+LLM_RETRIES = int(os.getenv("LLM_RETRIES", "0"))  # Extra LLM attempts after a failure; opt in, since a retry repeats a long, token-billed call
+LLM_TOTAL_TIMEOUT = 60.0  # Deadline across all LLM attempts and backoff in seconds
+LLM_MAX_IN_FLIGHT = 16  # LLM calls running at once, including ones abandoned at their deadline
+LLM_FIRST_CHUNK_TIMEOUT = 20.0  # Seconds a streamed LLM answer may take to produce its first chunk
+LLM_STREAM_IDLE_TIMEOUT = 15.0  # Longest gap between streamed LLM chunks in seconds
+LLM_HEDGE_ENABLED = False  # Hedging LLM calls can double token spend, so it is off by default
+RETRY_BASE_DELAY = 0.2  # Base delay for jittered exponential backoff in seconds
+RETRY_MAX_DELAY = 2.0  # Maximum backoff delay in seconds
+HEDGE_PERCENTILE = 95  # Latency percentile after which a hedged request is sent
+CIRCUIT_FAILURE_THRESHOLD = 5  # Consecutive failed calls that open a circuit breaker
+CIRCUIT_RECOVERY_TIMEOUT = 30.0  # Seconds a circuit stays open before a trial call
+
+# Admission control settings (shared by the FastAPI, Gradio and Streamlit front ends)
+ADMISSION_MAX_CONCURRENCY = 8  # Maximum RAG chain calls running at once
+ADMISSION_MAX_QUEUE = 32  # Maximum requests waiting for a slot before fast rejection
+ADMISSION_QUEUE_TIMEOUT = 10.0  # Queue-time SLO in seconds; requests that would wait longer are rejected
+ADMISSION_RATE_PER_CLIENT = 1.0  # Sustained requests per second per client (0 disables rate limiting)
+ADMISSION_BURST_PER_CLIENT = 5  # Burst size of each client's token bucket
+TRUSTED_PROXIES = [ip.strip() for ip in os.getenv("TRUSTED_PROXIES", "127.0.0.1,::1").split(",") if ip.strip()]  # Peers whose X-Client-Id header is used for rate limiting; others are limited by address
+
+# Gradio queue settings
+GRADIO_CONCURRENCY_LIMIT = ADMISSION_MAX_CONCURRENCY  # Chat events processed at once across all sessions
+GRADIO_MAX_QUEUE_SIZE = ADMISSION_MAX_QUEUE  # Chat events waiting in the Gradio queue before new ones are refused
+
+# Batch chat settings (/chat/batch)
+BATCH_MAX_QUERIES = 64  # Maximum queries accepted in one batch request
+BATCH_LLM_PARALLELISM = 4  # Maximum concurrent LLM calls per batch request
+
+# Question suggestion settings (/suggest)
+SUGGEST_MAX_RESULTS = 5  # Maximum suggestions returned per lookup
+SUGGEST_MIN_PREFIX = 2  # Minimum typed characters before suggesting
+FAQ_EXACT_ANSWER_ENABLED = True  # Answer questions that exactly match an FAQ entry without an LLM call
+
+# Query spelling correction settings
+SPELLING_CORRECTION_ENABLED = True  # Correct misspelled product and bank names before retrieval
+SPELLING_MAX_EDIT_DISTANCE = 2  # Maximum edits for a correction (names of 5 letters or fewer allow 1)
+
+# Conversation memory settings
+CONVERSATION_MAX_TURNS = 6  # Recent turns kept verbatim per conversation; older turns are summarized
+CONVERSATION_TTL_SECONDS = 3600  # Idle time after which a conversation is forgotten
+CONVERSATION_MAX_MEMORY_MB = 64  # Memory cap across all conversations; least recently used are evicted
+CONVERSATION_SUMMARY_MAX_CHARS = 1000  # Maximum length of a conversation's rolling summary
 
 # Vector store settings
 VECTOR_STORE_DIR = "vector_store"  # Directory to store vector database
+ENTITY_INDEX_PATH = os.path.join(VECTOR_STORE_DIR, "entity_index.json")  # Entity -> chunk postings for product queries
+INDEX_ARTIFACT_PATH = os.getenv("INDEX_ARTIFACT_PATH", "")  # Prebuilt index artifact (.tar.gz path or s3:// URL) installed at startup instead of re-embedding
+VECTOR_INDEX_BACKEND = "chroma"  # Options: "chroma", "exact", "int8", "binary", "ivf", "sharded"
+INT8_RESCORE_FACTOR = 4  # int8 index re-scores k * factor candidates with float32 vectors
+BINARY_RESCORE_FACTOR = 10  # Binary index re-scores k * factor candidates with float32 vectors
+IVF_NLIST = 1024  # Number of IVF clusters (capped at about one per 39 training vectors)
+IVF_NPROBE = 16  # IVF clusters scanned per query; the speed/recall knob
+IVF_TRAIN_SAMPLE = 100000  # Maximum vectors used to train the IVF coarse quantizer
+IVF_TRAIN_ITERATIONS = 15  # k-means iterations for the IVF coarse quantizer
+SHARD_COUNT = max(1, (os.cpu_count() or 2) - 1)  # Retrieval worker processes for the "sharded" backend
+SHARD_INDEX_BACKEND = "exact"  # Index type inside each shard: "exact", "int8", "binary" or "ivf"
+
+# Intent routing settings
+INTENT_ROUTING_ENABLED = True  # Route each query to the retrieval strategies and model its intent needs
+ROUTER_SMALL_MODEL_NAME = "mistral-small-latest"  # Model for FAQ, product and commission questions
+ROUTER_PATH = os.path.join(VECTOR_STORE_DIR, "intent_router.npz")  # Trained intent centroids
+ROUTER_LOG_PATH = "logs/routing_decisions.jsonl"  # Routing decisions, one JSON object per line
+ROUTER_EXACT_MATCH_THRESHOLD = 0.92  # Similarity to an FAQ question above which a query is an exact FAQ match
+ROUTER_MIN_CONFIDENCE = 0.35  # Below this centroid similarity, queries take the full (general) path
+
+# Query log and startup warm-up settings
+QUERY_LOG_ENABLED = True  # Count served queries in a compact persistent log that startup warm-up replays
+QUERY_LOG_PATH = "logs/query_log.json"  # Query counts per tenant, most frequent first
+QUERY_LOG_MAX_QUERIES = 5000  # Distinct queries kept; the least frequent are dropped
+QUERY_LOG_FLUSH_INTERVAL = 60  # Seconds between writes of the query log
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"  # Replay top logged queries at startup before /ready reports ready
+WARMUP_TOP_K = 50  # Most frequent logged queries replayed
+WARMUP_TIME_BUDGET_SECONDS = 60  # Warm-up stops starting new queries after this long
+WARMUP_GENERATE_ANSWERS = False  # Also generate answers (web search and LLM tokens); retrieval only when False
+
+# Profiling settings (/admin/profile)
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"  # Global kill switch; when off, the profiler never starts and request hooks are a single flag check
+PROFILER_SAMPLE_INTERVAL_MS = 10  # Time between stack samples
+PROFILER_MAX_SECONDS = 60  # Longest allowed profiling session
+PROFILER_MAX_REQUESTS = 100  # Most requests one session may profile
+PROFILER_MAX_STACK_DEPTH = 64  # Innermost frames kept per sample
 
 # Data settings
 FAQ_DATA_PATH = "/Users/anandkumar/Downloads/gromo_RAG+websearch/gromo-faq-v1-0.csv"  # Path to FAQ dataset
 
+# Tenant settings (per-tenant FAQ collections served by one process)
+DEFAULT_TENANT_ID = "default"  # Tenant used when a request names none; served from FAQ_DATA_PATH and VECTOR_STORE_DIR
+TENANTS_CONFIG_PATH = os.getenv("TENANTS_CONFIG_PATH", "tenants.json")  # JSON object: tenant id -> {"faq_path": ..., "index_artifact": ...}
+TENANT_STORE_ROOT = "tenant_stores"  # Each tenant's vector store, entity index and router live in TENANT_STORE_ROOT/<tenant id>
+TENANT_MEMORY_BUDGET_MB = int(os.getenv("TENANT_MEMORY_BUDGET_MB", "1024"))  # Estimated memory across loaded tenants; least recently used tenants are unloaded above it
+
 # API keys
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")  # OpenAI API key (optional)
 MISTRAL_API_KEY = os.getenv("MISTRAL_API_KEY", "")  # Mistral AI API key
 SERPAPI_API_KEY = os.getenv("SERPAPI_API_KEY", "")  # SERP API key for web search
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")  # Token required in the X-Admin-Token header of /admin endpoints (unset disables them)
+
+# API endpoints (point these at mock_servers.py for local load testing)
+MISTRAL_API_ENDPOINT = os.getenv("MISTRAL_API_ENDPOINT", "https://api.mistral.ai/v1")  # Mistral AI chat-completions base URL
+SERPAPI_BACKEND = os.getenv("SERPAPI_BACKEND", "https://serpapi.com")  # SERP API base URL
 
 # AWS deployment settings
 AWS_REGION = "us-east-1"  # AWS region for deployment
@@ -50,36 +177,18 @@ AWS_LAMBDA_MEMORY = 10240  # Memory allocation for AWS Lambda (MB) - maximum all
 AWS_LAMBDA_TIMEOUT = 60  # Timeout for AWS Lambda (seconds)
 
 # Prompt templates
-RAG_PROMPT_TEMPLATE = """
-You are GromoBot, the official AI assistant for Gromo, a financial technology platform that helps users sell financial products and earn commissions.
-
-Your responses should be:
-1. Helpful and informative, providing accurate information about Gromo's services and products
-2. Friendly and conversational, but professional
-3. Concise but comprehensive
-4. Based on information from BOTH the retrieved FAQ documents AND web search results
-
-Context information from Gromo's FAQ and web search:
+# Variable part of the prompt; the fixed instructions live in SYSTEM_MESSAGE, which is
+# sent first and unchanged on every request so it can be served from a prompt cache
+RAG_PROMPT_TEMPLATE = """Context information from Gromo's FAQ and web search:
 {context}
 
-When answering questions:
-- Synthesize information from both FAQ data and web search results into a comprehensive answer
-- For Gromo-specific information (commission rates, policies, products), prioritize the FAQ data
-- Use web search results to add relevant details, especially for general information about financial products
-
-When discussing specific financial products (like Zest Money, Fi, Groww, etc.):
-- Thoroughly explain what the product is and its key features
-- Detail how it relates to Gromo and how partners can earn from it
-- Include specific benefits, eligibility criteria, and requirements when available
-
 User query: {question}
 
 RESPONSE:
 """
 
-# System message for the LLM
-SYSTEM_MESSAGE = """
-You are GromoBot, the official AI assistant for Gromo, a financial technology platform that helps users sell financial products and earn commissions.
+# System message for the LLM (the stable, cacheable prompt prefix)
+SYSTEM_MESSAGE = """You are GromoBot, the official AI assistant for Gromo, a financial technology platform that helps users sell financial products and earn commissions.
 
 Your responses should be:
 1. Helpful and informative, providing accurate information about Gromo's services and products
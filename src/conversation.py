@@ -0,0 +1,276 @@
+"""
+Module for per-conversation memory with bounded history.
+
+Each conversation keeps its most recent turns verbatim in a ring buffer.
+Turns that fall out of the buffer are compacted into a rolling summary, so
+follow-up questions can be rewritten with earlier context while the prompt
+stays bounded. Sessions expire after a TTL and the least recently used
+sessions are evicted when the store exceeds its memory cap.
+"""
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.config import (
+    CONVERSATION_MAX_TURNS,
+    CONVERSATION_TTL_SECONDS,
+    CONVERSATION_MAX_MEMORY_MB,
+    CONVERSATION_SUMMARY_MAX_CHARS
+)
+
+# Words that usually refer back to an earlier turn
+_FOLLOW_UP_PATTERN = re.compile(
+    r"\b(it|its|it's|this|that|these|those|they|them|their|he|she|his|her|same|above|previous|also)\b"
+    r"|^(and|what about|how about|what else|tell me more|more)\b"
+)
+
+
+def extractive_summary(summary: str, evicted_turns: List[Tuple[str, str]], max_chars: int = CONVERSATION_SUMMARY_MAX_CHARS) -> str:
+    """
+    Fold evicted turns into a rolling summary without an LLM call.
+
+    Keeps each evicted question and the first sentence of its answer, dropping
+    the oldest material once the summary exceeds max_chars.
+
+    Args:
+        summary (str): Current summary
+        evicted_turns (List[Tuple[str, str]]): (user message, assistant message) pairs leaving the buffer
+        max_chars (int, optional): Maximum summary length
+
+    Returns:
+        str: Updated summary
+    """
+    parts = [summary] if summary else []
+    for user_message, assistant_message in evicted_turns:
+        first_sentence = re.split(r"(?<=[.!?])\s", assistant_message.strip(), maxsplit=1)[0][:200]
+        parts.append(f"User asked: {user_message.strip()} Answer: {first_sentence}")
+
+    updated = " | ".join(parts)
+    if len(updated) > max_chars:
+        updated = "..." + updated[-(max_chars - 3):]
+    return updated
+
+
+class ConversationSession:
+    """
+    History of one conversation.
+    """
+
+    def __init__(self, conversation_id: str, max_turns: int):
+        """
+        Initialize an empty session.
+
+        Args:
+            conversation_id (str): Conversation identifier
+            max_turns (int): Recent turns kept verbatim
+        """
+        self.conversation_id = conversation_id
+        self.turns = deque(maxlen=max_turns)
+        self.summary = ""
+        self.last_access = time.monotonic()
+
+    def size_bytes(self) -> int:
+        """
+        Approximate memory held by the session's text.
+
+        Returns:
+            int: Bytes
+        """
+        return len(self.summary) + sum(len(user) + len(assistant) for user, assistant in self.turns) + 200
+
+
+class ConversationStore:
+    """
+    Session store keyed by conversation id, with TTL expiry and LRU eviction under a memory cap.
+    """
+
+    def __init__(self, max_turns: int = CONVERSATION_MAX_TURNS, ttl_seconds: float = CONVERSATION_TTL_SECONDS,
+                 max_memory_bytes: int = CONVERSATION_MAX_MEMORY_MB * 1024 * 1024,
+                 summarizer: Optional[Callable[[str, List[Tuple[str, str]]], str]] = None):
+        """
+        Initialize the store.
+
+        Args:
+            max_turns (int, optional): Recent turns kept verbatim per session
+            ttl_seconds (float, optional): Idle time after which a session expires
+            max_memory_bytes (int, optional): Memory cap across all sessions
+            summarizer (Callable, optional): Function (summary, evicted_turns) -> summary; defaults to extractive_summary
+        """
+        self.max_turns = max_turns
+        self.ttl_seconds = ttl_seconds
+        self.max_memory_bytes = max_memory_bytes
+        self.summarizer = summarizer or extractive_summary
+        self._sessions = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {"expired": 0, "evicted": 0, "compactions": 0}
+
+    def _remove(self, conversation_id: str):
+        session = self._sessions.pop(conversation_id)
+        self._memory_bytes -= session.size_bytes()
+
+    def _expire_and_evict(self):
+        """
+        Drop expired sessions, then least recently used ones until under the memory cap.
+        """
+        now = time.monotonic()
+        # Sessions are kept in access order, so expired ones are at the front
+        while self._sessions:
+            conversation_id, session = next(iter(self._sessions.items()))
+            if now - session.last_access <= self.ttl_seconds:
+                break
+            self._remove(conversation_id)
+            self._counters["expired"] += 1
+
+        while self._sessions and self._memory_bytes > self.max_memory_bytes:
+            self._remove(next(iter(self._sessions)))
+            self._counters["evicted"] += 1
+
+    def _get(self, conversation_id: str) -> Optional[ConversationSession]:
+        session = self._sessions.get(conversation_id)
+        if session is not None:
+            session.last_access = time.monotonic()
+            self._sessions.move_to_end(conversation_id)
+        return session
+
+    def add_turn(self, conversation_id: str, user_message: str, assistant_message: str):
+        """
+        Record a completed turn, compacting the oldest turn into the summary if the buffer is full.
+
+        Args:
+            conversation_id (str): Conversation identifier
+            user_message (str): The user's message
+            assistant_message (str): The assistant's reply
+        """
+        with self._lock:
+            session = self._get(conversation_id)
+            if session is None:
+                session = ConversationSession(conversation_id, self.max_turns)
+                self._sessions[conversation_id] = session
+            else:
+                self._memory_bytes -= session.size_bytes()
+
+            if len(session.turns) == session.turns.maxlen:
+                session.summary = self.summarizer(session.summary, [session.turns[0]])
+                self._counters["compactions"] += 1
+            session.turns.append((user_message, assistant_message))
+
+            self._memory_bytes += session.size_bytes()
+            self._expire_and_evict()
+
+    def rewrite_query(self, conversation_id: str, query: str) -> str:
+        """
+        Make a follow-up question self-contained for retrieval.
+
+        Follow-ups (questions with back-references like "it" or "what about")
+        get the previous question appended as context. The rewrite is meant
+        for retrieval; the prompt should keep the user's own question.
+
+        Args:
+            conversation_id (str): Conversation identifier
+            query (str): The user's message
+
+        Returns:
+            str: The rewritten query, or the original query if no rewrite is needed
+        """
+        with self._lock:
+            self._expire_and_evict()
+            session = self._get(conversation_id)
+            if session is None or (not session.turns and not session.summary):
+                return query
+
+            query_lower = query.lower().strip()
+            if _FOLLOW_UP_PATTERN.search(query_lower) is None:
+                return query
+
+            if session.turns:
+                previous_question = session.turns[-1][0]
+            else:
+                previous_question = session.summary[-300:]
+            return f"{query} (regarding: {previous_question})"
+
+    def history_for_prompt(self, conversation_id: str, max_recent_turns: int = 2) -> str:
+        """
+        Get a bounded conversation history for the prompt.
+
+        Args:
+            conversation_id (str): Conversation identifier
+            max_recent_turns (int, optional): Recent turns included verbatim. Defaults to 2.
+
+        Returns:
+            str: Summary plus recent turns, or an empty string for a new conversation
+        """
+        with self._lock:
+            session = self._get(conversation_id)
+            if session is None:
+                return ""
+
+            lines = []
+            if session.summary:
+                lines.append(f"Summary of earlier conversation: {session.summary}")
+            for user_message, assistant_message in list(session.turns)[-max_recent_turns:]:
+                lines.append(f"User: {user_message}")
+                lines.append(f"GromoBot: {assistant_message[:500]}")
+            return "\n".join(lines)
+
+    def get_turns(self, conversation_id: str) -> List[Tuple[str, str]]:
+        """
+        Get the recent turns of a conversation.
+
+        Args:
+            conversation_id (str): Conversation identifier
+
+        Returns:
+            List[Tuple[str, str]]: (user message, assistant message) pairs, oldest first
+        """
+        with self._lock:
+            session = self._get(conversation_id)
+            return list(session.turns) if session is not None else []
+
+    def clear(self, conversation_id: str):
+        """
+        Forget a conversation.
+
+        Args:
+            conversation_id (str): Conversation identifier
+        """
+        with self._lock:
+            if conversation_id in self._sessions:
+                self._remove(conversation_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get store metrics.
+
+        Returns:
+            Dict[str, Any]: Session count, memory use and eviction counters
+        """
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "memory_bytes": self._memory_bytes,
+                "max_memory_bytes": self.max_memory_bytes,
+                **self._counters,
+            }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_conversation_store() -> ConversationStore:
+    """
+    Get the process-wide conversation store.
+
+    Returns:
+        ConversationStore: The shared store
+    """
+    global _store
+
+    with _store_lock:
+        if _store is None:
+            _store = ConversationStore()
+
+    return _store
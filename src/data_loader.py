@@ -8,7 +8,8 @@ from typing import List, Dict, Any
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
 
-from src.config import FAQ_DATA_PATH, CHUNK_SIZE, CHUNK_OVERLAP
+from src.config import FAQ_DATA_PATH, ENTITY_INDEX_PATH, CHUNK_SIZE, CHUNK_OVERLAP
+from src.entity_index import update_entity_index
 
 
 def clean_text(text: str) -> str:
@@ -40,16 +41,19 @@ def clean_text(text: str) -> str:
     return text
 
 
-def load_faq_data() -> pd.DataFrame:
+def load_faq_data(path: str = FAQ_DATA_PATH) -> pd.DataFrame:
     """
     Load the FAQ dataset from CSV file and clean it.
     
+    Args:
+        path (str, optional): FAQ CSV file. Defaults to FAQ_DATA_PATH.
+    
     Returns:
         pd.DataFrame: DataFrame containing the cleaned FAQ data
     """
     try:
         # Read CSV file
-        df = pd.read_csv(FAQ_DATA_PATH)
+        df = pd.read_csv(path)
         
         # Clean question and answer columns
         df['question'] = df['question'].apply(clean_text)
@@ -121,15 +125,19 @@ def split_documents(documents: List[Document]) -> List[Document]:
     return chunked_documents
 
 
-def prepare_faq_documents() -> List[Document]:
+def prepare_faq_documents(faq_path: str = FAQ_DATA_PATH, entity_index_path: str = ENTITY_INDEX_PATH) -> List[Document]:
     """
     Prepare FAQ documents for vector store.
     
+    Args:
+        faq_path (str, optional): FAQ CSV file. Defaults to FAQ_DATA_PATH.
+        entity_index_path (str, optional): Entity index file to update. Defaults to ENTITY_INDEX_PATH.
+    
     Returns:
         List[Document]: List of processed Document objects
     """
     # Load FAQ data
-    df = load_faq_data()
+    df = load_faq_data(faq_path)
     
     # Convert to documents
     documents = convert_to_documents(df)
@@ -137,4 +145,8 @@ def prepare_faq_documents() -> List[Document]:
     # Split documents into chunks
     chunked_documents = split_documents(documents)
     
-    return chunked_documents 
\ No newline at end of file
+    # Index product, bank and feature mentions for dictionary lookups at query time
+    update_entity_index(chunked_documents, entity_index_path)
+    
+    return chunked_documents
+ 
\ No newline at end of file
@@ -2,21 +2,51 @@
 Module for creating and managing embeddings for the RAG system.
 """
 import os
+import threading
 from typing import List
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_community.vectorstores import Chroma
 from langchain_core.documents import Document
 
-from src.config import EMBEDDING_MODEL_NAME, VECTOR_STORE_DIR
+from src.config import EMBEDDING_MODEL_NAME, EMBEDDING_BACKEND, VECTOR_STORE_DIR, VECTOR_INDEX_BACKEND
+from src.ivf_index import IVFIndex
+from src.quantized_index import ScalarQuantizedIndex, BinaryQuantizedIndex
+from src.sharded_index import ShardedIndex
+from src.vector_index import ArrayVectorStore, ExactIndex
 
+# Loaded embedding models by backend; every vector store and tenant shares one copy of the weights
+_embeddings_models = {}
+_embeddings_lock = threading.Lock()
 
-def get_embeddings_model():
+
+def get_embeddings_model(backend: str = EMBEDDING_BACKEND):
     """
-    Get the embeddings model for vector representations.
+    Get the shared embeddings model for vector representations.
+    
+    The model is loaded on the first call for a backend and reused afterwards.
+    
+    Args:
+        backend (str, optional): "torch", "onnx" or "onnx-int8". Defaults to EMBEDDING_BACKEND.
     
     Returns:
-        HuggingFaceEmbeddings: The embeddings model
+        HuggingFaceEmbeddings: The embeddings model (an OnnxEmbeddings for the ONNX backends)
+    """
+    with _embeddings_lock:
+        if backend not in _embeddings_models:
+            _embeddings_models[backend] = _load_embeddings_model(backend)
+        return _embeddings_models[backend]
+
+
+def _load_embeddings_model(backend: str):
+    """
+    Load the weights of an embeddings model.
     """
+    if backend in ("onnx", "onnx-int8"):
+        from src.onnx_embeddings import load_onnx_embeddings
+        return load_onnx_embeddings(quantized=backend == "onnx-int8")
+    if backend != "torch":
+        raise ValueError(f"Unknown embedding backend: {backend}")
+    
     model_kwargs = {'device': 'cpu'}
     encode_kwargs = {'normalize_embeddings': True}
     
@@ -29,29 +59,104 @@ def get_embeddings_model():
     return embeddings
 
 
-def create_vector_store(documents: List[Document], persist: bool = True):
+def create_index(backend: str = VECTOR_INDEX_BACKEND):
+    """
+    Create an empty array index for the given backend.
+    
+    Args:
+        backend (str, optional): Index backend name. Defaults to VECTOR_INDEX_BACKEND.
+        
+    Returns:
+        An empty index
+    """
+    if backend == "exact":
+        return ExactIndex()
+    if backend == "int8":
+        return ScalarQuantizedIndex()
+    if backend == "binary":
+        return BinaryQuantizedIndex()
+    if backend == "ivf":
+        return IVFIndex()
+    if backend == "sharded":
+        return ShardedIndex()
+    raise ValueError(f"Unknown vector index backend: {backend}")
+
+
+def get_index_dir(backend: str = VECTOR_INDEX_BACKEND, store_dir: str = VECTOR_STORE_DIR) -> str:
+    """
+    Get the directory an array index backend persists to.
+    
+    Args:
+        backend (str, optional): Index backend name. Defaults to VECTOR_INDEX_BACKEND.
+        store_dir (str, optional): Vector store directory. Defaults to VECTOR_STORE_DIR.
+        
+    Returns:
+        str: Directory path inside the vector store directory
+    """
+    return os.path.join(store_dir, backend)
+
+
+def create_array_vector_store(documents: List[Document], persist: bool = True,
+                              store_dir: str = VECTOR_STORE_DIR) -> ArrayVectorStore:
+    """
+    Create a vector store backed by the configured array index.
+    
+    Args:
+        documents (List[Document]): List of documents to add to the vector store
+        persist (bool, optional): Whether to persist the vector store. Defaults to True.
+        store_dir (str, optional): Vector store directory. Defaults to VECTOR_STORE_DIR.
+        
+    Returns:
+        ArrayVectorStore: The vector store
+    """
+    embeddings = get_embeddings_model()
+    vector_store = ArrayVectorStore.from_documents(documents, embeddings, index=create_index())
+    
+    if persist:
+        index_dir = get_index_dir(store_dir=store_dir)
+        vector_store.save(index_dir)
+        print(f"Created and persisted {VECTOR_INDEX_BACKEND} vector store with {len(documents)} documents")
+        
+        # Serve sharded indexes from worker processes, as a loaded store would be
+        if hasattr(vector_store.index, "start_workers"):
+            vector_store.index.start_workers(index_dir)
+    else:
+        print(f"Created in-memory {VECTOR_INDEX_BACKEND} vector store with {len(documents)} documents")
+    
+    # Report recall loss and memory saved for quantized indexes
+    if hasattr(vector_store.index, "recall_report") and len(vector_store.index) > 0:
+        print(f"Quantized index quality vs exact search: {vector_store.index.recall_report()}")
+    
+    return vector_store
+
+
+def create_vector_store(documents: List[Document], persist: bool = True, store_dir: str = VECTOR_STORE_DIR):
     """
     Create a vector store from documents.
     
     Args:
         documents (List[Document]): List of documents to add to the vector store
         persist (bool, optional): Whether to persist the vector store. Defaults to True.
+        store_dir (str, optional): Directory to persist to. Defaults to VECTOR_STORE_DIR.
         
     Returns:
-        Chroma: The vector store
+        Chroma: The vector store (an ArrayVectorStore for non-Chroma backends)
     """
+    if VECTOR_INDEX_BACKEND != "chroma":
+        return create_array_vector_store(documents, persist, store_dir)
+    
     embeddings = get_embeddings_model()
     
     # Create vector store
     if persist:
         # Create directory if it doesn't exist
-        os.makedirs(VECTOR_STORE_DIR, exist_ok=True)
+        os.makedirs(store_dir, exist_ok=True)
         
         # Create persistent vector store
         vector_store = Chroma.from_documents(
             documents=documents,
             embedding=embeddings,
-            persist_directory=VECTOR_STORE_DIR
+            persist_directory=store_dir
         )
         
         # Persist to disk
@@ -68,26 +173,62 @@ def create_vector_store(documents: List[Document], persist: bool = True):
     return vector_store
 
 
-def load_vector_store():
+def load_vector_store(store_dir: str = VECTOR_STORE_DIR):
     """
     Load an existing vector store from disk.
     
+    Args:
+        store_dir (str, optional): Directory the vector store was persisted to. Defaults to VECTOR_STORE_DIR.
+    
     Returns:
-        Chroma: The loaded vector store, or None if it doesn't exist
+        Chroma: The loaded vector store (an ArrayVectorStore for non-Chroma backends), or None if it doesn't exist
     """
-    if not os.path.exists(VECTOR_STORE_DIR):
-        print(f"Vector store directory {VECTOR_STORE_DIR} does not exist")
+    if VECTOR_INDEX_BACKEND != "chroma":
+        index_dir = get_index_dir(store_dir=store_dir)
+        if not os.path.exists(os.path.join(index_dir, "index.json")):
+            print(f"Vector index {index_dir} does not exist")
+            return None
+        
+        try:
+            vector_store = ArrayVectorStore.load(index_dir, get_embeddings_model())
+            print(f"Loaded {VECTOR_INDEX_BACKEND} vector store from {index_dir}")
+            return vector_store
+        except Exception as e:
+            print(f"Error loading vector store: {e}")
+            return None
+    
+    if not os.path.exists(store_dir):
+        print(f"Vector store directory {store_dir} does not exist")
         return None
     
     embeddings = get_embeddings_model()
     
     try:
         vector_store = Chroma(
-            persist_directory=VECTOR_STORE_DIR,
+            persist_directory=store_dir,
             embedding_function=embeddings
         )
-        print(f"Loaded vector store from {VECTOR_STORE_DIR}")
+        print(f"Loaded vector store from {store_dir}")
         return vector_store
     except Exception as e:
         print(f"Error loading vector store: {e}")
-        return None 
\ No newline at end of file
+        return None
+
+def get_stored_documents(vector_store) -> List[Document]:
+    """
+    Get every document held by a vector store, in storage order.
+    
+    Args:
+        vector_store: Chroma or ArrayVectorStore instance
+        
+    Returns:
+        List[Document]: The stored documents
+    """
+    if isinstance(vector_store, ArrayVectorStore):
+        return [Document(page_content=text, metadata=metadata) for text, metadata in zip(vector_store.texts, vector_store.metadatas)]
+    
+    stored = vector_store._collection.get(include=["documents", "metadatas"])
+    return [
+        Document(page_content=text, metadata=metadata or {})
+        for text, metadata in zip(stored["documents"], stored["metadatas"])
+    ]
@@ -0,0 +1,273 @@
+"""
+Module for the entity-to-chunk index used by product queries.
+
+While FAQ documents are prepared, product, bank and feature entities are
+extracted from each chunk and recorded in an entity -> chunk postings map.
+A product query is then answered with a dictionary lookup and a small rank
+instead of several embedding searches. The index is persisted next to the
+vector store and updated incrementally: only new or changed chunks are
+re-extracted when the FAQ data changes.
+"""
+import hashlib
+import json
+import os
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+
+from langchain_core.documents import Document
+
+from src.config import ENTITY_INDEX_PATH
+
+# Entity vocabulary by type; aliases map alternative spellings to a canonical name
+ENTITY_LEXICON = {
+    "product": [
+        "zest money", "fi", "groww", "paytm", "jupiter", "freecharge", "lendingkart", "niyo",
+        "appreciate", "angel one", "edelweiss", "lic", "bajaj finserv", "gromo"
+    ],
+    "bank": [
+        "hdfc", "axis bank", "idfc", "kotak", "sbi", "icici", "federal bank", "indusind", "bob",
+        "bank of baroda", "au bank", "yes bank"
+    ],
+    "feature": [
+        "personal loan", "business loan", "credit card", "demat account", "savings account",
+        "mutual fund", "insurance", "payout", "commission", "gromo points", "emi", "kyc", "referral"
+    ],
+}
+
+ENTITY_ALIASES = {
+    "zest": "zest money",
+    "zestmoney": "zest money",
+    "fi money": "fi",
+    "angel broking": "angel one",
+    "bajaj": "bajaj finserv",
+    "axis": "axis bank",
+    "demat": "demat account",
+    "saving account": "savings account",
+    "gromo point": "gromo points",
+}
+
+_ENTITY_TYPES = {name: entity_type for entity_type, names in ENTITY_LEXICON.items() for name in names}
+_SURFACE_FORMS = {**{name: name for name in _ENTITY_TYPES}, **ENTITY_ALIASES}
+# Longest forms first so "zest money" wins over "zest"; a trailing "s" allows plurals
+_ENTITY_PATTERN = re.compile(
+    r"\b(" + "|".join(re.escape(form) for form in sorted(_SURFACE_FORMS, key=len, reverse=True)) + r")s?\b"
+)
+
+
+def extract_entities(text: str) -> Set[str]:
+    """
+    Extract canonical entity names mentioned in a text.
+
+    Args:
+        text (str): Text to scan
+
+    Returns:
+        Set[str]: Canonical entity names
+    """
+    return {_SURFACE_FORMS[match.group(1)] for match in _ENTITY_PATTERN.finditer(text.lower())}
+
+
+def entity_type(entity: str) -> str:
+    """
+    Get the type of a canonical entity name.
+
+    Args:
+        entity (str): Canonical entity name
+
+    Returns:
+        str: "product", "bank" or "feature"
+    """
+    return _ENTITY_TYPES[entity]
+
+
+def chunk_id(doc: Document) -> str:
+    """
+    Stable id of a chunk, derived from its content.
+
+    Args:
+        doc (Document): The chunk
+
+    Returns:
+        str: Hex digest identifying the chunk
+    """
+    return hashlib.sha1(doc.page_content.encode("utf-8")).hexdigest()[:16]
+
+
+class EntityIndex:
+    """
+    Entity -> chunk postings map over the FAQ chunks.
+    """
+
+    def __init__(self):
+        """
+        Initialize an empty index.
+        """
+        self.chunks = {}  # Chunk id -> {"text", "metadata", "entities"}
+        self.postings = defaultdict(dict)  # Entity -> {chunk id: 1 if the entity is in the FAQ question, else 0}
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def _add(self, cid: str, doc: Document):
+        question_entities = extract_entities(doc.metadata.get("question", ""))
+        entities = extract_entities(doc.page_content) | question_entities
+        self.chunks[cid] = {"text": doc.page_content, "metadata": doc.metadata, "entities": sorted(entities)}
+        for entity in entities:
+            self.postings[entity][cid] = int(entity in question_entities)
+
+    def _remove(self, cid: str):
+        for entity in self.chunks.pop(cid)["entities"]:
+            self.postings[entity].pop(cid, None)
+            if not self.postings[entity]:
+                del self.postings[entity]
+
+    def sync(self, documents: List[Document]) -> Dict[str, int]:
+        """
+        Bring the index in line with a chunk set, extracting entities only for new chunks.
+
+        Args:
+            documents (List[Document]): The current FAQ chunks
+
+        Returns:
+            Dict[str, int]: Number of chunks added, removed and unchanged
+        """
+        current = {chunk_id(doc): doc for doc in documents}
+        removed = [cid for cid in self.chunks if cid not in current]
+        for cid in removed:
+            self._remove(cid)
+
+        added = 0
+        for cid, doc in current.items():
+            if cid not in self.chunks:
+                self._add(cid, doc)
+                added += 1
+
+        return {"added": added, "removed": len(removed), "unchanged": len(current) - added}
+
+    def _rank(self, entities: Iterable[str], limit: int) -> List[str]:
+        scores = defaultdict(int)
+        for entity in entities:
+            for cid, in_question in self.postings.get(entity, {}).items():
+                scores[cid] += 5 + 10 * in_question
+        return sorted(scores, key=lambda cid: (-scores[cid], len(self.chunks[cid]["text"])))[:limit]
+
+    def lookup(self, entities: Iterable[str], limit: int = 10) -> List[Document]:
+        """
+        Rank chunks mentioning the given entities.
+
+        Chunks score 5 per matched entity, plus 10 when the entity appears in
+        the chunk's FAQ question; shorter chunks win ties.
+
+        Args:
+            entities (Iterable[str]): Canonical entity names
+            limit (int, optional): Maximum chunks returned. Defaults to 10.
+
+        Returns:
+            List[Document]: Best matching chunks
+        """
+        return [
+            Document(page_content=self.chunks[cid]["text"], metadata=self.chunks[cid]["metadata"])
+            for cid in self._rank(entities, limit)
+        ]
+
+    def _query_entities(self, query: str, entity_types: Iterable[str]) -> List[str]:
+        entities = [entity for entity in extract_entities(query) if entity_type(entity) in entity_types]
+        if entities:
+            print(f"Entity index lookup for: {', '.join(sorted(entities))}")
+        return entities
+
+    def search(self, query: str, entity_types: Iterable[str] = ("product", "bank"), limit: int = 10) -> List[Document]:
+        """
+        Find chunks about the entities mentioned in a query.
+
+        Args:
+            query (str): User query
+            entity_types (Iterable[str], optional): Entity types to match. Defaults to products and banks.
+            limit (int, optional): Maximum chunks returned. Defaults to 10.
+
+        Returns:
+            List[Document]: Best matching chunks, or an empty list if the query names no such entity
+        """
+        return self.lookup(self._query_entities(query, entity_types), limit)
+
+    def search_texts(self, query: str, entity_types: Iterable[str] = ("product", "bank"), limit: int = 10) -> List[str]:
+        """
+        Like search, but return only the chunk texts.
+
+        Args:
+            query (str): User query
+            entity_types (Iterable[str], optional): Entity types to match. Defaults to products and banks.
+            limit (int, optional): Maximum chunks returned. Defaults to 10.
+
+        Returns:
+            List[str]: Texts of the best matching chunks
+        """
+        return [self.chunks[cid]["text"] for cid in self._rank(self._query_entities(query, entity_types), limit)]
+
+    def save(self, path: str = ENTITY_INDEX_PATH):
+        """
+        Persist the index as JSON.
+
+        Args:
+            path (str, optional): Target file
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({"chunks": self.chunks, "postings": self.postings}, f)
+
+    @classmethod
+    def load(cls, path: str = ENTITY_INDEX_PATH) -> Optional["EntityIndex"]:
+        """
+        Load a persisted index.
+
+        Args:
+            path (str, optional): File the index was saved to
+
+        Returns:
+            Optional[EntityIndex]: The loaded index, or None if it does not exist
+        """
+        if not os.path.exists(path):
+            return None
+
+        index = cls()
+        with open(path) as f:
+            data = json.load(f)
+        index.chunks = data["chunks"]
+        index.postings = defaultdict(dict, data["postings"])
+        return index
+
+
+def entity_index_path(store_dir: str) -> str:
+    """
+    Get where the entity index of a vector store directory is persisted.
+
+    Args:
+        store_dir (str): Vector store directory
+
+    Returns:
+        str: Entity index file (ENTITY_INDEX_PATH for the default vector store)
+    """
+    return os.path.join(store_dir, os.path.basename(ENTITY_INDEX_PATH))
+
+
+def update_entity_index(documents: List[Document], path: str = ENTITY_INDEX_PATH) -> EntityIndex:
+    """
+    Incrementally update the persisted entity index to match a chunk set.
+
+    Args:
+        documents (List[Document]): The current FAQ chunks
+        path (str, optional): File the index is persisted to
+
+    Returns:
+        EntityIndex: The updated index
+    """
+    index = EntityIndex.load(path)
+    exists = index is not None
+    index = index or EntityIndex()
+    changes = index.sync(documents)
+    if not exists or changes["added"] or changes["removed"]:
+        index.save(path)
+    print(f"Updated entity index ({changes['added']} chunks added, {changes['removed']} removed, "
+          f"{changes['unchanged']} unchanged; {len(index.postings)} entities)")
+    return index
@@ -0,0 +1,370 @@
+"""
+Module for prebuilt, checksummed index artifacts.
+
+An artifact is a .tar.gz of the vector store directory (the vector index,
+entity index and trained intent router) plus a manifest recording the
+embedding model, index backend, corpus hash and a SHA-256 checksum of every
+file. It is built once and installed on new instances, which then start
+without re-embedding the FAQ. Installation verifies the checksums and refuses
+artifacts built for a different embedding model, index backend or FAQ.
+
+A copy of the manifest is published next to the archive
+(<artifact>.manifest.json), so an instance that already has the artifact
+installed can tell from that small file alone that there is nothing to
+download.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tarfile
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_core.documents import Document
+
+from src.config import EMBEDDING_MODEL_NAME, EMBEDDING_BACKEND, VECTOR_INDEX_BACKEND, VECTOR_STORE_DIR
+
+ARTIFACT_FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+MANIFEST_SUFFIX = ".manifest.json"  # Published manifest: <artifact>.manifest.json
+
+
+class ArtifactError(Exception):
+    """
+    Raised when an artifact is corrupt or incompatible with this configuration.
+    """
+
+
+def file_sha256(path: str) -> str:
+    """
+    Compute the SHA-256 checksum of a file.
+
+    Args:
+        path (str): File to hash
+
+    Returns:
+        str: Hex digest
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def corpus_hash(documents: List[Document]) -> str:
+    """
+    Hash a chunk set independently of its order.
+
+    Args:
+        documents (List[Document]): FAQ chunks
+
+    Returns:
+        str: Hex digest
+    """
+    digest = hashlib.sha256()
+    for text in sorted(doc.page_content for doc in documents):
+        digest.update(text.encode("utf-8") + b"\x00")
+    return digest.hexdigest()
+
+
+def build_manifest(directory: str, documents: List[Document]) -> Dict[str, Any]:
+    """
+    Describe the index files in a directory.
+
+    Args:
+        directory (str): Vector store directory
+        documents (List[Document]): The chunks the indexes were built from
+
+    Returns:
+        Dict[str, Any]: Manifest with configuration, corpus hash and per-file checksums
+    """
+    files = {}
+    for root, _, names in os.walk(directory):
+        for name in sorted(names):
+            path = os.path.join(root, name)
+            relative = os.path.relpath(path, directory)
+            if relative == MANIFEST_FILE:
+                continue
+            files[relative] = {"sha256": file_sha256(path), "bytes": os.path.getsize(path)}
+
+    return {
+        "format_version": ARTIFACT_FORMAT_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "embedding_model": EMBEDDING_MODEL_NAME,
+        "embedding_backend": EMBEDDING_BACKEND,
+        "vector_index_backend": VECTOR_INDEX_BACKEND,
+        "corpus_hash": corpus_hash(documents),
+        "chunks": len(documents),
+        "files": dict(sorted(files.items())),
+    }
+
+
+def check_compatible(manifest: Dict[str, Any], expected_corpus_hash: Optional[str] = None):
+    """
+    Check that an artifact was built for this configuration.
+
+    Args:
+        manifest (Dict[str, Any]): The artifact's manifest
+        expected_corpus_hash (str, optional): corpus_hash() of the current FAQ chunks; not checked if omitted
+
+    Raises:
+        ArtifactError: If the format, embedding model, index backend or FAQ differ
+    """
+    if manifest.get("format_version") != ARTIFACT_FORMAT_VERSION:
+        raise ArtifactError(f"Unsupported artifact format version: {manifest.get('format_version')}")
+    expected = {
+        "embedding_model": EMBEDDING_MODEL_NAME,
+        "vector_index_backend": VECTOR_INDEX_BACKEND,
+    }
+    for key, value in expected.items():
+        if manifest.get(key) != value:
+            raise ArtifactError(f"Artifact {key} is {manifest.get(key)!r}, but this instance uses {value!r}")
+    if expected_corpus_hash is not None and manifest.get("corpus_hash") != expected_corpus_hash:
+        raise ArtifactError("Artifact was built from a different FAQ than the one configured")
+
+
+def verify_directory(directory: str, manifest: Optional[Dict[str, Any]] = None, checksums: bool = True,
+                     expected_corpus_hash: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Check an unpacked artifact against its manifest and the current configuration.
+
+    Without checksums only file sizes are compared, and every file must be
+    older than the installed manifest (which is touched on install), which
+    catches in-place modification without reading the files.
+
+    Args:
+        directory (str): Directory holding the index files and manifest
+        manifest (Dict[str, Any], optional): Manifest to check against; read from the directory if omitted
+        checksums (bool, optional): Hash every file instead of the size and modification time check
+        expected_corpus_hash (str, optional): corpus_hash() of the current FAQ chunks; not checked if omitted
+
+    Returns:
+        Dict[str, Any]: The verified manifest
+
+    Raises:
+        ArtifactError: If a file is missing or altered, or the artifact does not match this configuration
+    """
+    manifest_path = os.path.join(directory, MANIFEST_FILE)
+    if manifest is None:
+        if not os.path.exists(manifest_path):
+            raise ArtifactError(f"No {MANIFEST_FILE} in {directory}")
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+    check_compatible(manifest, expected_corpus_hash)
+    installed_at = None if checksums else os.path.getmtime(manifest_path)
+    for relative, info in manifest["files"].items():
+        path = os.path.join(directory, relative)
+        if not os.path.exists(path):
+            raise ArtifactError(f"Artifact file missing: {relative}")
+        if os.path.getsize(path) != info["bytes"]:
+            raise ArtifactError(f"Size mismatch for {relative}")
+        if checksums and file_sha256(path) != info["sha256"]:
+            raise ArtifactError(f"Checksum mismatch for {relative}")
+        if not checksums and os.path.getmtime(path) > installed_at:
+            raise ArtifactError(f"{relative} was modified after the artifact was installed")
+
+    return manifest
+
+
+def build_artifact(output_path: str, documents: List[Document], directory: str = VECTOR_STORE_DIR) -> Dict[str, Any]:
+    """
+    Package a built vector store directory as a checksummed artifact.
+
+    Args:
+        output_path (str): Target .tar.gz file
+        documents (List[Document]): The chunks the indexes were built from
+        directory (str, optional): Vector store directory to package
+
+    Returns:
+        Dict[str, Any]: The artifact's manifest
+    """
+    manifest = build_manifest(directory, documents)
+    with open(os.path.join(directory, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with tarfile.open(output_path, "w:gz") as archive:
+        archive.add(directory, arcname=".")
+    with open(output_path + MANIFEST_SUFFIX, "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    total_mb = sum(info["bytes"] for info in manifest["files"].values()) / 2 ** 20
+    print(f"Built index artifact {output_path} ({len(manifest['files'])} files, {total_mb:.1f} MB uncompressed, "
+          f"{os.path.getsize(output_path) / 2 ** 20:.1f} MB compressed)")
+    return manifest
+
+
+def _fetch(source: str, workdir: str) -> str:
+    """
+    Get a local copy of an artifact, downloading it if it is an s3:// URL.
+    """
+    if not source.startswith("s3://"):
+        return source
+
+    import boto3
+
+    bucket, _, key = source[len("s3://"):].partition("/")
+    local_path = os.path.join(workdir, os.path.basename(key) or "artifact.tar.gz")
+    print(f"Downloading index artifact from {source}...")
+    boto3.client("s3").download_file(bucket, key, local_path)
+    return local_path
+
+
+def _fetch_manifest(source: str) -> Optional[Dict[str, Any]]:
+    """
+    Read the manifest published next to an artifact, without downloading the archive.
+
+    Returns:
+        Optional[Dict[str, Any]]: The manifest, or None if none was published
+    """
+    if not source.startswith("s3://"):
+        if not os.path.exists(source + MANIFEST_SUFFIX):
+            return None
+        with open(source + MANIFEST_SUFFIX) as f:
+            return json.load(f)
+
+    import boto3
+    from botocore.exceptions import ClientError
+
+    bucket, _, key = source[len("s3://"):].partition("/")
+    try:
+        response = boto3.client("s3").get_object(Bucket=bucket, Key=key + MANIFEST_SUFFIX)
+    except ClientError as e:
+        print(f"No published manifest for {source} ({e}); checking the archive itself")
+        return None
+    return json.loads(response["Body"].read())
+
+
+def _safe_extract(archive: tarfile.TarFile, target: str):
+    """
+    Extract an archive, rejecting members that would escape the target directory.
+    """
+    root = os.path.realpath(target)
+    for member in archive.getmembers():
+        destination = os.path.realpath(os.path.join(target, member.name))
+        if not (destination == root or destination.startswith(root + os.sep)) or member.issym() or member.islnk():
+            raise ArtifactError(f"Unsafe path in artifact: {member.name}")
+    if hasattr(tarfile, "data_filter"):
+        archive.extractall(target, filter="data")
+    else:
+        archive.extractall(target)
+
+
+def verify_artifact(source: str) -> Dict[str, Any]:
+    """
+    Unpack an artifact to a temporary directory and verify it.
+
+    Args:
+        source (str): Local .tar.gz path or s3:// URL
+
+    Returns:
+        Dict[str, Any]: The verified manifest
+
+    Raises:
+        ArtifactError: If the artifact is corrupt or built for a different configuration
+    """
+    workdir = tempfile.mkdtemp(prefix="artifact_verify_")
+    try:
+        with tarfile.open(_fetch(source, workdir), "r:gz") as archive:
+            _safe_extract(archive, os.path.join(workdir, "unpacked"))
+        return verify_directory(os.path.join(workdir, "unpacked"))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def installed_manifest(directory: str = VECTOR_STORE_DIR) -> Optional[Dict[str, Any]]:
+    """
+    Read the manifest of the artifact installed in a directory.
+
+    Args:
+        directory (str, optional): Vector store directory
+
+    Returns:
+        Optional[Dict[str, Any]]: The manifest, or None if no artifact is installed
+    """
+    path = os.path.join(directory, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _already_installed(directory: str, manifest: Dict[str, Any]) -> bool:
+    """
+    Check whether an artifact is installed unmodified, by file sizes and modification times.
+    """
+    if installed_manifest(directory) != manifest:
+        return False
+    try:
+        verify_directory(directory, manifest, checksums=False)
+        return True
+    except ArtifactError as e:
+        # The store may have been modified in place since; install a clean copy
+        print(f"Installed index artifact no longer matches its manifest ({e}); reinstalling")
+        return False
+
+
+def install_artifact(source: str, directory: str = VECTOR_STORE_DIR,
+                     expected_corpus_hash: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Verify an artifact and install it as the vector store directory.
+
+    The artifact is unpacked and verified next to the target and then swapped
+    in, so a failed install leaves the existing store untouched. If the same
+    artifact is already installed and unmodified, nothing is unpacked, and
+    when the artifact's manifest was published next to it nothing is
+    downloaded either.
+
+    Args:
+        source (str): Local .tar.gz path or s3:// URL
+        directory (str, optional): Vector store directory to install into
+        expected_corpus_hash (str, optional): corpus_hash() of the current FAQ chunks; not checked if omitted
+
+    Returns:
+        Dict[str, Any]: The installed manifest
+
+    Raises:
+        ArtifactError: If the artifact is corrupt or built for a different configuration
+    """
+    started = time.perf_counter()
+    published = _fetch_manifest(source)
+    if published is not None:
+        check_compatible(published, expected_corpus_hash)
+        if _already_installed(directory, published):
+            print(f"Index artifact already installed in {directory}; checked its published manifest "
+                  f"in {time.perf_counter() - started:.2f}s")
+            return published
+
+    parent = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    workdir = tempfile.mkdtemp(prefix=".artifact_", dir=parent)
+    try:
+        with tarfile.open(_fetch(source, workdir), "r:gz") as archive:
+            manifest_member = archive.extractfile(f"./{MANIFEST_FILE}")
+            if manifest_member is None:
+                raise ArtifactError(f"No {MANIFEST_FILE} in {source}")
+            manifest = json.load(manifest_member)
+
+            check_compatible(manifest, expected_corpus_hash)
+            if published is None and _already_installed(directory, manifest):
+                print(f"Index artifact already installed in {directory}; checked in {time.perf_counter() - started:.2f}s")
+                return manifest
+
+            unpacked = os.path.join(workdir, "unpacked")
+            _safe_extract(archive, unpacked)
+
+        verify_directory(unpacked, manifest)
+        if os.path.exists(directory):
+            shutil.rmtree(directory)
+        os.replace(unpacked, directory)
+        # Files modified after this point fail the quick check on later boots
+        os.utime(os.path.join(directory, MANIFEST_FILE))
+        print(f"Installed index artifact ({manifest['chunks']} chunks, built {manifest['created_at']}) "
+              f"into {directory} in {time.perf_counter() - started:.2f}s")
+        return manifest
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
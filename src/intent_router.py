@@ -0,0 +1,290 @@
+"""
+Module for routing queries to the cheapest sufficient retrieval and model path.
+
+A nearest-centroid classifier over the query embedding assigns one of five
+intents. Centroids are trained from the FAQ questions (labelled by their
+entities) plus a few seed examples per intent, and persisted next to the
+vector store. A query almost identical to a stored FAQ question is routed as
+an exact FAQ match. Each intent maps to the retrieval strategies to run,
+whether web search fires, and which model answers. Decisions are appended to
+a JSONL log for analysis.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+
+from src.config import (
+    EMBEDDING_MODEL_NAME,
+    MISTRAL_MODEL_NAME,
+    ROUTER_SMALL_MODEL_NAME,
+    ROUTER_PATH,
+    ROUTER_LOG_PATH,
+    ROUTER_EXACT_MATCH_THRESHOLD,
+    ROUTER_MIN_CONFIDENCE
+)
+from src.entity_index import entity_type, extract_entities
+
+ALL_STRATEGIES = ("direct", "product", "dense", "keyword")
+
+# Retrieval strategies, web search (True: always, False: never, None: only if FAQ retrieval
+# comes up short) and model for each intent
+INTENT_ROUTES = {
+    "exact_faq": {"strategies": ("direct", "dense"), "web_search": False, "model": ROUTER_SMALL_MODEL_NAME},
+    "product_info": {"strategies": ("direct", "product", "dense"), "web_search": None, "model": ROUTER_SMALL_MODEL_NAME},
+    "commission": {"strategies": ("direct", "product", "dense", "keyword"), "web_search": False, "model": ROUTER_SMALL_MODEL_NAME},
+    "general": {"strategies": ALL_STRATEGIES, "web_search": None, "model": MISTRAL_MODEL_NAME},
+    "web_needed": {"strategies": ("dense",), "web_search": True, "model": MISTRAL_MODEL_NAME},
+}
+
+# Seed examples, so every intent has a centroid even if no FAQ question carries its label
+SEED_EXAMPLES = {
+    "product_info": [
+        "What is Zest Money?",
+        "Tell me about Fi money",
+        "What are the features of the HDFC credit card?",
+        "Is Groww a good demat account?",
+    ],
+    "commission": [
+        "How much commission do I earn?",
+        "What is the payout for personal loans?",
+        "When will I receive my payout?",
+        "How are GroMo points calculated?",
+    ],
+    "general": [
+        "How do I become a Gromo partner?",
+        "How do I contact customer support?",
+        "How do I track my sales in the app?",
+        "Can I change my bank account details?",
+    ],
+    "web_needed": [
+        "What is the current RBI repo rate?",
+        "Latest news about fintech regulation in India",
+        "Compare today's home loan interest rates across banks",
+        "What is the share price of Paytm today?",
+        "Who is the CEO of Federal Bank?",
+    ],
+}
+
+_COMMISSION_TERMS = ("commission", "payout", "earn", "gromo points", "incentive")
+
+
+def label_question(question: str) -> str:
+    """
+    Weakly label an FAQ question with an intent from its entities and terms.
+
+    Args:
+        question (str): FAQ question
+
+    Returns:
+        str: "commission", "product_info" or "general"
+    """
+    lower = question.lower()
+    if any(term in lower for term in _COMMISSION_TERMS):
+        return "commission"
+    if any(entity_type(entity) in ("product", "bank") and entity != "gromo" for entity in extract_entities(lower)):
+        return "product_info"
+    return "general"
+
+
+class RouteDecision:
+    """
+    Routing outcome for one query.
+    """
+
+    def __init__(self, intent: str, confidence: float, scores: Dict[str, float]):
+        route = INTENT_ROUTES[intent]
+        self.intent = intent
+        self.confidence = confidence
+        self.scores = scores
+        self.strategies = set(route["strategies"])
+        self.web_search = route["web_search"]
+        self.model = route["model"]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "intent": self.intent,
+            "confidence": round(self.confidence, 4),
+            "scores": {intent: round(score, 4) for intent, score in self.scores.items()},
+            "strategies": sorted(self.strategies),
+            "web_search": self.web_search,
+            "model": self.model,
+        }
+
+
+class IntentRouter:
+    """
+    Nearest-centroid intent classifier over query embeddings.
+    """
+
+    def __init__(self, intents: List[str], centroids: np.ndarray, faq_vectors: np.ndarray, fingerprint: str,
+                 log_path: Optional[str] = ROUTER_LOG_PATH):
+        """
+        Initialize a trained router.
+
+        Args:
+            intents (List[str]): Intent names, aligned with centroid rows
+            centroids (np.ndarray): Normalized centroids of shape (intents, dim)
+            faq_vectors (np.ndarray): FAQ question embeddings used to detect exact FAQ matches
+            fingerprint (str): Hash of the training data
+            log_path (str, optional): JSONL file routing decisions are appended to; None disables logging
+        """
+        self.intents = intents
+        self.centroids = centroids
+        self.faq_vectors = faq_vectors
+        self.fingerprint = fingerprint
+        self.log_path = log_path
+        self._log_lock = threading.Lock()
+
+    @staticmethod
+    def training_fingerprint(questions: List[str]) -> str:
+        """
+        Hash the training inputs, so a changed FAQ or embedding model triggers retraining.
+
+        Args:
+            questions (List[str]): FAQ questions
+
+        Returns:
+            str: Hex digest
+        """
+        payload = json.dumps([EMBEDDING_MODEL_NAME, sorted(questions), SEED_EXAMPLES], sort_keys=True)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def train(cls, questions: List[str], embeddings) -> "IntentRouter":
+        """
+        Train centroids from FAQ questions and the seed examples.
+
+        Args:
+            questions (List[str]): FAQ questions
+            embeddings: Embeddings model used for queries
+
+        Returns:
+            IntentRouter: The trained router
+        """
+        texts = list(questions)
+        labels = [label_question(question) for question in questions]
+        for intent, examples in SEED_EXAMPLES.items():
+            texts.extend(examples)
+            labels.extend([intent] * len(examples))
+
+        vectors = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+        labels = np.array(labels)
+        intents = [intent for intent in INTENT_ROUTES if intent != "exact_faq"]
+        centroids = np.vstack([vectors[labels == intent].mean(axis=0) for intent in intents])
+        centroids /= np.linalg.norm(centroids, axis=1, keepdims=True)
+
+        counts = {intent: int((labels == intent).sum()) for intent in intents}
+        print(f"Trained intent router on {len(texts)} examples: {counts}")
+        return cls(intents, centroids, vectors[:len(questions)], cls.training_fingerprint(questions))
+
+    def route(self, query: str, query_vector: List[float], log: bool = True) -> RouteDecision:
+        """
+        Classify a query and log the decision.
+
+        Args:
+            query (str): User query (for the log)
+            query_vector (List[float]): Normalized query embedding
+            log (bool, optional): Append the decision to the routing log; off for replayed warm-up queries
+
+        Returns:
+            RouteDecision: Intent, strategies, web search policy and model
+        """
+        vector = np.asarray(query_vector, dtype=np.float32)
+        similarities = self.centroids @ vector
+        scores = {intent: float(score) for intent, score in zip(self.intents, similarities)}
+        best = int(np.argmax(similarities))
+        intent, confidence = self.intents[best], float(similarities[best])
+
+        exact_similarity = float((self.faq_vectors @ vector).max()) if len(self.faq_vectors) else 0.0
+        if exact_similarity >= ROUTER_EXACT_MATCH_THRESHOLD:
+            intent, confidence = "exact_faq", exact_similarity
+        elif confidence < ROUTER_MIN_CONFIDENCE:
+            # Far from every centroid; fall back to the full pipeline
+            intent = "general"
+
+        decision = RouteDecision(intent, confidence, scores)
+        if log:
+            self._log(query, decision)
+        return decision
+
+    def _log(self, query: str, decision: RouteDecision):
+        print(f"Routed query as {decision.intent} ({decision.confidence:.2f}): "
+              f"strategies={sorted(decision.strategies)}, web_search={decision.web_search}, model={decision.model}")
+        if not self.log_path:
+            return
+        record = {"timestamp": time.time(), "query": query, **decision.to_dict()}
+        try:
+            with self._log_lock:
+                os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+                with open(self.log_path, "a") as f:
+                    f.write(json.dumps(record) + "\n")
+        except OSError as e:
+            print(f"Could not write routing log: {e}")
+
+    def save(self, path: str = ROUTER_PATH):
+        """
+        Persist the trained router.
+
+        Args:
+            path (str, optional): Target .npz file
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez(path, intents=np.array(self.intents), centroids=self.centroids,
+                 faq_vectors=self.faq_vectors, fingerprint=np.array(self.fingerprint))
+
+    @classmethod
+    def load(cls, path: str = ROUTER_PATH) -> Optional["IntentRouter"]:
+        """
+        Load a persisted router.
+
+        Args:
+            path (str, optional): File the router was saved to
+
+        Returns:
+            Optional[IntentRouter]: The loaded router, or None if it does not exist
+        """
+        if not os.path.exists(path):
+            return None
+        data = np.load(path)
+        return cls(data["intents"].tolist(), data["centroids"], data["faq_vectors"], str(data["fingerprint"]))
+
+
+def router_path(store_dir: str) -> str:
+    """
+    Get where the intent router of a vector store directory is persisted.
+
+    Args:
+        store_dir (str): Vector store directory
+
+    Returns:
+        str: Router file (ROUTER_PATH for the default vector store)
+    """
+    return os.path.join(store_dir, os.path.basename(ROUTER_PATH))
+
+
+def load_or_train_router(documents: List[Document], embeddings, path: str = ROUTER_PATH) -> IntentRouter:
+    """
+    Load the persisted router, retraining it if the FAQ questions have changed.
+
+    Args:
+        documents (List[Document]): Stored FAQ documents with "question" metadata
+        embeddings: Embeddings model used for queries
+        path (str, optional): File the router is persisted to
+
+    Returns:
+        IntentRouter: A router trained on the current FAQ
+    """
+    questions = list(dict.fromkeys(doc.metadata["question"] for doc in documents if doc.metadata.get("question")))
+    router = IntentRouter.load(path)
+    if router is not None and router.fingerprint == IntentRouter.training_fingerprint(questions):
+        return router
+
+    router = IntentRouter.train(questions, embeddings)
+    router.save(path)
+    return router
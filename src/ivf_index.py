@@ -0,0 +1,294 @@
+"""
+Module for an IVF (inverted file) vector index for large corpora.
+
+A k-means coarse quantizer partitions the vectors into nlist clusters, each
+with its own inverted list. Queries only scan the nprobe clusters whose
+centroids are closest, trading recall for speed. Lists grow with amortized
+doubling so incremental adds stay cheap, and saved indexes are memory-mapped
+on load.
+"""
+import json
+import os
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from src.config import IVF_NLIST, IVF_NPROBE, IVF_TRAIN_SAMPLE, IVF_TRAIN_ITERATIONS
+from src.vector_index import register_index, save_array, top_k
+
+# Rows assigned per block during training and adds, bounding temporary memory
+_BLOCK_SIZE = 16384
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """
+    Assign each vector to the centroid with the highest inner product.
+
+    Args:
+        vectors (np.ndarray): Vectors of shape (n, dim)
+        centroids (np.ndarray): Centroids of shape (nlist, dim)
+
+    Returns:
+        np.ndarray: Cluster id of each vector
+    """
+    assignments = np.empty(vectors.shape[0], dtype=np.int32)
+    for start in range(0, vectors.shape[0], _BLOCK_SIZE):
+        block = np.asarray(vectors[start:start + _BLOCK_SIZE], dtype=np.float32)
+        assignments[start:start + block.shape[0]] = np.argmax(block @ centroids.T, axis=1)
+    return assignments
+
+
+def train_kmeans(vectors: np.ndarray, nlist: int, iterations: int = IVF_TRAIN_ITERATIONS, seed: int = 0) -> np.ndarray:
+    """
+    Train spherical k-means centroids (embeddings are normalized).
+
+    Args:
+        vectors (np.ndarray): Training vectors of shape (n, dim)
+        nlist (int): Number of clusters
+        iterations (int, optional): Lloyd iterations
+        seed (int, optional): Random seed. Defaults to 0.
+
+    Returns:
+        np.ndarray: Normalized centroids of shape (nlist, dim)
+    """
+    rng = np.random.default_rng(seed)
+    vectors = np.asarray(vectors, dtype=np.float32)
+    centroids = vectors[rng.choice(vectors.shape[0], size=nlist, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignments = _assign(vectors, centroids)
+        counts = np.bincount(assignments, minlength=nlist)
+
+        # Per-cluster sums via one sort and reduceat (much faster than np.add.at)
+        order = np.argsort(assignments, kind="stable")
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        sums = np.zeros_like(centroids)
+        nonempty = np.flatnonzero(counts)
+        sums[nonempty] = np.add.reduceat(vectors[order], starts[nonempty], axis=0)
+
+        # Re-seed empty clusters with random training vectors
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            sums[empty] = vectors[rng.choice(vectors.shape[0], size=len(empty), replace=False)]
+
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        centroids = sums / np.maximum(norms, 1e-12)
+
+    return centroids.astype(np.float32)
+
+
+@register_index("ivf")
+class IVFIndex:
+    """
+    Inverted file index with a k-means coarse quantizer.
+    """
+
+    def __init__(self, dim: Optional[int] = None, nlist: int = IVF_NLIST, nprobe: int = IVF_NPROBE,
+                 train_sample: int = IVF_TRAIN_SAMPLE):
+        """
+        Initialize an untrained index.
+
+        Args:
+            dim (int, optional): Embedding dimension, inferred on training if omitted
+            nlist (int, optional): Number of clusters (capped by the training set size)
+            nprobe (int, optional): Clusters scanned per query; higher is slower with better recall
+            train_sample (int, optional): Maximum vectors used to train the coarse quantizer
+        """
+        self.dim = dim
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_sample = train_sample
+        self.centroids = None
+        self.list_vectors = []
+        self.list_ids = []
+        self.list_sizes = np.zeros(0, dtype=np.int64)
+        self.ntotal = 0
+        self._mapped = set()  # Lists still backed by the memory-mapped file
+
+    def __len__(self) -> int:
+        return self.ntotal
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def train(self, vectors: np.ndarray, seed: int = 0):
+        """
+        Train the coarse quantizer.
+
+        Args:
+            vectors (np.ndarray): Representative vectors of shape (n, dim)
+            seed (int, optional): Random seed. Defaults to 0.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        rng = np.random.default_rng(seed)
+        if vectors.shape[0] > self.train_sample:
+            vectors = vectors[np.sort(rng.choice(vectors.shape[0], size=self.train_sample, replace=False))]
+
+        # Keep roughly 39+ training points per centroid, as k-means needs
+        self.nlist = max(1, min(self.nlist, vectors.shape[0] // 39 or 1))
+        self.dim = vectors.shape[1]
+        self.centroids = train_kmeans(vectors, self.nlist, seed=seed)
+        self.list_vectors = [np.empty((0, self.dim), dtype=np.float32) for _ in range(self.nlist)]
+        self.list_ids = [np.empty(0, dtype=np.int64) for _ in range(self.nlist)]
+        self.list_sizes = np.zeros(self.nlist, dtype=np.int64)
+        print(f"Trained IVF coarse quantizer with {self.nlist} lists on {vectors.shape[0]} vectors")
+
+    def _reserve(self, list_id: int, needed: int):
+        """
+        Grow a list's buffers with amortized doubling.
+        """
+        size = self.list_sizes[list_id]
+        capacity = self.list_vectors[list_id].shape[0]
+        if list_id not in self._mapped and size + needed <= capacity:
+            return
+
+        new_capacity = max(size + needed, 2 * capacity, 16)
+        vectors = np.empty((new_capacity, self.dim), dtype=np.float32)
+        ids = np.empty(new_capacity, dtype=np.int64)
+        vectors[:size] = self.list_vectors[list_id][:size]
+        ids[:size] = self.list_ids[list_id][:size]
+        self.list_vectors[list_id] = vectors
+        self.list_ids[list_id] = ids
+        self._mapped.discard(list_id)
+
+    def add(self, vectors: np.ndarray):
+        """
+        Append vectors; ids are assigned sequentially. Trains on the first batch if untrained.
+
+        Args:
+            vectors (np.ndarray): Vectors of shape (n, dim)
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if not self.is_trained:
+            self.train(vectors)
+
+        assignments = _assign(vectors, self.centroids)
+        ids = np.arange(self.ntotal, self.ntotal + vectors.shape[0], dtype=np.int64)
+
+        order = np.argsort(assignments, kind="stable")
+        boundaries = np.searchsorted(assignments[order], np.arange(self.nlist + 1))
+        for list_id in range(self.nlist):
+            members = order[boundaries[list_id]:boundaries[list_id + 1]]
+            if len(members) == 0:
+                continue
+            self._reserve(list_id, len(members))
+            size = self.list_sizes[list_id]
+            self.list_vectors[list_id][size:size + len(members)] = vectors[members]
+            self.list_ids[list_id][size:size + len(members)] = ids[members]
+            self.list_sizes[list_id] = size + len(members)
+
+        self.ntotal += vectors.shape[0]
+
+    def search(self, queries: np.ndarray, k: int, nprobe: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the k nearest vectors for each query by scanning the nprobe closest lists.
+
+        Args:
+            queries (np.ndarray): Query vectors of shape (m, dim)
+            k (int): Number of results per query
+            nprobe (int, optional): Overrides the index's nprobe for this call
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Scores and ids, each of shape (m, k); missing results have id -1
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        _, probes = top_k(queries @ self.centroids.T, nprobe)
+
+        all_scores = np.full((queries.shape[0], k), -np.inf, dtype=np.float32)
+        all_ids = np.full((queries.shape[0], k), -1, dtype=np.int64)
+        for row, (query, lists) in enumerate(zip(queries, probes)):
+            scores, ids = [], []
+            for list_id in lists:
+                size = self.list_sizes[list_id]
+                if size == 0:
+                    continue
+                scores.append(self.list_vectors[list_id][:size] @ query)
+                ids.append(self.list_ids[list_id][:size])
+            if not scores:
+                continue
+
+            scores = np.concatenate(scores)
+            ids = np.concatenate(ids)
+            best_scores, best = top_k(scores[None, :], k)
+            all_scores[row, :best.shape[1]] = best_scores[0]
+            all_ids[row, :best.shape[1]] = ids[best[0]]
+
+        return all_scores, all_ids
+
+    def memory_bytes(self) -> int:
+        """
+        Get the resident memory used by the index arrays.
+
+        Returns:
+            int: Bytes (memory-mapped lists are not counted)
+        """
+        total = self.centroids.nbytes if self.centroids is not None else 0
+        for list_id in range(len(self.list_vectors)):
+            if list_id not in self._mapped:
+                total += self.list_vectors[list_id].nbytes + self.list_ids[list_id].nbytes
+        return int(total)
+
+    def save(self, directory: str):
+        """
+        Persist the index with each inverted list stored contiguously.
+
+        Args:
+            directory (str): Target directory
+        """
+        os.makedirs(directory, exist_ok=True)
+        offsets = np.concatenate([[0], np.cumsum(self.list_sizes)]).astype(np.int64)
+
+        # Lists loaded from this directory are still mapped from its files, so
+        # the new files are written aside and renamed over the old ones
+        vectors_path = os.path.join(directory, "vectors.npy")
+        vectors = np.lib.format.open_memmap(
+            vectors_path + ".tmp", mode="w+", dtype=np.float32, shape=(self.ntotal, self.dim)
+        )
+        ids = np.empty(self.ntotal, dtype=np.int64)
+        for list_id in range(self.nlist):
+            size = self.list_sizes[list_id]
+            vectors[offsets[list_id]:offsets[list_id + 1]] = self.list_vectors[list_id][:size]
+            ids[offsets[list_id]:offsets[list_id + 1]] = self.list_ids[list_id][:size]
+        vectors.flush()
+        del vectors
+        os.replace(vectors_path + ".tmp", vectors_path)
+
+        save_array(os.path.join(directory, "ids.npy"), ids)
+        save_array(os.path.join(directory, "offsets.npy"), offsets)
+        save_array(os.path.join(directory, "centroids.npy"), self.centroids)
+        with open(os.path.join(directory, "index.json"), "w") as f:
+            json.dump({
+                "type": self.index_type,
+                "dim": self.dim,
+                "nlist": self.nlist,
+                "nprobe": self.nprobe,
+                "train_sample": self.train_sample,
+                "ntotal": self.ntotal,
+            }, f)
+
+    @classmethod
+    def load(cls, directory: str, info: Dict[str, Any]) -> "IVFIndex":
+        """
+        Load a persisted index; list vectors stay memory-mapped until a list grows.
+
+        Args:
+            directory (str): Directory the index was saved to
+            info (Dict[str, Any]): Contents of index.json
+
+        Returns:
+            IVFIndex: The loaded index
+        """
+        index = cls(info["dim"], info["nlist"], info["nprobe"], info["train_sample"])
+        index.centroids = np.load(os.path.join(directory, "centroids.npy"))
+        offsets = np.load(os.path.join(directory, "offsets.npy"))
+        ids = np.load(os.path.join(directory, "ids.npy"), mmap_mode="r")
+        vectors = np.load(os.path.join(directory, "vectors.npy"), mmap_mode="r")
+
+        index.list_vectors = [vectors[offsets[i]:offsets[i + 1]] for i in range(index.nlist)]
+        index.list_ids = [ids[offsets[i]:offsets[i + 1]] for i in range(index.nlist)]
+        index.list_sizes = np.diff(offsets)
+        index.ntotal = info["ntotal"]
+        index._mapped = set(range(index.nlist))
+        return index
@@ -0,0 +1,195 @@
+"""
+Module for the ONNX Runtime embedding backend.
+
+The sentence-transformers model is exported once to ONNX (optionally with
+dynamic int8 quantization of its weights) and served by ONNX Runtime on CPU
+with a fixed number of intra-op threads. Mean pooling and L2 normalization
+reproduce the sentence-transformers output, so vectors are interchangeable
+with the PyTorch backend up to quantization error. Texts are batched by
+length to keep padding small.
+"""
+import json
+import os
+import threading
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from src.config import (
+    EMBEDDING_MODEL_NAME,
+    ONNX_EMBEDDING_DIR,
+    ONNX_INTRA_OP_THREADS,
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_MAX_SEQ_LENGTH
+)
+
+FP32_MODEL_FILE = "model.onnx"
+INT8_MODEL_FILE = "model_int8.onnx"
+EXPORT_INFO_FILE = "export.json"
+
+
+def export_onnx_model(model_name: str = EMBEDDING_MODEL_NAME, output_dir: str = ONNX_EMBEDDING_DIR,
+                      quantize: bool = True) -> str:
+    """
+    Export the embedding model to ONNX and optionally quantize it to int8.
+
+    Needs torch, transformers and onnxruntime; only run once per model.
+
+    Args:
+        model_name (str, optional): HuggingFace model to export
+        output_dir (str, optional): Directory for the ONNX files and tokenizer
+        quantize (bool, optional): Whether to also write the int8 model
+
+    Returns:
+        str: The output directory
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    print(f"Exporting {model_name} to ONNX in {output_dir}...")
+    os.makedirs(output_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name)
+    model.eval()
+    tokenizer.save_pretrained(output_dir)
+
+    sample = tokenizer(["An example sentence for export"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names + ["last_hidden_state"]}
+    fp32_path = os.path.join(output_dir, FP32_MODEL_FILE)
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in input_names),
+            fp32_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14
+        )
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(fp32_path, os.path.join(output_dir, INT8_MODEL_FILE), weight_type=QuantType.QInt8)
+
+    with open(os.path.join(output_dir, EXPORT_INFO_FILE), "w") as f:
+        json.dump({"model_name": model_name, "quantized": quantize}, f)
+
+    sizes = {name: round(os.path.getsize(os.path.join(output_dir, name)) / 2 ** 20, 1)
+             for name in (FP32_MODEL_FILE, INT8_MODEL_FILE) if os.path.exists(os.path.join(output_dir, name))}
+    print(f"Exported ONNX embedding model (MB per file: {sizes})")
+    return output_dir
+
+
+def is_exported(model_dir: str, quantized: bool, model_name: str = EMBEDDING_MODEL_NAME) -> bool:
+    """
+    Check whether an up-to-date export of the model exists.
+
+    Args:
+        model_dir (str): Export directory
+        quantized (bool): Whether the int8 model is needed
+        model_name (str, optional): Model the export must come from
+
+    Returns:
+        bool: True if the needed ONNX file was exported from model_name
+    """
+    info_path = os.path.join(model_dir, EXPORT_INFO_FILE)
+    model_path = os.path.join(model_dir, INT8_MODEL_FILE if quantized else FP32_MODEL_FILE)
+    if not os.path.exists(info_path) or not os.path.exists(model_path):
+        return False
+    with open(info_path) as f:
+        return json.load(f).get("model_name") == model_name
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    LangChain embeddings served by ONNX Runtime on CPU.
+    """
+
+    def __init__(self, model_dir: str = ONNX_EMBEDDING_DIR, quantized: bool = True,
+                 intra_op_threads: int = ONNX_INTRA_OP_THREADS, batch_size: int = EMBEDDING_BATCH_SIZE,
+                 max_seq_length: int = EMBEDDING_MAX_SEQ_LENGTH):
+        """
+        Load an exported model into an inference session.
+
+        Args:
+            model_dir (str, optional): Directory written by export_onnx_model
+            quantized (bool, optional): Whether to load the int8 model
+            intra_op_threads (int, optional): Threads per operator (0 lets ONNX Runtime decide)
+            batch_size (int, optional): Texts encoded per session call
+            max_seq_length (int, optional): Token limit per text
+        """
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads
+        # One operator at a time; the parallelism is inside each matmul
+        options.inter_op_num_threads = 1
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+        self.model_path = os.path.join(model_dir, INT8_MODEL_FILE if quantized else FP32_MODEL_FILE)
+        self.session = ort.InferenceSession(self.model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = [model_input.name for model_input in self.session.get_inputs()]
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.batch_size = batch_size
+        self.max_seq_length = max_seq_length
+        # Fast tokenizers reject concurrent calls that change truncation settings
+        self._tokenizer_lock = threading.Lock()
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts with mean pooling and L2 normalization.
+
+        Args:
+            texts (List[str]): Texts to embed
+
+        Returns:
+            np.ndarray: Normalized embeddings of shape (len(texts), dim), in input order
+        """
+        # Batch texts of similar length together so little compute goes to padding
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors = [None] * len(texts)
+
+        for start in range(0, len(order), self.batch_size):
+            batch_ids = order[start:start + self.batch_size]
+            with self._tokenizer_lock:
+                inputs = self.tokenizer([texts[i] for i in batch_ids], padding=True, truncation=True,
+                                        max_length=self.max_seq_length, return_tensors="np")
+            feed = {name: inputs[name].astype(np.int64) for name in self.input_names}
+            hidden = self.session.run(None, feed)[0]
+
+            mask = inputs["attention_mask"][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            for i, vector in zip(batch_ids, pooled):
+                vectors[i] = vector
+
+        return np.vstack(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._encode(list(texts)).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._encode([text])[0].tolist()
+
+
+def load_onnx_embeddings(quantized: bool = True, model_dir: str = ONNX_EMBEDDING_DIR) -> OnnxEmbeddings:
+    """
+    Load the ONNX embedding backend, exporting the model first if needed.
+
+    Args:
+        quantized (bool, optional): Whether to use the int8 model
+        model_dir (str, optional): Export directory
+
+    Returns:
+        OnnxEmbeddings: The embeddings model
+    """
+    if not is_exported(model_dir, quantized):
+        export_onnx_model(output_dir=model_dir, quantize=quantized)
+    embeddings = OnnxEmbeddings(model_dir, quantized=quantized)
+    print(f"Loaded ONNX Runtime embeddings from {embeddings.model_path}")
+    return embeddings
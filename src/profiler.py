@@ -0,0 +1,281 @@
+"""
+Module for on-demand statistical profiling of the running server.
+
+A sampler thread periodically reads the stack of every other thread with
+sys._current_frames() and counts identical stacks, which is cheap enough to
+run in production for short sessions. A session either samples all threads
+for a number of seconds, or samples only the threads serving the next N
+requests (requests opt in with track_request()). Results are exported as
+collapsed stacks (flamegraph.pl, speedscope) or as a speedscope JSON file.
+
+Work that a request hands to helper threads (deadline-bounded LLM calls,
+speculative web searches) shows up in request mode as the time the request
+thread spends waiting for it.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from src.config import (
+    PROFILING_ENABLED,
+    PROFILER_SAMPLE_INTERVAL_MS,
+    PROFILER_MAX_SECONDS,
+    PROFILER_MAX_REQUESTS,
+    PROFILER_MAX_STACK_DEPTH
+)
+
+# Innermost frames of pool workers waiting for work, as (function, file); threading.wait is looked through
+_IDLE_FRAMES = {
+    ("_worker", "thread.py"),  # concurrent.futures workers blocked on their work queue
+    ("get", "queue.py"),  # anyio (FastAPI threadpool) and other queue-fed workers
+}
+
+
+class ProfilerUnavailable(Exception):
+    """
+    Raised when a session cannot start: profiling is disabled or another session is running.
+    """
+
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class Profile:
+    """
+    Result of one profiling session: sample counts per collapsed stack.
+    """
+
+    def __init__(self, stacks: Counter, interval_ms: float, duration: float, mode: str, requests: int = 0):
+        self.stacks = stacks
+        self.interval_ms = interval_ms
+        self.duration = duration
+        self.mode = mode
+        self.requests = requests
+
+    def to_collapsed(self) -> str:
+        """
+        Render in the collapsed stack format, one "frame;frame;frame count" line per stack.
+
+        Returns:
+            str: Collapsed stacks, most sampled first
+        """
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in self.stacks.most_common())
+
+    def to_speedscope(self) -> Dict[str, Any]:
+        """
+        Render as a speedscope sampled profile (https://www.speedscope.app).
+
+        Returns:
+            Dict[str, Any]: speedscope file contents
+        """
+        frame_ids = {}
+        samples, weights = [], []
+        for stack, count in self.stacks.most_common():
+            samples.append([frame_ids.setdefault(frame, len(frame_ids)) for frame in stack])
+            weights.append(count * self.interval_ms)
+
+        name = f"RAG server, {self.mode} ({self.duration:.1f}s" + (f", {self.requests} requests)" if self.mode == "requests" else ")")
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "gromo-rag-profiler",
+            "shared": {"frames": [{"name": frame} for frame in frame_ids]},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }],
+        }
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler that runs at most one session at a time.
+    """
+
+    def __init__(self, enabled: bool = PROFILING_ENABLED, interval_ms: float = PROFILER_SAMPLE_INTERVAL_MS,
+                 max_depth: int = PROFILER_MAX_STACK_DEPTH):
+        """
+        Initialize an idle profiler.
+
+        Args:
+            enabled (bool, optional): Kill switch; a disabled profiler refuses every session
+            interval_ms (float, optional): Time between samples
+            max_depth (int, optional): Innermost frames kept per sample
+        """
+        self.enabled = enabled
+        self.interval_ms = interval_ms
+        self.max_depth = max_depth
+        self._labels = {}  # Code object -> frame label, so each sample only does dict lookups
+        self._session_lock = threading.Lock()
+        self._lock = threading.Lock()
+        # Request-mode state; _tracking is the only thing track_request() reads when idle
+        self._tracking = False
+        self._tracked_threads = set()
+        self._requests_started = 0
+        self._requests_finished = 0
+        self._request_target = 0
+        self._requests_done = threading.Event()
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            self._labels[code] = label
+        return label
+
+    @staticmethod
+    def _is_idle(frame) -> bool:
+        """
+        Check whether a thread is a pool worker waiting for work.
+        """
+        code = frame.f_code
+        if code.co_name == "wait" and os.path.basename(code.co_filename) == "threading.py" and frame.f_back is not None:
+            code = frame.f_back.f_code
+        return (code.co_name, os.path.basename(code.co_filename)) in _IDLE_FRAMES
+
+    def _collect(self, counts: Counter, thread_ids: Optional[set] = None):
+        """
+        Take one sample of every thread (or only the given ones) except the sampler itself.
+
+        Without thread_ids, idle pool workers are skipped; dozens of them
+        would otherwise dominate the profile with identical waiting stacks.
+        """
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own or (thread_ids is not None and thread_id not in thread_ids):
+                continue
+            if thread_ids is None and self._is_idle(frame):
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            stack.append(names.get(thread_id, f"thread-{thread_id}"))
+            counts[tuple(reversed(stack))] += 1
+
+    def _begin(self):
+        if not self.enabled:
+            raise ProfilerUnavailable("Profiling is disabled (set PROFILING_ENABLED=true)", 404)
+        if not self._session_lock.acquire(blocking=False):
+            raise ProfilerUnavailable("A profiling session is already running", 409)
+
+    def profile_for(self, seconds: float) -> Profile:
+        """
+        Sample all threads for a number of seconds, blocking the caller.
+
+        Args:
+            seconds (float): Session length, capped at PROFILER_MAX_SECONDS
+
+        Returns:
+            Profile: The collected samples
+
+        Raises:
+            ProfilerUnavailable: If profiling is disabled or a session is running
+        """
+        self._begin()
+        try:
+            seconds = max(0.1, min(seconds, PROFILER_MAX_SECONDS))
+            counts = Counter()
+            started = time.monotonic()
+            deadline = started + seconds
+            interval = self.interval_ms / 1000.0
+            while time.monotonic() < deadline:
+                self._collect(counts)
+                time.sleep(interval)
+            duration = time.monotonic() - started
+            print(f"Profiled all threads for {duration:.1f}s ({sum(counts.values())} samples)")
+            return Profile(counts, self.interval_ms, duration, "duration")
+        finally:
+            self._session_lock.release()
+
+    def profile_requests(self, requests: int, timeout: float = PROFILER_MAX_SECONDS) -> Profile:
+        """
+        Sample only the threads serving the next N tracked requests, blocking the caller.
+
+        Args:
+            requests (int): Requests to profile, capped at PROFILER_MAX_REQUESTS
+            timeout (float, optional): Give up waiting for requests after this many seconds
+
+        Returns:
+            Profile: The collected samples (fewer requests if the timeout was reached)
+
+        Raises:
+            ProfilerUnavailable: If profiling is disabled or a session is running
+        """
+        self._begin()
+        try:
+            with self._lock:
+                self._request_target = max(1, min(requests, PROFILER_MAX_REQUESTS))
+                self._requests_started = 0
+                self._requests_finished = 0
+                self._tracked_threads = set()
+                self._requests_done.clear()
+                self._tracking = True
+
+            counts = Counter()
+            started = time.monotonic()
+            deadline = started + min(timeout, PROFILER_MAX_SECONDS)
+            interval = self.interval_ms / 1000.0
+            while not self._requests_done.is_set() and time.monotonic() < deadline:
+                with self._lock:
+                    thread_ids = set(self._tracked_threads)
+                if thread_ids:
+                    self._collect(counts, thread_ids)
+                time.sleep(interval)
+
+            with self._lock:
+                self._tracking = False
+                finished = self._requests_finished
+            duration = time.monotonic() - started
+            print(f"Profiled {finished} requests over {duration:.1f}s ({sum(counts.values())} samples)")
+            return Profile(counts, self.interval_ms, duration, "requests", finished)
+        finally:
+            self._session_lock.release()
+
+    @contextmanager
+    def track_request(self):
+        """
+        Mark the current thread as serving a request, so a request-mode session samples it.
+
+        Costs one attribute check when no request-mode session is running.
+        """
+        tracked = False
+        if self._tracking:
+            with self._lock:
+                if self._tracking and self._requests_started < self._request_target:
+                    self._requests_started += 1
+                    self._tracked_threads.add(threading.get_ident())
+                    tracked = True
+        try:
+            yield
+        finally:
+            if tracked:
+                with self._lock:
+                    self._tracked_threads.discard(threading.get_ident())
+                    self._requests_finished += 1
+                    if self._requests_finished >= self._request_target:
+                        self._requests_done.set()
+
+
+_profiler = SamplingProfiler()
+
+
+def get_profiler() -> SamplingProfiler:
+    """
+    Get the process-wide profiler.
+
+    Returns:
+        SamplingProfiler: The shared profiler
+    """
+    return _profiler
@@ -0,0 +1,128 @@
+"""
+Module for assembling LLM prompts around a stable, cacheable prefix.
+
+Every prompt starts with SYSTEM_MESSAGE, byte-for-byte identical across
+requests, followed by the variable context and question. Chat models receive
+it as a separate system message, which server-side prompt caching can match
+as a common prefix; string-prompt models receive the concatenated text, and
+the local batching scheduler reuses the prefix's KV cache. Tokens covered by
+the prefix are recorded so the savings can be reported.
+"""
+import threading
+from typing import Any, Dict, Optional, Union
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from src.config import SYSTEM_MESSAGE
+
+# Separator between the cached prefix and the variable part of string prompts
+PREFIX_SEPARATOR = "\n\n"
+
+
+def get_prompt_prefix() -> str:
+    """
+    Get the stable prefix shared by every string prompt.
+
+    Returns:
+        str: SYSTEM_MESSAGE followed by the separator
+    """
+    return SYSTEM_MESSAGE.rstrip() + PREFIX_SEPARATOR
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Roughly estimate the token count of English text (about 4 characters per token).
+
+    Args:
+        text (str): Text to measure
+
+    Returns:
+        int: Estimated tokens
+    """
+    return max(1, len(text) // 4)
+
+
+def build_llm_input(llm, user_prompt: str) -> Union[list, str]:
+    """
+    Build the model input with the stable prefix first.
+
+    Args:
+        llm: The language model that will be invoked
+        user_prompt (str): Variable part of the prompt (context and question)
+
+    Returns:
+        Union[list, str]: System and human messages for chat models, otherwise the full prompt string
+    """
+    if isinstance(llm, BaseChatModel):
+        return [SystemMessage(content=SYSTEM_MESSAGE), HumanMessage(content=user_prompt)]
+    return get_prompt_prefix() + user_prompt
+
+
+class PromptCacheStats:
+    """
+    Counters for prompt tokens covered by the stable prefix.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._prefix_tokens = 0
+        self._server_cached_tokens = 0
+
+    def record(self, prefix_tokens: int, server_cached_tokens: Optional[int] = None):
+        """
+        Record one request.
+
+        Args:
+            prefix_tokens (int): Tokens in the stable prefix of the request
+            server_cached_tokens (int, optional): Cached prompt tokens reported by the API, if any
+        """
+        with self._lock:
+            self._requests += 1
+            self._prefix_tokens += prefix_tokens
+            self._server_cached_tokens += server_cached_tokens or 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get prefix token metrics.
+
+        Returns:
+            Dict[str, Any]: Requests, cacheable prefix tokens and server-reported cached tokens
+        """
+        with self._lock:
+            return {
+                "requests": self._requests,
+                "prefix_tokens_per_request": estimate_tokens(get_prompt_prefix()),
+                "cacheable_prefix_tokens": self._prefix_tokens,
+                "server_cached_tokens": self._server_cached_tokens,
+            }
+
+
+_stats = PromptCacheStats()
+
+
+def get_prompt_cache_stats() -> PromptCacheStats:
+    """
+    Get the process-wide prompt prefix counters.
+
+    Returns:
+        PromptCacheStats: The shared counters
+    """
+    return _stats
+
+
+def server_cached_tokens(response) -> Optional[int]:
+    """
+    Extract the cached prompt token count from a chat response, if the API reports one.
+
+    Args:
+        response: LLM response
+
+    Returns:
+        Optional[int]: Cached prompt tokens, or None if not reported
+    """
+    usage = getattr(response, "response_metadata", {}).get("token_usage") or {}
+    details = usage.get("prompt_tokens_details") or {}
+    cached = details.get("cached_tokens")
+    return int(cached) if cached is not None else None
@@ -0,0 +1,261 @@
+"""
+Module for quantized vector indexes with full-precision re-scoring.
+
+Vectors are stored as int8 codes (scalar quantization) or 1-bit sign codes.
+A fast first pass scores every code with integer dot products or popcount
+Hamming distance, then the top candidates are re-scored against the float32
+vectors, which are memory-mapped from disk once the index has been saved.
+"""
+import json
+import os
+from typing import Any, Dict, Tuple
+
+import numpy as np
+
+from src.config import INT8_RESCORE_FACTOR, BINARY_RESCORE_FACTOR
+from src.vector_index import ExactIndex, evaluate_recall, register_index, save_array, top_k
+
+# Rows scored per block in the first pass, bounding temporary memory
+_BLOCK_SIZE = 65536
+
+# Popcount lookup table for numpy versions without np.bitwise_count
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _popcount(values: np.ndarray) -> np.ndarray:
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values)
+    return _POPCOUNT[values]
+
+
+class _RescoringIndex:
+    """
+    Base class: approximate first pass over codes, exact re-scoring of the best candidates.
+    """
+
+    def __init__(self, dim: int = None, rescore_factor: int = 4):
+        """
+        Initialize an empty index.
+
+        Args:
+            dim (int, optional): Embedding dimension, inferred from the first add if omitted
+            rescore_factor (int, optional): Candidates re-scored per result (k * factor)
+        """
+        self.dim = dim
+        self.rescore_factor = rescore_factor
+        self.codes = None
+        self.full = np.empty((0, dim or 0), dtype=np.float32)
+        self._full_on_disk = False
+
+    def __len__(self) -> int:
+        return self.full.shape[0]
+
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def _approximate_scores(self, queries: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def add(self, vectors: np.ndarray):
+        """
+        Quantize and append vectors; ids are assigned sequentially.
+
+        Args:
+            vectors (np.ndarray): Vectors of shape (n, dim)
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if len(self) == 0:
+            self.dim = vectors.shape[1]
+        codes = self._encode(vectors)
+        self.codes = codes if self.codes is None or len(self) == 0 else np.vstack([self.codes, codes])
+        # Appending after a load moves the float vectors back into memory until the next save
+        self.full = vectors.copy() if len(self) == 0 else np.vstack([self.full, vectors])
+        self._full_on_disk = False
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the k nearest vectors for each query.
+
+        Args:
+            queries (np.ndarray): Query vectors of shape (m, dim)
+            k (int): Number of results per query
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Re-scored similarities and ids, each of shape (m, k)
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        _, candidates = top_k(self._approximate_scores(queries), k * self.rescore_factor)
+
+        all_scores, all_ids = [], []
+        for query, row in zip(queries, candidates):
+            row = np.sort(row)  # Sorted ids keep memory-mapped reads sequential
+            exact = np.asarray(self.full[row], dtype=np.float32) @ query
+            scores, order = top_k(exact[None, :], k)
+            all_scores.append(scores[0])
+            all_ids.append(row[order[0]])
+
+        return np.vstack(all_scores), np.vstack(all_ids)
+
+    def memory_bytes(self) -> int:
+        """
+        Get the resident memory used by the index arrays.
+
+        Returns:
+            int: Bytes (float vectors count only while they are held in memory)
+        """
+        codes_bytes = self.codes.nbytes if self.codes is not None else 0
+        return int(codes_bytes + (0 if self._full_on_disk else self.full.nbytes))
+
+    def _save_params(self, directory: str):
+        pass
+
+    def _load_params(self, directory: str):
+        pass
+
+    def save(self, directory: str):
+        """
+        Persist the codes and float vectors, then memory-map the float vectors.
+
+        Args:
+            directory (str): Target directory
+        """
+        os.makedirs(directory, exist_ok=True)
+        save_array(os.path.join(directory, "codes.npy"), self.codes)
+        vectors_path = os.path.join(directory, "vectors.npy")
+        save_array(vectors_path, np.asarray(self.full))
+        self._save_params(directory)
+        with open(os.path.join(directory, "index.json"), "w") as f:
+            json.dump({"type": self.index_type, "dim": self.dim, "rescore_factor": self.rescore_factor}, f)
+
+        self.full = np.load(vectors_path, mmap_mode="r")
+        self._full_on_disk = True
+
+    @classmethod
+    def load(cls, directory: str, info: Dict[str, Any]):
+        """
+        Load a persisted index with its float vectors memory-mapped.
+
+        Args:
+            directory (str): Directory the index was saved to
+            info (Dict[str, Any]): Contents of index.json
+
+        Returns:
+            The loaded index
+        """
+        index = cls(info["dim"], info["rescore_factor"])
+        index.codes = np.load(os.path.join(directory, "codes.npy"))
+        index.full = np.load(os.path.join(directory, "vectors.npy"), mmap_mode="r")
+        index._full_on_disk = True
+        index._load_params(directory)
+        return index
+
+    def recall_report(self, num_queries: int = 100, k: int = 10, seed: int = 0) -> Dict[str, float]:
+        """
+        Measure recall loss and memory saved against an exact index over the same vectors.
+
+        Queries are stored vectors with small random perturbations.
+
+        Args:
+            num_queries (int, optional): Number of sampled queries. Defaults to 100.
+            k (int, optional): Number of neighbours compared. Defaults to 10.
+            seed (int, optional): Random seed. Defaults to 0.
+
+        Returns:
+            Dict[str, float]: Recall@k and memory statistics
+        """
+        reference = ExactIndex(self.dim)
+        reference.vectors = np.asarray(self.full, dtype=np.float32)
+
+        rng = np.random.default_rng(seed)
+        sample = reference.vectors[rng.choice(len(self), size=min(num_queries, len(self)), replace=False)]
+        queries = sample + rng.normal(scale=0.05, size=sample.shape).astype(np.float32)
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+        return evaluate_recall(self, reference, queries, k)
+
+
+@register_index("int8")
+class ScalarQuantizedIndex(_RescoringIndex):
+    """
+    Index storing int8 scalar-quantized vectors (4x smaller than float32).
+    """
+
+    def __init__(self, dim: int = None, rescore_factor: int = INT8_RESCORE_FACTOR):
+        super().__init__(dim, rescore_factor)
+        self.scale = None
+
+    def add(self, vectors: np.ndarray):
+        """
+        Quantize and append vectors, widening the scale if they fall outside it.
+
+        The per-dimension scale is calibrated on the first batch. A later batch
+        with larger values would be clipped, so the scale is widened to cover
+        it and the stored codes are re-encoded from the float vectors.
+
+        Args:
+            vectors (np.ndarray): Vectors of shape (n, dim)
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if len(self) == 0:
+            self.scale = None
+        elif self.scale is not None:
+            needed = np.abs(vectors).max(axis=0) / 127.0
+            if (needed > self.scale).any():
+                self.scale = np.maximum(self.scale, needed).astype(np.float32)
+                self.codes = np.vstack([
+                    self._encode(np.asarray(self.full[start:start + _BLOCK_SIZE], dtype=np.float32))
+                    for start in range(0, len(self), _BLOCK_SIZE)
+                ])
+                print(f"Widened int8 scale for a batch outside the calibrated range; re-encoded {len(self)} vectors")
+        super().add(vectors)
+
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        if self.scale is None:
+            # Calibrate a symmetric per-dimension scale on the first batch
+            self.scale = np.maximum(np.abs(vectors).max(axis=0), 1e-6).astype(np.float32) / 127.0
+        return np.clip(np.rint(vectors / self.scale), -127, 127).astype(np.int8)
+
+    def _approximate_scores(self, queries: np.ndarray) -> np.ndarray:
+        # Fold the per-dimension scale into the query, then quantize it to int8 as well
+        scaled = queries * self.scale
+        query_scale = np.maximum(np.abs(scaled).max(axis=1, keepdims=True), 1e-12) / 127.0
+        query_codes = np.rint(scaled / query_scale).astype(np.float32)
+
+        # Integer dot products computed block by block; int8 x int8 sums over 384 dims
+        # stay far below 2**24, so float32 BLAS evaluates them exactly
+        scores = np.empty((queries.shape[0], len(self)), dtype=np.float32)
+        for start in range(0, len(self), _BLOCK_SIZE):
+            block = self.codes[start:start + _BLOCK_SIZE].astype(np.float32)
+            scores[:, start:start + block.shape[0]] = query_codes @ block.T
+        return scores
+
+    def _save_params(self, directory: str):
+        save_array(os.path.join(directory, "scale.npy"), self.scale)
+
+    def _load_params(self, directory: str):
+        self.scale = np.load(os.path.join(directory, "scale.npy"))
+
+
+@register_index("binary")
+class BinaryQuantizedIndex(_RescoringIndex):
+    """
+    Index storing 1-bit sign vectors (32x smaller than float32).
+    """
+
+    def __init__(self, dim: int = None, rescore_factor: int = BINARY_RESCORE_FACTOR):
+        super().__init__(dim, rescore_factor)
+
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        return np.packbits(vectors > 0, axis=1)
+
+    def _approximate_scores(self, queries: np.ndarray) -> np.ndarray:
+        query_bits = self._encode(queries)
+        scores = np.empty((queries.shape[0], len(self)), dtype=np.float32)
+
+        for i, bits in enumerate(query_bits):
+            for start in range(0, len(self), _BLOCK_SIZE):
+                block = self.codes[start:start + _BLOCK_SIZE]
+                hamming = _popcount(np.bitwise_xor(block, bits)).sum(axis=1, dtype=np.int32)
+                # Fewer differing bits means more similar
+                scores[i, start:start + block.shape[0]] = -hamming
+        return scores
@@ -0,0 +1,157 @@
+"""
+Module for the compact, persistent log of served queries.
+
+Instead of one line per request, the log keeps a count per (tenant,
+normalized query) with the latest wording and last time it was served, and
+rewrites one small JSON file periodically. Startup warm-up replays the most
+frequent entries.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+
+from src.config import (
+    DEFAULT_TENANT_ID,
+    QUERY_LOG_ENABLED,
+    QUERY_LOG_PATH,
+    QUERY_LOG_MAX_QUERIES,
+    QUERY_LOG_FLUSH_INTERVAL
+)
+from src.web_prefetch import normalize_query
+
+
+class QueryLog:
+    """
+    Per-query request counts persisted to a JSON file.
+    """
+
+    def __init__(self, path: str = QUERY_LOG_PATH, enabled: bool = QUERY_LOG_ENABLED,
+                 max_queries: int = QUERY_LOG_MAX_QUERIES, flush_interval: float = QUERY_LOG_FLUSH_INTERVAL):
+        """
+        Initialize the log, reading earlier counts from disk.
+
+        Args:
+            path (str, optional): JSON file the log is persisted to
+            enabled (bool, optional): Whether queries are recorded
+            max_queries (int, optional): Distinct queries kept; the least frequent are dropped
+            flush_interval (float, optional): Minimum seconds between writes
+        """
+        self.path = path
+        self.enabled = enabled
+        self.max_queries = max_queries
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        # (tenant id, normalized query) -> [count, last served unix time, latest raw query]
+        self._entries = {}
+        self._dirty = False
+        self._last_flush = time.monotonic()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            for tenant_id, query, count, last_served in data["queries"]:
+                self._entries[(tenant_id, normalize_query(query))] = [count, last_served, query]
+            print(f"Loaded query log with {len(self._entries)} queries from {self.path}")
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Could not read query log {self.path}: {e}")
+
+    def record(self, query: str, tenant_id: str = DEFAULT_TENANT_ID):
+        """
+        Count one served query, writing the log if the flush interval has passed.
+
+        Args:
+            query (str): Standalone query as used for retrieval
+            tenant_id (str, optional): Tenant that served it
+        """
+        key = (tenant_id, normalize_query(query))
+        if not self.enabled or not key[1]:
+            return
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                if len(self._entries) >= self.max_queries:
+                    # Drop the least frequent, least recently served query
+                    del self._entries[min(self._entries, key=lambda k: self._entries[k][:2])]
+                self._entries[key] = [1, time.time(), query]
+            else:
+                entry[:] = [entry[0] + 1, time.time(), query]
+            self._dirty = True
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+        if due:
+            self.flush()
+
+    def top(self, k: int) -> List[Tuple[str, str, int]]:
+        """
+        Get the most frequently served queries.
+
+        Args:
+            k (int): Maximum queries
+
+        Returns:
+            List[Tuple[str, str, int]]: (tenant id, query, count), most frequent first
+        """
+        with self._lock:
+            ranked = sorted(self._entries.items(), key=lambda item: (item[1][0], item[1][1]), reverse=True)
+        return [(tenant_id, entry[2], entry[0]) for (tenant_id, _), entry in ranked[:k]]
+
+    def flush(self):
+        """
+        Write the log if it changed since the last write.
+        """
+        with self._write_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                rows = sorted(([tenant_id, entry[2], entry[0], round(entry[1])] for (tenant_id, _), entry in self._entries.items()),
+                              key=lambda row: row[2], reverse=True)
+                self._dirty = False
+                self._last_flush = time.monotonic()
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                with open(self.path + ".tmp", "w") as f:
+                    json.dump({"queries": rows}, f, separators=(",", ":"))
+                os.replace(self.path + ".tmp", self.path)
+            except OSError as e:
+                print(f"Could not write query log: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get query log metrics.
+
+        Returns:
+            Dict[str, Any]: Distinct queries and total requests logged
+        """
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "queries": len(self._entries),
+                "requests": sum(entry[0] for entry in self._entries.values()),
+            }
+
+
+_query_log = None
+_query_log_lock = threading.Lock()
+
+
+def get_query_log() -> QueryLog:
+    """
+    Get the process-wide query log, written on exit.
+
+    Returns:
+        QueryLog: The shared log
+    """
+    global _query_log
+
+    with _query_log_lock:
+        if _query_log is None:
+            _query_log = QueryLog()
+            atexit.register(_query_log.flush)
+        return _query_log
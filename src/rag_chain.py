@@ -1,7 +1,10 @@
 """
 Module for implementing the RAG chain using Langchain.
 """
-from typing import List, Dict, Any
+import re
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from langchain_core.documents import Document
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
@@ -14,40 +17,114 @@ from src.config import (
     QWEN_MODEL_NAME, 
     MISTRAL_MODEL_NAME,
     MISTRAL_API_KEY,
+    MISTRAL_API_ENDPOINT,
     RAG_PROMPT_TEMPLATE, 
-    SYSTEM_MESSAGE, 
     TOP_K_RETRIEVAL, 
     USE_QUANTIZED_MODEL,
     USE_MISTRAL_API,
-    BNB_CONFIG
+    BNB_CONFIG,
+    LOCAL_MODEL_NAME,
+    LOCAL_MAX_NEW_TOKENS,
+    LOCAL_BATCHING_ENABLED,
+    LLM_TIMEOUT,
+    LLM_RETRIES,
+    LLM_HEDGE_ENABLED,
+    LLM_TOTAL_TIMEOUT,
+    LLM_MAX_IN_FLIGHT,
+    LLM_FIRST_CHUNK_TIMEOUT,
+    LLM_STREAM_IDLE_TIMEOUT,
+    SPECULATIVE_WEB_SEARCH_ENABLED,
+    BATCH_LLM_PARALLELISM,
+    FAQ_EXACT_ANSWER_ENABLED,
+    SPELLING_CORRECTION_ENABLED,
+    INTENT_ROUTING_ENABLED,
+    VECTOR_STORE_DIR,
+    WEB_CORPUS_ENABLED
 )
+from src.batching import BatchedHuggingFaceLLM, get_batch_scheduler
+from src.chunk_store import ChunkStore
+from src.embeddings import get_stored_documents
+from src.entity_index import entity_index_path, update_entity_index
+from src.intent_router import ALL_STRATEGIES, RouteDecision, load_or_train_router, router_path
+from src.prompts import build_llm_input, estimate_tokens, get_prompt_cache_stats, get_prompt_prefix, server_cached_tokens
+from src.resilience import get_policy
+from src.spelling import SpellingNormalizer
+from src.suggest import SuggestionIndex
+from src.web_corpus import get_web_corpus
 from src.web_search import WebSearchTool
 
+ERROR_RESPONSE = (
+    "I apologize, but I encountered an error while processing your question. "
+    "This might be due to the complexity of your query or technical limitations. "
+    "Could you try rephrasing your question? Or if you're asking about "
+    "specific product details, you may want to contact Gromo's customer support "
+    "for the most accurate and up-to-date information."
+)
+
+# Keywords used by the sparse keyword search (expanded list)
+PRIMARY_KEYWORDS = [
+    "payout", "commission", "rate", "percentage", "earn", "payment", 
+    "personal loan", "business loan", "gromo point", "credit card",
+    "demat", "saving", "account", "mutual fund", "insurance", "fee",
+    "eligibility", "requirement", "process", "track", "cancel", "contact",
+    "support", "app", "mobile", "partner"
+]
+
+# Product names looked for in queries - expanded with more specific product names
+PRODUCT_KEYWORDS = [
+    "hdfc", "bajaj", "idfc", "axis", "groww", "paytm", "lic", "sbi",
+    "icici", "kotak", "freecharge", "zest money", "zest", "lendingkart", "money", 
+    "niyo", "fi", "federal bank", "credit", "loan", "emi", "card", "demat",
+    "bank", "fintech", "invest", "indusind", "bob", "savings", "jupiter",
+    "appreciate", "appreciate app", "angel one", "angel broking", "edelweiss"
+]
+
+# Product names given a dedicated search
+SEARCHABLE_PRODUCTS = [
+    "zest money", "zest", "fi", "fi money", "federal bank", "axis bank",
+    "hdfc", "bajaj", "idfc", "kotak", "groww", "paytm", "jupiter",
+    "freecharge", "lic", "angel one", "demat", "appreciate"
+]
+
+# Whole-word matcher for the speculative web search predictor; substring matching
+# ("fi" in "financial", "app" in "happen") would match almost every query
+_FAQ_TERM_PATTERN = re.compile(
+    r"\b(?:" + "|".join(re.escape(k) for k in sorted(set(PRIMARY_KEYWORDS + PRODUCT_KEYWORDS + ["gromo"]), key=len, reverse=True)) + r")s?\b"
+)
+
 
-def get_llm():
+def get_llm(model_name: Optional[str] = None):
     """
     Initialize the language model for text generation.
     
+    Args:
+        model_name (str, optional): Mistral model to use instead of MISTRAL_MODEL_NAME
+    
     Returns:
         The language model for text generation
     """
     try:
         if USE_MISTRAL_API:
             # Use Mistral AI API
-            print(f"Using Mistral AI API: {MISTRAL_MODEL_NAME}")
+            model_name = model_name or MISTRAL_MODEL_NAME
+            print(f"Using Mistral AI API: {model_name}")
             
             # Initialize Mistral AI client
             llm = ChatMistralAI(
-                model=MISTRAL_MODEL_NAME,
+                model=model_name,
                 mistral_api_key=MISTRAL_API_KEY,
+                endpoint=MISTRAL_API_ENDPOINT,
                 temperature=0.7,
                 max_tokens=1024
             )
             
             return llm
+        elif LOCAL_BATCHING_ENABLED:
+            # Share one model across callers; concurrent prompts are batched together
+            return BatchedHuggingFaceLLM(scheduler=get_batch_scheduler())
         else:
             # Use a smaller model for testing
-            model_name = "google/flan-t5-small"
+            model_name = LOCAL_MODEL_NAME
             print(f"Using smaller model for testing: {model_name}")
             
             # Load tokenizer and model
@@ -59,7 +136,7 @@ def get_llm():
                 "text2text-generation",
                 model=model,
                 tokenizer=tokenizer,
-                max_new_tokens=512
+                max_new_tokens=LOCAL_MAX_NEW_TOKENS
             )
             
             # Wrap in Langchain pipeline
@@ -109,59 +186,66 @@ class RAGChain:
     RAG chain that combines FAQ data and web search results.
     """
     
-    def __init__(self, vector_store):
+    def __init__(self, vector_store, store_dir: str = VECTOR_STORE_DIR):
         """
         Initialize RAG chain.
         
         Args:
             vector_store: Vector store for document retrieval
+            store_dir (str, optional): Directory holding the store's entity index and intent router. Defaults to VECTOR_STORE_DIR.
         """
         self.vector_store = vector_store
         self.retriever = vector_store.as_retriever(search_kwargs={"k": TOP_K_RETRIEVAL})
         self.web_search = WebSearchTool()  # Updated to correct class name
         self.use_web_search = True  # Flag to control web search usage
+        self.llm_policy = get_policy(
+            "llm",
+            timeout=LLM_TIMEOUT,
+            retries=LLM_RETRIES,
+            hedge=LLM_HEDGE_ENABLED,
+            total_timeout=LLM_TOTAL_TIMEOUT,
+            max_in_flight=LLM_MAX_IN_FLIGHT,
+            first_chunk_timeout=LLM_FIRST_CHUNK_TIMEOUT,
+            idle_timeout=LLM_STREAM_IDLE_TIMEOUT
+        )
+        stored_documents = get_stored_documents(vector_store)
+        # Retrieval works on chunk ids; Documents are only built for the prompt
+        self.chunk_store = ChunkStore.from_documents(stored_documents)
+        self.suggestion_index = SuggestionIndex.from_documents(stored_documents)
+        self.spelling = SpellingNormalizer.from_corpus(stored_documents, PRODUCT_KEYWORDS + SEARCHABLE_PRODUCTS)
+        # Usually a no-op: the index was built with the documents; this covers older vector stores
+        self.entity_index = update_entity_index(stored_documents, entity_index_path(store_dir))
+        self.router = (
+            load_or_train_router(stored_documents, vector_store.embeddings, router_path(store_dir))
+            if INTENT_ROUTING_ENABLED else None
+        )
         
         if USE_MISTRAL_API:
             # Use direct LLM interface for Mistral API
             print(f"Using Mistral AI API: {MISTRAL_MODEL_NAME}")
         else:
-            # For other models, create a standard LangChain RAG chain
-            self.chain = create_rag_chain()
+            # Local models are loaded lazily by get_llm() on the first query
+            print(f"Using local model: {LOCAL_MODEL_NAME}")
         
         print("RAG chain initialized successfully!")
     
-    def _keyword_search(self, query: str) -> List[Document]:
+    def _keyword_search(self, query: str) -> List[int]:
         """
         Perform a keyword search on the documents for specific terms.
         
+        Scans the chunk store's precomputed lowercase buffers, so no chunk is
+        lowercased or materialized per query.
+        
         Args:
             query (str): User query
             
         Returns:
-            List[Document]: List of documents matching keywords
-        """
-        # Define keywords to look for (expanded list)
-        primary_keywords = [
-            "payout", "commission", "rate", "percentage", "earn", "payment", 
-            "personal loan", "business loan", "gromo point", "credit card",
-            "demat", "saving", "account", "mutual fund", "insurance", "fee",
-            "eligibility", "requirement", "process", "track", "cancel", "contact",
-            "support", "app", "mobile", "partner"
-        ]
-        
-        # Extract product names from the query - expanded with more specific product names
-        product_keywords = [
-            "hdfc", "bajaj", "idfc", "axis", "groww", "paytm", "lic", "sbi",
-            "icici", "kotak", "freecharge", "zest money", "zest", "lendingkart", "money", 
-            "niyo", "fi", "federal bank", "credit", "loan", "emi", "card", "demat",
-            "bank", "fintech", "invest", "indusind", "bob", "savings", "jupiter",
-            "appreciate", "appreciate app", "angel one", "angel broking", "edelweiss"
-        ]
-        
+            List[int]: Ids of chunks matching keywords
+        """
         # Check if any keywords are in the query
         query_lower = query.lower()
-        matched_primary = [k for k in primary_keywords if k in query_lower]
-        matched_products = [k for k in product_keywords if k in query_lower]
+        matched_primary = [k for k in PRIMARY_KEYWORDS if k in query_lower]
+        matched_products = [k for k in PRODUCT_KEYWORDS if k in query_lower]
         
         # Combine all matched keywords
         all_matched = matched_primary + matched_products
@@ -169,101 +253,41 @@ class RAGChain:
         if not all_matched:
             return []
         
-        # Get all documents from the vector store
-        all_docs = self.vector_store.similarity_search("", k=150)
+        # Score chunks based on keyword matches
+        scores = np.zeros(len(self.chunk_store), dtype=np.int32)
+        for k in matched_primary:
+            scores[self.chunk_store.ids_containing(k)] += 2
         
-        # Score documents based on keyword matches
-        scored_docs = []
-        for doc in all_docs:
-            doc_lower = doc.page_content.lower()
-            score = 0
-            
-            # Score based on primary keyword matches
-            for k in matched_primary:
-                if k in doc_lower:
-                    score += 2
-            
-            # Score based on product keyword matches - higher weight for product matches
-            for k in matched_products:
-                if k in doc_lower:
-                    score += 5
-                    # Extra points for exact matches in question
-                    try:
-                        if "question:" in doc_lower and "answer:" in doc_lower:
-                            question_part = doc_lower.split("question:")[1].split("answer:")[0].lower()
-                            if k in question_part:
-                                score += 10
-                    except IndexError:
-                        # Skip if the splitting fails
-                        pass
-            
-            if score > 0:
-                scored_docs.append((doc, score))
+        # Product keyword matches weigh more, with extra points for matches in the FAQ question
+        for k in matched_products:
+            scores[self.chunk_store.ids_containing(k)] += 5
+            scores[self.chunk_store.ids_with_question_containing(k)] += 10
         
         # Sort by score and return top matches
-        scored_docs.sort(key=lambda x: x[1], reverse=True)
-        matched_docs = [doc for doc, score in scored_docs[:15]]  # Return more documents for better coverage
+        order = np.argsort(-scores, kind="stable")
+        matched_ids = [int(i) for i in order[:15] if scores[i] > 0]  # Return more documents for better coverage
         
-        if matched_docs:
-            print(f"Enhanced keyword search found {len(matched_docs)} documents matching: {', '.join(all_matched)}")
+        if matched_ids:
+            print(f"Enhanced keyword search found {len(matched_ids)} documents matching: {', '.join(all_matched)}")
         
-        return matched_docs
+        return matched_ids
     
-    def _product_specific_search(self, query: str) -> List[Document]:
+    def _product_specific_search(self, query: str) -> List[int]:
         """
         Perform a search specifically for product-related queries.
         
+        Uses the precomputed entity index, so no embedding calls are made.
+        
         Args:
             query (str): User query
             
         Returns:
-            List[Document]: List of documents specifically about products
+            List[int]: Ids of chunks specifically about products
         """
         try:
-            # List of product names to look for
-            products = [
-                "zest money", "zest", "fi", "fi money", "federal bank", "axis bank",
-                "hdfc", "bajaj", "idfc", "kotak", "groww", "paytm", "jupiter",
-                "freecharge", "lic", "angel one", "demat", "appreciate"
-            ]
-            
-            query_lower = query.lower()
-            matched_products = [p for p in products if p in query_lower]
-            
-            if not matched_products:
-                return []
-            
-            print(f"Searching specifically for product information about: {', '.join(matched_products)}")
-            
-            # For each matched product, do a dedicated search
-            product_docs = []
-            for product in matched_products:
-                # Try several query variations
-                variations = [
-                    f"what is {product}",
-                    f"{product} details",
-                    f"{product} information",
-                    f"{product} features"
-                ]
-                
-                for variation in variations:
-                    try:
-                        results = self.vector_store.similarity_search(variation, k=5)
-                        product_docs.extend(results)
-                    except Exception as e:
-                        print(f"Error searching for '{variation}': {e}")
-                        continue
-            
-            # Remove duplicates
-            seen_content = set()
-            unique_docs = []
-            
-            for doc in product_docs:
-                if doc.page_content not in seen_content:
-                    unique_docs.append(doc)
-                    seen_content.add(doc.page_content)
-            
-            return unique_docs[:10]
+            return self.chunk_store.ids_for_texts(
+                self.entity_index.search_texts(query, entity_types=("product", "bank"), limit=10)
+            )
         except Exception as e:
             print(f"Error in product-specific search: {e}")
             return []
@@ -301,7 +325,7 @@ class RAGChain:
         
         return expanded_queries
     
-    def _direct_question_lookup(self, query: str) -> List[Document]:
+    def _direct_question_lookup(self, query: str) -> List[int]:
         """
         Directly look up specific questions in the FAQ.
         
@@ -309,7 +333,7 @@ class RAGChain:
             query (str): User query
             
         Returns:
-            List[Document]: List of documents with exact question matches
+            List[int]: Ids of chunks with exact question matches
         """
         try:
             # List of common questions with their exact wording in the FAQ
@@ -341,7 +365,7 @@ class RAGChain:
                     print(f"Found direct FAQ match: '{question}'")
                     # Get exact question from vector store
                     try:
-                        results = self.vector_store.similarity_search(question, k=2)
+                        results = self._search_ids(question, k=2)
                         matches.extend(results)
                     except Exception as e:
                         print(f"Error searching for '{question}': {e}")
@@ -352,8 +376,8 @@ class RAGChain:
                 # Try both questions about GroMo Points
                 print("Special handling for GroMo Points")
                 try:
-                    points_results = self.vector_store.similarity_search("What are GroMo Points?", k=2)
-                    value_results = self.vector_store.similarity_search("What is the value of 1 GroMo Point?", k=2)
+                    points_results = self._search_ids("What are GroMo Points?", k=2)
+                    value_results = self._search_ids("What is the value of 1 GroMo Point?", k=2)
                     matches.extend(points_results)
                     matches.extend(value_results)
                 except Exception as e:
@@ -363,7 +387,7 @@ class RAGChain:
             if "zest" in query_lower or "zest money" in query_lower:
                 print("Special handling for Zest Money")
                 try:
-                    zest_results = self.vector_store.similarity_search("Zest Money", k=5)
+                    zest_results = self._search_ids("Zest Money", k=5)
                     matches.extend(zest_results)
                 except Exception as e:
                     print(f"Error in Zest Money special handling: {e}")
@@ -371,8 +395,8 @@ class RAGChain:
             if "fi" in query_lower and len(query_lower) < 10:  # Avoid matching "financial", "find", etc.
                 print("Special handling for Fi")
                 try:
-                    fi_results = self.vector_store.similarity_search("Fi", k=5)
-                    fi_bank_results = self.vector_store.similarity_search("Fi bank", k=5)
+                    fi_results = self._search_ids("Fi", k=5)
+                    fi_bank_results = self._search_ids("Fi bank", k=5)
                     matches.extend(fi_results)
                     matches.extend(fi_bank_results)
                 except Exception as e:
@@ -383,86 +407,187 @@ class RAGChain:
             print(f"Error in direct question lookup: {e}")
             return []
     
-    def _hybrid_search(self, query: str, top_k: int = 6) -> List[Document]:
+    def _hybrid_search(self, query: str, top_k: int = 6, vector_results: Optional[List[int]] = None,
+                       strategies=ALL_STRATEGIES) -> List[int]:
         """
         Performs a hybrid search using both vector similarity and keyword matching.
         
         Args:
             query: The search query
             top_k: Number of results to return (reduced from 10 to 6 for more focused results)
+            vector_results: Precomputed dense retrieval chunk ids (from a batched search)
+            strategies: Retrieval strategies to run ("direct", "product", "dense", "keyword")
             
         Returns:
-            List of documents from the search
+            Ids of the chunks found, best first
         """
         # Get results from vector store (dense retrieval)
-        vector_results = self.vector_store.similarity_search(query, k=top_k)
+        if "dense" not in strategies:
+            vector_results = []
+        elif vector_results is None:
+            vector_results = self._search_ids(query, k=top_k)
         
         # Get results from keyword search (sparse retrieval)
-        keyword_results = self._keyword_search(query)
+        keyword_results = self._keyword_search(query) if "keyword" in strategies else []
         
         # Try product specific search if applicable
-        product_results = self._product_specific_search(query)
+        product_results = self._product_specific_search(query) if "product" in strategies else []
         
         # Try direct question lookup for exact matches
-        direct_results = self._direct_question_lookup(query)
+        direct_results = self._direct_question_lookup(query) if "direct" in strategies else []
         
-        # Deduplicate and rank results
+        # Deduplicate and rank results; identical chunks share an id
         all_results = []
+        seen = set()
         
-        # Prioritize exact matches from direct lookup
-        if direct_results:
-            all_results.extend(direct_results[:2])  # Only take top 2 direct matches
-        
-        # Next prioritize product-specific results
-        if product_results:
-            # Filter to avoid duplicates
-            new_products = [doc for doc in product_results[:3] 
-                          if doc.page_content not in [d.page_content for d in all_results]]
-            all_results.extend(new_products)
-        
-        # Add vector results (dense retrieval)
-        for doc in vector_results:
-            if doc.page_content not in [d.page_content for d in all_results]:
-                all_results.append(doc)
-                if len(all_results) >= top_k:
-                    break
-        
-        # If we still need more, add keyword results
-        if len(all_results) < top_k:
-            for doc in keyword_results:
-                if doc.page_content not in [d.page_content for d in all_results]:
-                    all_results.append(doc)
+        def add(chunk_ids) -> bool:
+            for chunk_id in chunk_ids:
+                if chunk_id not in seen:
+                    seen.add(chunk_id)
+                    all_results.append(chunk_id)
                     if len(all_results) >= top_k:
-                        break
+                        return True
+            return False
+        
+        # Prioritize the top 2 exact matches from direct lookup, then the top 3 product-specific
+        # results, then dense retrieval, then keyword results
+        add(direct_results[:2])
+        add(product_results[:3])
+        if not add(vector_results):
+            add(keyword_results)
         
         return all_results[:top_k]
     
-    def _get_context(self, query: str) -> str:
+    def _likely_needs_web_search(self, query: str) -> bool:
+        """
+        Cheap predictor for whether FAQ retrieval will come up short.
+        
+        Args:
+            query (str): User query
+            
+        Returns:
+            bool: True if the query mentions no Gromo, product or FAQ keyword
+        """
+        return _FAQ_TERM_PATTERN.search(query.lower()) is None
+    
+    def _vector_search_ids(self, vectors: List[List[float]], k: int) -> List[List[int]]:
+        """
+        Run one stacked vector search and map the hits to chunk ids.
+        
+        Args:
+            vectors: Query embeddings
+            k: Number of results per query
+            
+        Returns:
+            Chunk ids for each query, best first
+        """
+        if hasattr(self.vector_store, "similarity_search_with_score_by_vectors"):
+            # Array-backed stores search all query vectors as one matrix
+            results = self.vector_store.similarity_search_with_score_by_vectors(vectors, k=k)
+            return [self.chunk_store.ids_for_texts(doc.page_content for doc, _ in hits) for hits in results]
+        
+        if hasattr(self.vector_store, "_collection"):
+            # Chroma accepts many query embeddings in one collection query; only the texts are needed
+            results = self.vector_store._collection.query(query_embeddings=vectors, n_results=k, include=["documents"])
+            return [self.chunk_store.ids_for_texts(texts) for texts in results["documents"]]
+        
+        return [
+            self.chunk_store.ids_for_texts(doc.page_content for doc in self.vector_store.similarity_search_by_vector(vector, k=k))
+            for vector in vectors
+        ]
+    
+    def _search_ids(self, query: str, k: int) -> List[int]:
+        """
+        Dense retrieval for one query.
+        
+        Args:
+            query: The search query
+            k: Number of results
+            
+        Returns:
+            Chunk ids, best first
+        """
+        return self._vector_search_ids([self.vector_store.embeddings.embed_query(query)], k)[0]
+    
+    def _batch_vector_search(self, queries: List[str], k: int) -> Tuple[List[List[float]], List[List[int]]]:
+        """
+        Embed all queries in one model call and run one stacked vector search.
+        
+        Args:
+            queries: The search queries
+            k: Number of results per query
+            
+        Returns:
+            Query vectors and dense retrieval chunk ids for each query, in order
+        """
+        vectors = self.vector_store.embeddings.embed_documents(queries)
+        return vectors, self._vector_search_ids(vectors, k)
+    
+    def _normalize_query(self, query: str) -> str:
+        """
+        Correct misspelled product and bank names before retrieval.
+        
+        Args:
+            query: The user query
+            
+        Returns:
+            The query with product names corrected
+        """
+        if not SPELLING_CORRECTION_ENABLED:
+            return query
+        return self.spelling.normalize(query)[0]
+    
+    def _get_context(self, query: str, vector_results: Optional[List[int]] = None,
+                     route: Optional[RouteDecision] = None, record: bool = True) -> str:
         """
         Retrieves context for the query using multiple retrieval methods
         and formats it for the LLM.
         
         Args:
-            query: The user query
+            query: The user query (already spelling-normalized)
+            vector_results: Precomputed dense retrieval chunk ids (from a batched search)
+            route: Routing decision selecting strategies and web search; all strategies run if omitted
+            record: Count web searches towards prefetch popularity
             
         Returns:
             Formatted context string
         """
-        # Retrieve relevant documents with hybrid search
-        docs = self._hybrid_search(query, top_k=6)  # Reduced from 10 to 6 for more focused results
+        strategies = route.strategies if route else ALL_STRATEGIES
+        # None lets retrieval results decide; True/False come from the router
+        route_web_search = route.web_search if route else None
+        use_web_search = self.use_web_search and route_web_search is not False
         
-        # Get web search results only if needed
-        web_results = []
-        if self.use_web_search and len(docs) < 4:  # Only use web search if we have few relevant docs
-            try:
-                web_results = self.web_search.search_web(query)
-                # Limit to top 2 web results to avoid overwhelming the context
-                web_results = web_results[:2]
-            except Exception as e:
-                print(f"Web search failed: {e}")
+        # Start web search alongside FAQ retrieval when the FAQ is unlikely to cover the query
+        speculative_search = None
+        if use_web_search and SPECULATIVE_WEB_SEARCH_ENABLED and (route_web_search or self._likely_needs_web_search(query)):
+            speculative_search = self.web_search.start_speculative_search(query, record=record)
+        
+        try:
+            # Retrieve relevant documents with hybrid search
+            chunk_ids = self._hybrid_search(query, top_k=6, vector_results=vector_results,
+                                            strategies=strategies)  # Reduced from 10 to 6 for more focused results
+            
+            # Get web search results only if needed
+            web_results = []
+            if use_web_search and (route_web_search or len(chunk_ids) < 4):  # Only use web search if we have few relevant docs
+                try:
+                    if speculative_search is not None:
+                        search, speculative_search = speculative_search, None
+                        web_results = self.web_search.finish_speculative_search(search)
+                    else:
+                        web_results = self.web_search.search_web(query, record=record)
+                    # Limit to top 2 web results to avoid overwhelming the context
+                    web_results = web_results[:2]
+                except Exception as e:
+                    print(f"Web search failed: {e}")
+        finally:
+            if speculative_search is not None:
+                # FAQ retrieval was sufficient (or failed); cancel or discard the speculative request
+                self.web_search.discard_speculative_search(speculative_search)
         
         # Combine and format the context
         context = ""
+        docs = self.chunk_store.documents(chunk_ids)
         if docs:
             faq_section = format_docs(docs)
             context += f"Retrieved {len(docs)} documents from FAQ:\n{faq_section}\n"
@@ -473,44 +598,239 @@ class RAGChain:
         
         return context
     
-    def invoke(self, query: str) -> str:
+    def _prepare_generation(self, query: str, history: str = "", vector_results: Optional[List[int]] = None,
+                            retrieval_query: Optional[str] = None, query_vector: Optional[List[float]] = None,
+                            record: bool = True) -> Tuple[Optional[str], str, Optional[RouteDecision]]:
         """
-        Process a query and return a response.
+        Retrieve context and build the prompt for a query.
         
         Args:
             query: User query
+            history: Bounded conversation history to include in the prompt, if any
+            vector_results: Precomputed dense retrieval chunk ids (from a batched search)
+            retrieval_query: Spelling-normalized query, if already computed
+            query_vector: Embedding of retrieval_query, if already computed
+            record: Count the query in the routing log and web prefetch popularity
             
         Returns:
-            Response from the LLM
+            The stored FAQ answer if the question matches one exactly (otherwise None),
+            the prompt and the routing decision
         """
-        try:
-            print(f"\n\n===== PROCESSING QUERY: {query} =====")
-            
-            # Get context for the query
-            print("Starting retrieval...")
-            context = self._get_context(query)
-            print(f"Retrieved context length: {len(context)} characters")
+        # Serve the stored answer when the question exactly matches an FAQ entry
+        if FAQ_EXACT_ANSWER_ENABLED and not history:
+            faq_answer = self.suggestion_index.lookup_answer(query)
+            if faq_answer:
+                print("Exact FAQ match; returning stored answer without an LLM call")
+                return faq_answer, "", None
+        
+        if retrieval_query is None:
+            retrieval_query = self._normalize_query(query)
+        
+        # Pick strategies, web search and model from the query intent; the query
+        # embedding is reused for dense retrieval
+        route = None
+        if self.router is not None:
+            if query_vector is None:
+                query_vector = self.vector_store.embeddings.embed_query(retrieval_query)
+            route = self.router.route(retrieval_query, query_vector, log=record)
+            if vector_results is None and "dense" in route.strategies:
+                vector_results = self._vector_search_ids([query_vector], k=6)[0]
+        
+        # Get context for the query
+        print("Starting retrieval...")
+        context = self._get_context(retrieval_query, vector_results=vector_results, route=route, record=record)
+        print(f"Retrieved context length: {len(context)} characters")
+        if history:
+            context = f"=== CONVERSATION SO FAR ===\n{history}\n\n{context}"
+        
+        # Create prompt with context and query; the stable system message goes first
+        prompt = RAG_PROMPT_TEMPLATE.format(context=context, question=query)
+        print(f"Total prompt length: {len(prompt)} characters after a ~{estimate_tokens(get_prompt_prefix())}-token cacheable prefix")
+        return None, prompt, route
+    
+    def _respond(self, query: str, history: str = "", llm=None, vector_results: Optional[List[int]] = None,
+                 retrieval_query: Optional[str] = None, query_vector: Optional[List[float]] = None,
+                 record: bool = True) -> str:
+        """
+        Retrieve context, build the prompt and generate a response.
+        
+        Args:
+            query: User query
+            history: Bounded conversation history to include in the prompt, if any
+            llm: Language model to use; created with get_llm() for the routed model if omitted
+            vector_results: Precomputed dense retrieval chunk ids (from a batched search)
+            retrieval_query: Spelling-normalized query, if already computed
+            query_vector: Embedding of retrieval_query, if already computed
+            record: Count the query in the routing log and web prefetch popularity
             
-            # Create prompt with context and query
-            prompt = RAG_PROMPT_TEMPLATE.format(context=context, question=query)
-            print(f"Total prompt length: {len(prompt)} characters")
+        Returns:
+            Response from the LLM
+        """
+        faq_answer, prompt, route = self._prepare_generation(query, history, vector_results, retrieval_query,
+                                                             query_vector, record=record)
+        if faq_answer:
+            return faq_answer
+        
+        # Generate response
+        print("Generating LLM response...")
+        llm = llm or get_llm(route.model if route else None)
+        response = self.llm_policy.call(llm.invoke, build_llm_input(llm, prompt))
+        cached_tokens = server_cached_tokens(response)
+        get_prompt_cache_stats().record(estimate_tokens(get_prompt_prefix()), cached_tokens)
+        print("LLM response generated" + (f" ({cached_tokens} prompt tokens served from cache)" if cached_tokens else ""))
+        
+        # Chat models return a message object; completion models return a string
+        return response.content if hasattr(response, "content") else str(response)
+    
+    def warm(self, query: str) -> int:
+        """
+        Run a query through retrieval only, to warm the embedding model, indexes and web corpus.
+        
+        Makes no web search or LLM call, and does not write to the routing log.
+        
+        Args:
+            query: User query
             
-            # Generate response
-            print("Generating LLM response...")
-            llm = get_llm()
-            response = llm.invoke(prompt)
-            print("LLM response generated")
+        Returns:
+            Number of FAQ chunks retrieved
+        """
+        self.suggestion_index.lookup_answer(query)
+        retrieval_query = self._normalize_query(query)
+        query_vector = self.vector_store.embeddings.embed_query(retrieval_query)
+        route = self.router.route(retrieval_query, query_vector, log=False) if self.router is not None else None
+        strategies = route.strategies if route else ALL_STRATEGIES
+        vector_results = self._vector_search_ids([query_vector], k=6)[0] if "dense" in strategies else None
+        chunk_ids = self._hybrid_search(retrieval_query, top_k=6, vector_results=vector_results, strategies=strategies)
+        self.chunk_store.documents(chunk_ids)
+        if self.use_web_search and WEB_CORPUS_ENABLED:
+            # Loads the corpus and scores it without counting a lookup
+            get_web_corpus().expires_in(retrieval_query, query_vector)
+        return len(chunk_ids)
+    
+    def invoke(self, query: str, history: str = "", retrieval_query: Optional[str] = None,
+               record: bool = True) -> str:
+        """
+        Process a query and return a response.
+        
+        Args:
+            query: User query, as placed in the prompt
+            history: Bounded conversation history to include in the prompt, if any
+            retrieval_query: Self-contained rewrite of a follow-up, used for retrieval instead of query
+            record: Count the query in the routing log and web prefetch popularity (off for warm-up replays)
             
-            # Return the response (either as a string or with its content attribute)
-            return response
+        Returns:
+            Response from the LLM
+        """
+        try:
+            print(f"\n\n===== PROCESSING QUERY: {query} =====")
+            return self._respond(query, history, retrieval_query=self._normalize_query(retrieval_query or query),
+                                 record=record)
         
         except Exception as e:
             print(f"Error in RAG chain: {e}")
-            error_message = (
-                "I apologize, but I encountered an error while processing your question. "
-                "This might be due to the complexity of your query or technical limitations. "
-                "Could you try rephrasing your question? Or if you're asking about "
-                "specific product details, you may want to contact Gromo's customer support "
-                "for the most accurate and up-to-date information."
+            return ERROR_RESPONSE
+    
+    def stream(self, query: str, history: str = "", retrieval_query: Optional[str] = None) -> Iterator[str]:
+        """
+        Process a query and yield the response in chunks as the LLM generates it.
+        
+        Models without native streaming yield the whole response as one chunk.
+        
+        Args:
+            query: User query, as placed in the prompt
+            history: Bounded conversation history to include in the prompt, if any
+            retrieval_query: Self-contained rewrite of a follow-up, used for retrieval instead of query
+            
+        Yields:
+            Response text chunks
+        """
+        produced = False
+        try:
+            print(f"\n\n===== STREAMING QUERY: {query} =====")
+            faq_answer, prompt, route = self._prepare_generation(
+                query, history, retrieval_query=self._normalize_query(retrieval_query or query)
             )
-            return error_message 
\ No newline at end of file
+            if faq_answer:
+                yield faq_answer
+                return
+            
+            print("Streaming LLM response...")
+            llm = get_llm(route.model if route else None)
+            get_prompt_cache_stats().record(estimate_tokens(get_prompt_prefix()))
+            for chunk in self.llm_policy.stream(llm.stream, build_llm_input(llm, prompt)):
+                # Chat models stream message chunks; completion models stream strings
+                text = chunk.content if hasattr(chunk, "content") else str(chunk)
+                if text:
+                    produced = True
+                    yield text
+            print("LLM response streamed")
+        
+        except Exception as e:
+            print(f"Error in RAG chain: {e}")
+            if not produced:
+                yield ERROR_RESPONSE
+    
+    def stream_batch(self, queries: List[str], max_parallel: int = BATCH_LLM_PARALLELISM) -> Iterator[Tuple[int, str]]:
+        """
+        Answer many queries with shared retrieval and concurrent generation.
+        
+        Duplicate queries are answered once. All unique queries are embedded in
+        one model call and searched in one stacked vector search, and LLM calls
+        run concurrently under a parallelism limit.
+        
+        Args:
+            queries: User queries
+            max_parallel: Maximum concurrent retrieval + LLM calls
+            
+        Yields:
+            (position, response) pairs in input order, as soon as each is ready
+        """
+        if not queries:
+            return
+        
+        print(f"\n\n===== PROCESSING BATCH OF {len(queries)} QUERIES =====")
+        unique_queries = list(dict.fromkeys(query.strip() for query in queries))
+        
+        try:
+            retrieval_queries = [self._normalize_query(query) for query in unique_queries]
+            query_vectors, vector_results = self._batch_vector_search(retrieval_queries, k=6)
+        except Exception as e:
+            print(f"Error in batch retrieval: {e}")
+            for position in range(len(queries)):
+                yield position, ERROR_RESPONSE
+            return
+        print(f"Batch retrieval done for {len(unique_queries)} unique queries")
+        
+        def answer(query: str, retrieval_query: str, query_vector: List[float], chunk_ids: List[int]) -> str:
+            try:
+                return self._respond(query, vector_results=chunk_ids, retrieval_query=retrieval_query,
+                                     query_vector=query_vector)
+            except Exception as e:
+                print(f"Error in RAG chain for batch query '{query}': {e}")
+                return ERROR_RESPONSE
+        
+        executor = ThreadPoolExecutor(max_workers=max(1, max_parallel), thread_name_prefix="batch-chat")
+        try:
+            futures = {
+                query: executor.submit(answer, query, retrieval_query, query_vector, chunk_ids)
+                for query, retrieval_query, query_vector, chunk_ids in zip(unique_queries, retrieval_queries, query_vectors, vector_results)
+            }
+            for position, query in enumerate(queries):
+                yield position, futures[query.strip()].result()
+        finally:
+            # A consumer that stops early (client disconnect) closes the generator; drop the
+            # queued LLM calls instead of waiting for answers nobody will read
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def invoke_batch(self, queries: List[str], max_parallel: int = BATCH_LLM_PARALLELISM) -> List[str]:
+        """
+        Answer many queries; see stream_batch.
+        
+        Args:
+            queries: User queries
+            max_parallel: Maximum concurrent retrieval + LLM calls
+            
+        Returns:
+            Responses in input order
+        """
+        return [response for _, response in self.stream_batch(queries, max_parallel)]
@@ -0,0 +1,537 @@
+"""
+Module for bounding the latency of external calls (SERP API and the LLM).
+
+A ResiliencePolicy wraps a call with a per-attempt deadline inside one
+overall deadline, retries with jittered exponential backoff, optional
+hedging after the observed p95 latency, and a circuit breaker that fails
+fast while the upstream is down. Each policy also bounds how many of its
+calls may occupy the shared pool, since calls abandoned at their deadline
+keep running there until the upstream answers.
+"""
+import functools
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from src.config import (
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_RECOVERY_TIMEOUT,
+    RETRY_BASE_DELAY,
+    RETRY_MAX_DELAY,
+    HEDGE_PERCENTILE
+)
+
+# Shared pool that runs external calls so callers can stop waiting at their deadline
+_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="resilience")
+
+# Returned by a stream read once the upstream iterator is exhausted
+_END_OF_STREAM = object()
+
+
+class DeadlineExceeded(Exception):
+    """
+    Raised when an external call does not finish before its deadline.
+    """
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised when a call is skipped because its circuit breaker is open.
+    """
+
+
+class InFlightLimitExceeded(DeadlineExceeded):
+    """
+    Raised when no in-flight slot frees up for a call before its deadline.
+    """
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker with closed, open and half-open states.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 recovery_timeout: float = CIRCUIT_RECOVERY_TIMEOUT):
+        """
+        Initialize a closed circuit breaker.
+
+        Args:
+            name (str): Name of the protected upstream
+            failure_threshold (int, optional): Consecutive failures that open the circuit
+            recovery_timeout (float, optional): Seconds to stay open before allowing a trial call
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        """
+        Check whether a call may proceed.
+
+        Returns:
+            bool: True if the call may proceed
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.recovery_timeout:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                # Let exactly one trial call probe the upstream
+                self._trial_in_flight = True
+                return True
+
+            return False
+
+    def record_success(self):
+        """
+        Record a successful call and close the circuit.
+        """
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        """
+        Record a failed call, opening the circuit if the threshold is reached.
+        """
+        with self._lock:
+            self.consecutive_failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                    print(f"Circuit breaker '{self.name}' opened after {self.consecutive_failures} failures")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get circuit breaker state.
+
+        Returns:
+            Dict[str, Any]: State, failure count and number of times opened
+        """
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "times_opened": self.times_opened,
+            }
+
+
+class LatencyTracker:
+    """
+    Sliding window of recent call latencies.
+    """
+
+    def __init__(self, window: int = 200):
+        """
+        Initialize the tracker.
+
+        Args:
+            window (int, optional): Number of recent latencies kept
+        """
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        """
+        Record a latency sample.
+
+        Args:
+            seconds (float): Observed latency
+        """
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """
+        Get a latency percentile over the window.
+
+        Args:
+            pct (float): Percentile between 0 and 100
+
+        Returns:
+            Optional[float]: The percentile, or None until enough samples are collected
+        """
+        with self._lock:
+            if len(self._latencies) < 20:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(pct / 100.0 * len(ordered)))]
+
+
+def call_with_deadline(fn: Callable, timeout: float, *args, submit: Callable = _executor.submit,
+                       deadline: Optional[float] = None, **kwargs) -> Any:
+    """
+    Run a call in the shared pool and stop waiting for it at the deadline.
+
+    Args:
+        fn (Callable): Function to call
+        timeout (float): Deadline in seconds
+        submit (Callable, optional): Schedules fn and returns a future; the shared pool by default
+        deadline (float, optional): Monotonic time the wait never runs past, checked after submit returns
+
+    Returns:
+        Any: The function's result
+
+    Raises:
+        DeadlineExceeded: If the call does not finish in time
+    """
+    future = submit(fn, *args, **kwargs)
+    if deadline is not None:
+        # submit may have blocked waiting for an in-flight slot
+        timeout = max(0.0, min(timeout, deadline - time.monotonic()))
+    done, _ = wait([future], timeout=timeout)
+    if not done:
+        future.cancel()
+        raise DeadlineExceeded(f"Call did not finish within {timeout:.1f}s")
+    return future.result()
+
+
+def hedged_call(fn: Callable, timeout: float, hedge_delay: float, *args, submit: Callable = _executor.submit,
+                deadline: Optional[float] = None, **kwargs) -> Any:
+    """
+    Run a call and, if it has not finished after hedge_delay, race a duplicate against it.
+
+    Args:
+        fn (Callable): Idempotent function to call
+        timeout (float): Overall deadline in seconds
+        hedge_delay (float): Seconds to wait before sending the hedged duplicate
+        submit (Callable, optional): Schedules fn and returns a future; the shared pool by default
+        deadline (float, optional): Monotonic time the wait never runs past, checked after submit returns
+
+    Returns:
+        Any: The result of whichever call succeeds first
+
+    Raises:
+        DeadlineExceeded: If neither call succeeds in time
+    """
+    pending = {submit(fn, *args, **kwargs)}
+    # Measured after submit, which may have blocked waiting for an in-flight slot
+    wait_until = time.monotonic() + timeout
+    if deadline is not None:
+        wait_until = min(wait_until, deadline)
+
+    done, pending = wait(pending, timeout=max(0.0, min(hedge_delay, wait_until - time.monotonic())))
+    if not done:
+        try:
+            pending.add(submit(fn, *args, **kwargs))
+        except InFlightLimitExceeded:
+            pass  # No room for a duplicate; keep waiting on the first call
+
+    last_error = None
+    while True:
+        for future in done:
+            if future.exception() is None:
+                for other in pending:
+                    other.cancel()
+                return future.result()
+            last_error = future.exception()
+
+        remaining = wait_until - time.monotonic()
+        if not pending or remaining <= 0:
+            break
+        done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+
+    for other in pending:
+        other.cancel()
+    if last_error is not None:
+        raise last_error
+    raise DeadlineExceeded(f"Hedged call did not finish within {timeout:.1f}s")
+
+
+class ResiliencePolicy:
+    """
+    Deadline, retry, hedging and circuit breaker policy for one upstream.
+    """
+
+    def __init__(self, name: str, timeout: float, retries: int = 0, hedge: bool = False,
+                 total_timeout: Optional[float] = None, max_in_flight: int = 8,
+                 first_chunk_timeout: Optional[float] = None, idle_timeout: Optional[float] = None,
+                 base_delay: float = RETRY_BASE_DELAY, max_delay: float = RETRY_MAX_DELAY,
+                 hedge_percentile: float = HEDGE_PERCENTILE):
+        """
+        Initialize the policy.
+
+        Args:
+            name (str): Name of the upstream
+            timeout (float): Deadline per attempt in seconds
+            retries (int, optional): Extra attempts after a failure
+            hedge (bool, optional): Whether to hedge attempts slower than the observed percentile
+            total_timeout (float, optional): Deadline across all attempts and backoff; the per-attempt timeout if omitted
+            max_in_flight (int, optional): Calls of this policy allowed in the shared pool at once
+            first_chunk_timeout (float, optional): Seconds a stream may take to produce its first chunk; no limit if omitted
+            idle_timeout (float, optional): Longest gap between streamed chunks; no limit if omitted
+            base_delay (float, optional): Base backoff delay in seconds
+            max_delay (float, optional): Maximum backoff delay in seconds
+            hedge_percentile (float, optional): Latency percentile after which a hedge is sent
+        """
+        self.name = name
+        self.timeout = timeout
+        self.retries = retries
+        self.hedge = hedge
+        self.total_timeout = total_timeout or timeout
+        self.max_in_flight = max_in_flight
+        self.first_chunk_timeout = first_chunk_timeout
+        self.idle_timeout = idle_timeout
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge_percentile = hedge_percentile
+        self.breaker = CircuitBreaker(name)
+        self.latency = LatencyTracker()
+        self._counters = {"calls": 0, "failures": 0, "deadline_exceeded": 0, "retries": 0, "short_circuited": 0,
+                          "in_flight_limited": 0}
+        self._lock = threading.Lock()
+        self._in_flight = threading.BoundedSemaphore(max_in_flight)
+        self._in_flight_count = 0
+
+    def _count(self, key: str):
+        with self._lock:
+            self._counters[key] += 1
+
+    def _submit(self, deadline: float, fn: Callable, *args, **kwargs):
+        """
+        Run a call in the shared pool once one of this policy's in-flight slots is free.
+
+        A slot is held until the call returns, even after the caller stopped
+        waiting for it, so a hanging upstream cannot occupy the whole pool.
+
+        Args:
+            deadline (float): Monotonic time after which waiting for a slot fails
+            fn (Callable): Function to call
+
+        Returns:
+            Future: The scheduled call
+
+        Raises:
+            InFlightLimitExceeded: If no slot frees up before the deadline
+        """
+        if not self._in_flight.acquire(timeout=max(0.0, deadline - time.monotonic())):
+            self._count("in_flight_limited")
+            raise InFlightLimitExceeded(f"{self.max_in_flight} '{self.name}' calls already in flight")
+        with self._lock:
+            self._in_flight_count += 1
+        try:
+            future = _executor.submit(fn, *args, **kwargs)
+        except BaseException:
+            self._release_slot()
+            raise
+        future.add_done_callback(lambda _: self._release_slot())
+        return future
+
+    def _release_slot(self):
+        with self._lock:
+            self._in_flight_count -= 1
+        self._in_flight.release()
+
+    def call(self, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Call an upstream function under this policy.
+
+        Args:
+            fn (Callable): Function to call; must be safe to retry
+
+        Returns:
+            Any: The function's result
+
+        Raises:
+            CircuitOpenError: If the circuit breaker is open
+            Exception: The last error once all attempts have failed
+        """
+        self._count("calls")
+        if not self.breaker.allow_request():
+            self._count("short_circuited")
+            raise CircuitOpenError(f"Circuit breaker for '{self.name}' is open")
+
+        deadline = time.monotonic() + self.total_timeout
+        submit = functools.partial(self._submit, deadline)
+        last_error = None
+        for attempt in range(self.retries + 1):
+            if attempt > 0:
+                # Full jitter: sleep a random fraction of the exponential backoff
+                backoff = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+                if deadline - time.monotonic() <= backoff:
+                    break
+                self._count("retries")
+                time.sleep(backoff)
+
+            timeout = min(self.timeout, deadline - time.monotonic())
+            started = time.monotonic()
+            try:
+                hedge_delay = self.latency.percentile(self.hedge_percentile) if self.hedge else None
+                if hedge_delay is not None and hedge_delay < timeout:
+                    result = hedged_call(fn, timeout, hedge_delay, *args, submit=submit, deadline=deadline, **kwargs)
+                else:
+                    result = call_with_deadline(fn, timeout, *args, submit=submit, deadline=deadline, **kwargs)
+            except Exception as e:
+                last_error = e
+                self._count("deadline_exceeded" if isinstance(e, DeadlineExceeded) else "failures")
+                print(f"{self.name} call failed (attempt {attempt + 1}/{self.retries + 1}): {e}")
+                continue
+
+            self.latency.record(time.monotonic() - started)
+            self.breaker.record_success()
+            return result
+
+        self.breaker.record_failure()
+        raise last_error
+
+    def stream(self, fn: Callable, *args, **kwargs) -> Iterator[Any]:
+        """
+        Stream chunks from an upstream generator under this policy.
+
+        Attempts that fail before the first chunk are retried with backoff
+        within the overall deadline; once chunks have been yielded a failure
+        is raised to the caller, since a retry would repeat text it has
+        already shown. With first_chunk_timeout or idle_timeout set, each
+        chunk is awaited in the shared pool so a stalled upstream is
+        abandoned instead of holding the caller indefinitely. Hedging does
+        not apply to streams.
+
+        Args:
+            fn (Callable): Function returning an iterator of chunks
+
+        Yields:
+            Any: Chunks from the upstream
+
+        Raises:
+            CircuitOpenError: If the circuit breaker is open
+            DeadlineExceeded: If the first chunk or the next chunk does not arrive in time
+            Exception: The last error once all attempts have failed
+        """
+        self._count("calls")
+        if not self.breaker.allow_request():
+            self._count("short_circuited")
+            raise CircuitOpenError(f"Circuit breaker for '{self.name}' is open")
+
+        deadline = time.monotonic() + self.total_timeout
+        last_error = None
+        for attempt in range(self.retries + 1):
+            if attempt > 0:
+                backoff = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+                if deadline - time.monotonic() <= backoff:
+                    break
+                self._count("retries")
+                time.sleep(backoff)
+
+            started = False
+            try:
+                chunks = iter(fn(*args, **kwargs))
+                while True:
+                    if started:
+                        chunk = self._next_chunk(chunks, self.idle_timeout)
+                    else:
+                        first_timeout = deadline - time.monotonic()
+                        if self.first_chunk_timeout is not None:
+                            first_timeout = min(first_timeout, self.first_chunk_timeout)
+                        chunk = self._next_chunk(chunks, first_timeout)
+                    if chunk is _END_OF_STREAM:
+                        break
+                    started = True
+                    yield chunk
+            except GeneratorExit:
+                # The consumer stopped reading (e.g. a client disconnect) after the
+                # upstream produced chunks, so count it as healthy and release a half-open trial
+                self.breaker.record_success()
+                raise
+            except Exception as e:
+                last_error = e
+                self._count("deadline_exceeded" if isinstance(e, DeadlineExceeded) else "failures")
+                print(f"{self.name} stream failed (attempt {attempt + 1}/{self.retries + 1}): {e}")
+                if started:
+                    break
+                continue
+
+            self.breaker.record_success()
+            return
+
+        self.breaker.record_failure()
+        raise last_error
+
+    def _next_chunk(self, chunks: Iterator[Any], timeout: Optional[float]) -> Any:
+        """
+        Get the next chunk of a stream, waiting at most timeout seconds.
+
+        Returns:
+            Any: The chunk, or _END_OF_STREAM once the stream is exhausted
+
+        Raises:
+            DeadlineExceeded: If no chunk arrives in time (the stalled read is abandoned)
+        """
+        if timeout is None:
+            return next(chunks, _END_OF_STREAM)
+        deadline = time.monotonic() + timeout
+        return call_with_deadline(next, timeout, chunks, _END_OF_STREAM,
+                                  submit=functools.partial(self._submit, deadline), deadline=deadline)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get policy metrics.
+
+        Returns:
+            Dict[str, Any]: Counters, calls in flight, p95 latency and circuit breaker state
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            in_flight = self._in_flight_count
+        p95 = self.latency.percentile(95)
+        return {
+            **counters,
+            "in_flight": in_flight,
+            "max_in_flight": self.max_in_flight,
+            "p95_seconds": round(p95, 3) if p95 is not None else None,
+            "circuit": self.breaker.stats(),
+        }
+
+
+_policies = {}
+_policies_lock = threading.Lock()
+
+
+def get_policy(name: str, **kwargs) -> ResiliencePolicy:
+    """
+    Get the process-wide policy for an upstream, creating it on first use.
+
+    Args:
+        name (str): Name of the upstream
+        **kwargs: ResiliencePolicy arguments used when the policy is created
+
+    Returns:
+        ResiliencePolicy: The shared policy
+    """
+    with _policies_lock:
+        if name not in _policies:
+            _policies[name] = ResiliencePolicy(name, **kwargs)
+        return _policies[name]
+
+
+def get_resilience_stats() -> Dict[str, Any]:
+    """
+    Get metrics for every registered policy.
+
+    Returns:
+        Dict[str, Any]: Policy metrics keyed by upstream name
+    """
+    with _policies_lock:
+        policies = dict(_policies)
+    return {name: policy.stats() for name, policy in policies.items()}
@@ -0,0 +1,370 @@
+"""
+Module for sharded multi-process retrieval with scatter-gather top-k merging.
+
+The corpus is split round-robin across N shards. Once loaded, each shard is
+served by its own worker process (in memory or memory-mapped, depending on
+the shard index type), so a query is scattered to every core at once and the
+per-shard top-k lists are merged into the global top-k. Requests carry an
+id, so concurrent searches share the worker pipes without waiting for each
+other's replies. The same class works in-process before workers are started,
+which keeps index building and single-machine testing simple.
+"""
+import atexit
+import heapq
+import itertools
+import json
+import multiprocessing
+import os
+import threading
+import weakref
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.config import SHARD_COUNT, SHARD_INDEX_BACKEND
+# Imported so their index types are registered in this process and in workers
+import src.ivf_index  # noqa: F401
+import src.quantized_index  # noqa: F401
+from src.vector_index import _INDEX_TYPES, load_index, register_index
+
+# Indexes with running workers, stopped at exit; weak so the registry does not keep them alive
+_open_indexes = weakref.WeakSet()
+
+
+def _close_open_indexes():
+    for index in list(_open_indexes):
+        index.close()
+
+
+atexit.register(_close_open_indexes)
+
+
+def _shard_worker(directory: str, conn):
+    """
+    Worker process main loop: load one shard and answer commands over a pipe.
+
+    Commands are (request id, command, *args) and each reply echoes the request id.
+
+    Args:
+        directory (str): Directory the shard was saved to
+        conn: Worker end of a multiprocessing pipe
+    """
+    index = load_index(directory)
+    conn.send(("ok", len(index)))
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+
+        request_id, command = message[0], message[1]
+        try:
+            if command == "search":
+                conn.send((request_id, "ok", index.search(message[2], message[3]) if len(index) else None))
+            elif command == "add":
+                index.add(message[2])
+                conn.send((request_id, "ok", len(index)))
+            elif command == "save":
+                index.save(message[2])
+                conn.send((request_id, "ok", None))
+            elif command == "close":
+                conn.send((request_id, "ok", None))
+                break
+        except Exception as e:
+            conn.send((request_id, "error", repr(e)))
+
+    conn.close()
+
+
+class _WorkerConnection:
+    """
+    Parent end of a worker pipe, shared by concurrent callers.
+
+    A reader thread matches each reply to the future of the request with the
+    same id, so a caller waits only for its own replies.
+    """
+
+    def __init__(self, conn, name: str):
+        """
+        Start reading replies from a worker that has already reported ready.
+
+        Args:
+            conn: Parent end of a multiprocessing pipe
+            name (str): Worker name, used for the reader thread
+        """
+        self.conn = conn
+        self._send_lock = threading.Lock()
+        self._pending_lock = threading.Lock()
+        self._pending: Dict[int, Future] = {}
+        self._ids = itertools.count()
+        self._closed = False
+        self._reader = threading.Thread(target=self._read, name=f"{name}-reader", daemon=True)
+        self._reader.start()
+
+    def request(self, message: tuple) -> Future:
+        """
+        Send a command to the worker.
+
+        Args:
+            message (tuple): Command name followed by its arguments
+
+        Returns:
+            Future: Resolves to the reply payload, or raises RuntimeError if the worker failed
+        """
+        future = Future()
+        with self._pending_lock:
+            if self._closed:
+                future.set_exception(RuntimeError("Shard worker has exited"))
+                return future
+            request_id = next(self._ids)
+            self._pending[request_id] = future
+
+        try:
+            with self._send_lock:
+                self.conn.send((request_id,) + message)
+        except Exception as e:
+            with self._pending_lock:
+                self._pending.pop(request_id, None)
+            future.set_exception(e)
+        return future
+
+    def _read(self):
+        while True:
+            try:
+                request_id, status, payload = self.conn.recv()
+            except (EOFError, OSError):
+                break
+            with self._pending_lock:
+                future = self._pending.pop(request_id, None)
+            if future is None:
+                continue
+            if status == "ok":
+                future.set_result(payload)
+            else:
+                future.set_exception(RuntimeError(f"Shard worker error: {payload}"))
+
+        # Fail requests still waiting on a worker that is gone
+        with self._pending_lock:
+            self._closed = True
+            pending, self._pending = list(self._pending.values()), {}
+        for future in pending:
+            future.set_exception(RuntimeError("Shard worker has exited"))
+
+    def close(self):
+        """
+        Wait for the reader to finish after the worker has exited, then close the pipe.
+        """
+        self._reader.join(timeout=5)
+        self.conn.close()
+
+
+@register_index("sharded")
+class ShardedIndex:
+    """
+    Index split round-robin across shards, each optionally served by a worker process.
+    """
+
+    def __init__(self, dim: Optional[int] = None, num_shards: int = SHARD_COUNT,
+                 shard_backend: str = SHARD_INDEX_BACKEND):
+        """
+        Initialize an empty in-process sharded index.
+
+        Args:
+            dim (int, optional): Embedding dimension
+            num_shards (int, optional): Number of shards (and worker processes)
+            shard_backend (str, optional): Index type of each shard ("exact", "int8", "binary" or "ivf")
+        """
+        self.dim = dim
+        self.num_shards = num_shards
+        self.shard_backend = shard_backend
+        self.shards = [_INDEX_TYPES[shard_backend]() for _ in range(num_shards)]
+        self.ntotal = 0
+        self._workers = []
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self.ntotal
+
+    @property
+    def is_distributed(self) -> bool:
+        return bool(self._connections)
+
+    def _request_all(self, messages: List[tuple]) -> List[Any]:
+        """
+        Scatter one message to each worker and gather the replies in shard order.
+
+        Concurrent callers interleave on the pipes; each waits only for its own replies.
+        """
+        futures = [conn.request(message) for conn, message in zip(self._connections, messages)]
+        return [future.result() for future in futures]
+
+    def add(self, vectors: np.ndarray):
+        """
+        Append vectors, assigning global id g to shard g % num_shards.
+
+        Args:
+            vectors (np.ndarray): Vectors of shape (n, dim)
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        # Adds are serialized so global ids stay consistent; searches do not take the lock
+        with self._lock:
+            self.dim = vectors.shape[1]
+            # Rows whose global id (ntotal + row) falls on each shard
+            parts = [vectors[(shard - self.ntotal) % self.num_shards::self.num_shards] for shard in range(self.num_shards)]
+
+            if self.is_distributed:
+                self._request_all([("add", part) for part in parts])
+            else:
+                for shard, part in zip(self.shards, parts):
+                    if len(part):
+                        shard.add(part)
+
+            self.ntotal += vectors.shape[0]
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Scatter queries to every shard and merge the per-shard top-k lists.
+
+        Args:
+            queries (np.ndarray): Query vectors of shape (m, dim)
+            k (int): Number of results per query
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Scores and global ids, each of shape (m, k); missing results have id -1
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        if self.is_distributed:
+            results = self._request_all([("search", queries, k) for _ in range(self.num_shards)])
+        else:
+            results = [shard.search(queries, k) if len(shard) else None for shard in self.shards]
+
+        all_scores = np.full((queries.shape[0], k), -np.inf, dtype=np.float32)
+        all_ids = np.full((queries.shape[0], k), -1, dtype=np.int64)
+        for row in range(queries.shape[0]):
+            # Each shard's list is already sorted by descending score
+            per_shard = []
+            for shard, result in enumerate(results):
+                if result is None:
+                    continue
+                scores, local_ids = result
+                per_shard.append([
+                    (float(score), int(local_id) * self.num_shards + shard)
+                    for score, local_id in zip(scores[row], local_ids[row])
+                    if local_id >= 0
+                ])
+
+            merged = heapq.merge(*per_shard, key=lambda hit: -hit[0])
+            for position, (score, global_id) in enumerate(merged):
+                if position >= k:
+                    break
+                all_scores[row, position] = score
+                all_ids[row, position] = global_id
+
+        return all_scores, all_ids
+
+    def memory_bytes(self) -> int:
+        """
+        Get the resident memory of in-process shards (worker memory is not counted).
+
+        Returns:
+            int: Bytes
+        """
+        if self.is_distributed:
+            return 0
+        return int(sum(shard.memory_bytes() for shard in self.shards))
+
+    def save(self, directory: str):
+        """
+        Persist every shard to its own subdirectory.
+
+        Args:
+            directory (str): Target directory
+        """
+        os.makedirs(directory, exist_ok=True)
+        shard_dirs = [os.path.join(directory, f"shard_{i}") for i in range(self.num_shards)]
+
+        if self.is_distributed:
+            self._request_all([("save", path) for path in shard_dirs])
+        else:
+            for shard, path in zip(self.shards, shard_dirs):
+                shard.save(path)
+
+        with open(os.path.join(directory, "index.json"), "w") as f:
+            json.dump({
+                "type": self.index_type,
+                "dim": self.dim,
+                "num_shards": self.num_shards,
+                "shard_backend": self.shard_backend,
+                "ntotal": self.ntotal,
+            }, f)
+
+    def start_workers(self, directory: str):
+        """
+        Start one worker process per shard, each loading its shard from disk.
+
+        Args:
+            directory (str): Directory the sharded index was saved to
+        """
+        if self.is_distributed:
+            return
+
+        context = multiprocessing.get_context("spawn")
+        parent_conns = []
+        for i in range(self.num_shards):
+            parent_conn, child_conn = context.Pipe()
+            worker = context.Process(
+                target=_shard_worker,
+                args=(os.path.join(directory, f"shard_{i}"), child_conn),
+                name=f"retrieval-shard-{i}",
+                daemon=True
+            )
+            worker.start()
+            self._workers.append(worker)
+            parent_conns.append(parent_conn)
+
+        sizes = [conn.recv()[1] for conn in parent_conns]
+        self._connections = [
+            _WorkerConnection(conn, worker.name) for conn, worker in zip(parent_conns, self._workers)
+        ]
+        # In-process shards are no longer needed once workers serve them
+        self.shards = []
+        _open_indexes.add(self)
+        print(f"Started {self.num_shards} retrieval shard workers with sizes {sizes}")
+
+    def close(self):
+        """
+        Stop the worker processes.
+        """
+        if not self.is_distributed:
+            return
+        _open_indexes.discard(self)
+        try:
+            self._request_all([("close",) for _ in range(self.num_shards)])
+        except Exception:
+            pass
+        for worker in self._workers:
+            worker.join(timeout=5)
+        for conn in self._connections:
+            conn.close()
+        self._workers = []
+        self._connections = []
+
+    @classmethod
+    def load(cls, directory: str, info: Dict[str, Any]) -> "ShardedIndex":
+        """
+        Load a persisted sharded index and start its worker processes.
+
+        Args:
+            directory (str): Directory the index was saved to
+            info (Dict[str, Any]): Contents of index.json
+
+        Returns:
+            ShardedIndex: The loaded index, served by worker processes
+        """
+        index = cls(info["dim"], info["num_shards"], info["shard_backend"])
+        index.ntotal = info["ntotal"]
+        index.start_workers(directory)
+        return index
@@ -0,0 +1,218 @@
+"""
+Module for typo-tolerant product and bank name normalization.
+
+Uses a SymSpell-style index: every dictionary term is stored under all of its
+deletions up to the maximum edit distance, so a misspelled token is looked up
+by generating its own deletions and probing the index instead of comparing it
+against every term. Multi-word names are matched with spaces removed, which
+also fixes run-together spellings like "zestmoney" and split ones like
+"lending kart".
+"""
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from langchain_core.documents import Document
+
+from src.config import SPELLING_MAX_EDIT_DISTANCE
+
+# Tokens shorter than this are never fuzzily corrected ("fi", "lic", "sbi" are too close to other words)
+_MIN_FUZZY_LENGTH = 4
+
+_TOKEN_PATTERN = re.compile(r"[A-Za-z0-9]+")
+
+
+def _deletes(word: str, max_distance: int) -> Set[str]:
+    """
+    Generate all strings reachable from word by up to max_distance deletions.
+    """
+    results = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w)) if len(w) > 1}
+        results |= frontier
+    return results
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """
+    Optimal string alignment distance (Levenshtein plus adjacent transpositions).
+
+    Args:
+        a (str): First string
+        b (str): Second string
+        max_distance (int): Distances above this are reported as max_distance + 1
+
+    Returns:
+        int: The distance, capped at max_distance + 1
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+
+    return min(previous[len(b)], max_distance + 1)
+
+
+class SpellingNormalizer:
+    """
+    Deletion-neighbourhood index that corrects product and bank names in queries.
+    """
+
+    def __init__(self, terms: Dict[str, int], known_words: Iterable[str] = (),
+                 max_edit_distance: int = SPELLING_MAX_EDIT_DISTANCE):
+        """
+        Build the index.
+
+        Args:
+            terms (Dict[str, int]): Canonical names (may contain spaces) and their corpus frequencies
+            known_words (Iterable[str], optional): Correctly spelled words that must not be corrected
+            max_edit_distance (int, optional): Maximum edits for a correction
+        """
+        self.max_edit_distance = max_edit_distance
+        self.known_words = {word.lower() for word in known_words}
+        self._terms = {}  # Name with spaces removed -> (canonical name, frequency)
+        self._index = defaultdict(list)  # Deletion -> names with spaces removed
+
+        for term, frequency in terms.items():
+            canonical = term.lower().strip()
+            compact = canonical.replace(" ", "")
+            if not compact or compact in self._terms:
+                continue
+            self._terms[compact] = (canonical, frequency)
+            for deletion in _deletes(compact, self._max_distance(compact)):
+                self._index[deletion].append(compact)
+
+        self._lock = threading.Lock()
+        self._corrections = Counter()
+        self._queries_corrected = 0
+
+    @classmethod
+    def from_corpus(cls, documents: List[Document], product_names: Iterable[str]) -> "SpellingNormalizer":
+        """
+        Build the normalizer from the FAQ corpus and a product dictionary.
+
+        Args:
+            documents (List[Document]): FAQ documents; their words are treated as correctly spelled
+            product_names (Iterable[str]): Product and bank names to correct towards
+
+        Returns:
+            SpellingNormalizer: The built normalizer
+        """
+        corpus = " ".join(doc.page_content.lower() for doc in documents)
+        known_words = set(_TOKEN_PATTERN.findall(corpus))
+        # Frequent names win ties between equally close candidates
+        terms = {name.lower(): corpus.count(name.lower()) + 1 for name in product_names}
+
+        normalizer = cls(terms, known_words)
+        print(f"Built spelling index with {len(normalizer._terms)} product names and {len(normalizer._index)} deletion keys")
+        return normalizer
+
+    def _max_distance(self, word: str) -> int:
+        return 1 if len(word) <= 5 else self.max_edit_distance
+
+    def lookup(self, word: str) -> Optional[str]:
+        """
+        Find the closest dictionary name for a (possibly run-together) word.
+
+        Args:
+            word (str): Lowercase word with spaces removed
+
+        Returns:
+            Optional[str]: Canonical name, or None if no name is within the edit distance
+        """
+        if word in self._terms:
+            return self._terms[word][0]
+        if len(word) < _MIN_FUZZY_LENGTH:
+            return None
+
+        max_distance = self._max_distance(word)
+        best = None
+        for deletion in _deletes(word, max_distance):
+            for compact in self._index.get(deletion, ()):
+                distance = edit_distance(word, compact, max_distance)
+                if distance > max_distance:
+                    continue
+                candidate = (distance, -self._terms[compact][1], compact)
+                if best is None or candidate < best:
+                    best = candidate
+
+        return self._terms[best[2]][0] if best else None
+
+    def _is_known(self, word: str) -> bool:
+        return word in self.known_words or word in self._terms
+
+    def normalize(self, query: str) -> Tuple[str, List[Tuple[str, str]]]:
+        """
+        Correct misspelled product and bank names in a query.
+
+        Adjacent word pairs are tried first (so "zest mony" and "lending kart"
+        are matched as one name), then single words. Words that appear in the
+        FAQ corpus are left alone unless they join into an exact name.
+
+        Args:
+            query (str): User query
+
+        Returns:
+            Tuple[str, List[Tuple[str, str]]]: Normalized query and the (original, corrected) pairs applied
+        """
+        tokens = list(_TOKEN_PATTERN.finditer(query))
+        replacements = []  # (start, end, original, corrected)
+        i = 0
+        while i < len(tokens):
+            word = tokens[i].group().lower()
+
+            if i + 1 < len(tokens):
+                next_word = tokens[i + 1].group().lower()
+                joined = word + next_word
+                if joined in self._terms or not (self._is_known(word) and self._is_known(next_word)):
+                    corrected = self.lookup(joined)
+                    if corrected and corrected != f"{word} {next_word}":
+                        replacements.append((tokens[i].start(), tokens[i + 1].end(), query[tokens[i].start():tokens[i + 1].end()], corrected))
+                        i += 2
+                        continue
+
+            if word in self._terms or not self._is_known(word):
+                corrected = self.lookup(word)
+                if corrected and corrected != word:
+                    replacements.append((tokens[i].start(), tokens[i].end(), tokens[i].group(), corrected))
+            i += 1
+
+        if not replacements:
+            return query, []
+
+        normalized = query
+        for start, end, _, corrected in reversed(replacements):
+            normalized = normalized[:start] + corrected + normalized[end:]
+
+        corrections = [(original, corrected) for _, _, original, corrected in replacements]
+        with self._lock:
+            self._queries_corrected += 1
+            self._corrections.update(f"{original} -> {corrected}" for original, corrected in corrections)
+        print(f"Spelling corrections applied: {corrections}")
+        return normalized, corrections
+
+    def stats(self) -> Dict[str, object]:
+        """
+        Get correction metrics.
+
+        Returns:
+            Dict[str, object]: Number of corrected queries and the most frequent corrections
+        """
+        with self._lock:
+            return {
+                "queries_corrected": self._queries_corrected,
+                "top_corrections": dict(self._corrections.most_common(20)),
+            }
@@ -0,0 +1,169 @@
+"""
+Module for question autocomplete over the FAQ questions.
+
+Normalized FAQ questions are kept in a sorted array, so a prefix lookup is a
+binary search plus a short scan. When no question starts with the typed
+prefix (usually a typo), a character-trigram index ranks questions by
+trigram overlap instead. Both lookups take well under a millisecond for
+FAQ-sized corpora, fast enough to run on every keystroke.
+"""
+import re
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+
+from src.config import SUGGEST_MAX_RESULTS, SUGGEST_MIN_PREFIX
+
+# Minimum share of the prefix's trigrams a question must contain to be a typo-tolerant match
+_MIN_TRIGRAM_OVERLAP = 0.3
+
+
+def normalize_question(text: str) -> str:
+    """
+    Normalize a question for matching: lowercase, no punctuation, single spaces.
+
+    Args:
+        text (str): Question text
+
+    Returns:
+        str: Normalized text
+    """
+    return re.sub(r"\s+", " ", re.sub(r"[^\w\s]", " ", text.lower())).strip()
+
+
+def _trigrams(text: str) -> set:
+    padded = f"  {text}"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SuggestionIndex:
+    """
+    Sorted-array prefix index over FAQ questions with a trigram typo fallback.
+    """
+
+    def __init__(self, questions: List[str], answers: Optional[List[Optional[str]]] = None):
+        """
+        Build the index.
+
+        Args:
+            questions (List[str]): FAQ questions
+            answers (List[Optional[str]], optional): Full answer for each question, or None if unknown
+        """
+        answers = answers or [None] * len(questions)
+        entries = {}
+        for question, answer in zip(questions, answers):
+            key = normalize_question(question)
+            if key and key not in entries:
+                entries[key] = (question, answer)
+
+        self.keys = sorted(entries)
+        self.questions = [entries[key][0] for key in self.keys]
+        self.answers = [entries[key][1] for key in self.keys]
+        self._positions = {key: i for i, key in enumerate(self.keys)}
+        self._key_lengths = np.array([len(key) for key in self.keys], dtype=np.int32)
+
+        postings = defaultdict(list)
+        for i, key in enumerate(self.keys):
+            for trigram in _trigrams(key):
+                postings[trigram].append(i)
+        self._trigram_postings = {trigram: np.array(ids, dtype=np.int32) for trigram, ids in postings.items()}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @classmethod
+    def from_documents(cls, documents: List[Document]) -> "SuggestionIndex":
+        """
+        Build the index from FAQ chunks as stored in the vector store.
+
+        A question's answer is kept only when the whole FAQ entry fits in one
+        chunk, so the exact-match shortcut never serves a truncated answer.
+
+        Args:
+            documents (List[Document]): Stored documents with "question" metadata
+
+        Returns:
+            SuggestionIndex: The built index
+        """
+        chunks = defaultdict(list)
+        for doc in documents:
+            question = doc.metadata.get("question")
+            if question and doc.metadata.get("source") == "gromo_faq":
+                chunks[question].append(doc.page_content)
+
+        questions, answers = [], []
+        for question, texts in chunks.items():
+            answer = None
+            if len(texts) == 1 and "Answer:" in texts[0]:
+                answer = texts[0].split("Answer:", 1)[1].strip()
+            questions.append(question)
+            answers.append(answer)
+
+        index = cls(questions, answers)
+        print(f"Built suggestion index over {len(index)} FAQ questions ({sum(a is not None for a in answers)} with cached answers)")
+        return index
+
+    def _prefix_matches(self, prefix: str, limit: int) -> List[int]:
+        start = bisect_left(self.keys, prefix)
+        matches = []
+        for i in range(start, len(self.keys)):
+            if not self.keys[i].startswith(prefix) or len(matches) >= limit:
+                break
+            matches.append(i)
+        return matches
+
+    def _fuzzy_matches(self, prefix: str, limit: int) -> List[int]:
+        query_trigrams = _trigrams(prefix)
+        postings = [self._trigram_postings[t] for t in query_trigrams if t in self._trigram_postings]
+        if not postings:
+            return []
+
+        # Count shared trigrams per question in one vectorized pass
+        counts = np.bincount(np.concatenate(postings), minlength=len(self.keys))
+        candidates = np.flatnonzero(counts >= _MIN_TRIGRAM_OVERLAP * len(query_trigrams))
+        # Most shared trigrams first, shorter questions breaking ties
+        ranked = candidates[np.lexsort((self._key_lengths[candidates], -counts[candidates]))]
+        return ranked[:limit].tolist()
+
+    def suggest(self, prefix: str, limit: int = SUGGEST_MAX_RESULTS) -> List[Dict[str, object]]:
+        """
+        Suggest FAQ questions for a partially typed question.
+
+        Args:
+            prefix (str): Text typed so far
+            limit (int, optional): Maximum suggestions
+
+        Returns:
+            List[Dict[str, object]]: Suggestions with the question, whether it has a cached answer, and the match type
+        """
+        prefix = normalize_question(prefix)
+        if len(prefix) < SUGGEST_MIN_PREFIX:
+            return []
+
+        matches = self._prefix_matches(prefix, limit)
+        match_type = "prefix"
+        if not matches:
+            matches = self._fuzzy_matches(prefix, limit)
+            match_type = "fuzzy"
+
+        return [
+            {"question": self.questions[i], "has_answer": self.answers[i] is not None, "match": match_type}
+            for i in matches
+        ]
+
+    def lookup_answer(self, question: str) -> Optional[str]:
+        """
+        Get the cached FAQ answer for a question that exactly matches an FAQ entry.
+
+        Args:
+            question (str): User question
+
+        Returns:
+            Optional[str]: The FAQ answer, or None if there is no exact match with a cached answer
+        """
+        position = self._positions.get(normalize_question(question))
+        return self.answers[position] if position is not None else None
+
@@ -0,0 +1,321 @@
+"""
+Module for serving many tenants' FAQ collections from one process.
+
+Each tenant has its own FAQ file and vector store directory (with its entity
+index and intent router). A tenant's RAG chain is built on the first request
+that names it and kept in memory afterwards. Loaded tenants are tracked in
+least-recently-used order with an estimate of the memory they hold; when the
+total exceeds the budget, the coldest tenants are unloaded and will be loaded
+again on their next request. The embedding model is shared by all tenants
+(see get_embeddings_model), so a tenant costs its indexes, not another copy
+of the model weights.
+"""
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from src.config import (
+    DEFAULT_TENANT_ID,
+    FAQ_DATA_PATH,
+    INDEX_ARTIFACT_PATH,
+    TENANTS_CONFIG_PATH,
+    TENANT_STORE_ROOT,
+    TENANT_MEMORY_BUDGET_MB,
+    VECTOR_STORE_DIR
+)
+
+# Tenant ids name directories, so they are restricted to a safe alphabet
+TENANT_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+class UnknownTenant(Exception):
+    """
+    Raised when a request names a tenant that is not configured.
+    """
+
+
+def load_tenant_config(path: str = TENANTS_CONFIG_PATH) -> Dict[str, Dict[str, str]]:
+    """
+    Read the tenant definitions, filling in default paths.
+
+    The default tenant is always present and uses FAQ_DATA_PATH,
+    VECTOR_STORE_DIR and INDEX_ARTIFACT_PATH. Other tenants need a
+    "faq_path"; "store_dir" defaults to TENANT_STORE_ROOT/<tenant id> and
+    "index_artifact" is optional.
+
+    Args:
+        path (str, optional): JSON file mapping tenant ids to their settings
+
+    Returns:
+        Dict[str, Dict[str, str]]: Tenant id -> {"faq_path", "store_dir", "index_artifact"}
+
+    Raises:
+        ValueError: If a tenant id is invalid or a tenant has no FAQ file
+    """
+    tenants = {
+        DEFAULT_TENANT_ID: {
+            "faq_path": FAQ_DATA_PATH,
+            "store_dir": VECTOR_STORE_DIR,
+            "index_artifact": INDEX_ARTIFACT_PATH,
+        }
+    }
+    if not path or not os.path.exists(path):
+        return tenants
+
+    with open(path) as f:
+        configured = json.load(f)
+    for tenant_id, settings in configured.items():
+        if not TENANT_ID_PATTERN.match(tenant_id):
+            raise ValueError(f"Invalid tenant id {tenant_id!r} in {path}")
+        if tenant_id == DEFAULT_TENANT_ID:
+            tenants[tenant_id].update(settings)
+            continue
+        if not settings.get("faq_path"):
+            raise ValueError(f"Tenant {tenant_id!r} in {path} has no faq_path")
+        tenants[tenant_id] = {
+            "faq_path": settings["faq_path"],
+            "store_dir": settings.get("store_dir") or os.path.join(TENANT_STORE_ROOT, tenant_id),
+            "index_artifact": settings.get("index_artifact", ""),
+        }
+    print(f"Configured {len(tenants)} tenants from {path}")
+    return tenants
+
+
+def _directory_bytes(directory: str) -> int:
+    total = 0
+    for root, _, names in os.walk(directory):
+        for name in names:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def estimate_memory_bytes(rag_chain, store_dir: str) -> int:
+    """
+    Estimate the memory a loaded tenant holds.
+
+    Counts the vector index (its own accounting for array indexes; the
+    persisted size for Chroma, which maps its index into memory), the stored
+    texts, the intent router's vectors, and the chunk store twice: once for
+    itself and once for the suggestion, spelling and entity indexes built
+    from the same texts.
+
+    Args:
+        rag_chain (RAGChain): The tenant's loaded chain
+        store_dir (str): The tenant's vector store directory
+
+    Returns:
+        int: Approximate bytes
+    """
+    vector_store = rag_chain.vector_store
+    if hasattr(vector_store, "index") and hasattr(vector_store.index, "memory_bytes"):
+        total = vector_store.index.memory_bytes() + sum(len(text) for text in vector_store.texts)
+    else:
+        total = _directory_bytes(store_dir)
+    if rag_chain.router is not None:
+        total += rag_chain.router.faq_vectors.nbytes + rag_chain.router.centroids.nbytes
+    return int(total + 2 * rag_chain.chunk_store.memory_bytes())
+
+
+class _LoadedTenant:
+    """
+    A tenant's RAG chain with its memory estimate and last use.
+    """
+
+    def __init__(self, rag_chain, memory_bytes: int, load_seconds: float):
+        self.rag_chain = rag_chain
+        self.memory_bytes = memory_bytes
+        self.load_seconds = load_seconds
+        self.last_used = time.monotonic()
+
+
+class TenantManager:
+    """
+    Lazily loaded per-tenant RAG chains under a global memory budget.
+    """
+
+    def __init__(self, tenants: Dict[str, Dict[str, str]],
+                 memory_budget_bytes: int = TENANT_MEMORY_BUDGET_MB * 1024 * 1024,
+                 loader: Optional[Callable[[str, Dict[str, str]], Any]] = None,
+                 pinned: tuple = (DEFAULT_TENANT_ID,)):
+        """
+        Initialize the manager without loading any tenant.
+
+        Args:
+            tenants (Dict[str, Dict[str, str]]): Tenant definitions from load_tenant_config
+            memory_budget_bytes (int, optional): Estimated memory allowed across loaded tenants
+            loader (Callable, optional): Builds a tenant's RAG chain from its id and settings
+            pinned (tuple, optional): Tenants that are never unloaded
+        """
+        self.tenants = tenants
+        self.memory_budget_bytes = memory_budget_bytes
+        self.pinned = set(pinned)
+        self._loader = loader or self._initialize
+        self._lock = threading.Lock()
+        self._loaded = OrderedDict()  # Tenant id -> _LoadedTenant, least recently used first
+        self._load_locks = {}
+        self._memory_bytes = 0
+        self._hits = 0
+        self._loads = 0
+        self._evictions = 0
+
+    @staticmethod
+    def _initialize(tenant_id: str, settings: Dict[str, str]):
+        from src.utils import initialize_rag_system
+        return initialize_rag_system(
+            faq_path=settings["faq_path"],
+            store_dir=settings["store_dir"],
+            artifact_path=settings.get("index_artifact", ""),
+        )
+
+    def get(self, tenant_id: Optional[str] = None):
+        """
+        Get a tenant's RAG chain, loading it on first use.
+
+        Concurrent requests for a cold tenant wait for one load; requests for
+        other tenants are not blocked by it.
+
+        Args:
+            tenant_id (str, optional): Tenant id. Defaults to DEFAULT_TENANT_ID.
+
+        Returns:
+            RAGChain: The tenant's chain
+
+        Raises:
+            UnknownTenant: If the tenant is not configured
+        """
+        tenant_id = tenant_id or DEFAULT_TENANT_ID
+        if tenant_id not in self.tenants:
+            raise UnknownTenant(f"Unknown tenant: {tenant_id}")
+
+        with self._lock:
+            loaded = self._touch(tenant_id)
+            if loaded is not None:
+                return loaded.rag_chain
+            load_lock = self._load_locks.setdefault(tenant_id, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                loaded = self._touch(tenant_id)
+                if loaded is not None:
+                    return loaded.rag_chain
+
+            print(f"Loading tenant {tenant_id}...")
+            started = time.perf_counter()
+            rag_chain = self._loader(tenant_id, self.tenants[tenant_id])
+            memory_bytes = estimate_memory_bytes(rag_chain, self.tenants[tenant_id]["store_dir"])
+            load_seconds = time.perf_counter() - started
+
+            with self._lock:
+                self._loaded[tenant_id] = _LoadedTenant(rag_chain, memory_bytes, load_seconds)
+                self._memory_bytes += memory_bytes
+                self._loads += 1
+                evicted = self._evict(keep=tenant_id)
+            for loaded in evicted:
+                self._close(loaded.rag_chain)
+            print(f"Loaded tenant {tenant_id} in {load_seconds:.1f}s ({memory_bytes / 2 ** 20:.1f} MB)")
+            return rag_chain
+
+    def _touch(self, tenant_id: str) -> Optional[_LoadedTenant]:
+        """
+        Mark a loaded tenant as most recently used. Call with the lock held.
+        """
+        loaded = self._loaded.get(tenant_id)
+        if loaded is not None:
+            self._loaded.move_to_end(tenant_id)
+            loaded.last_used = time.monotonic()
+            self._hits += 1
+        return loaded
+
+    def _evict(self, keep: str) -> List[_LoadedTenant]:
+        """
+        Unload least recently used tenants until the budget is met. Call with the lock held.
+
+        Returns:
+            List[_LoadedTenant]: The unloaded tenants, to be closed once the lock is released
+        """
+        evicted_tenants = []
+        for tenant_id in list(self._loaded):
+            if self._memory_bytes <= self.memory_budget_bytes:
+                break
+            if tenant_id == keep or tenant_id in self.pinned:
+                continue
+            evicted = self._loaded.pop(tenant_id)
+            self._memory_bytes -= evicted.memory_bytes
+            self._evictions += 1
+            evicted_tenants.append(evicted)
+            print(f"Unloaded tenant {tenant_id} ({evicted.memory_bytes / 2 ** 20:.1f} MB) to stay within the tenant memory budget")
+        return evicted_tenants
+
+    @staticmethod
+    def _close(rag_chain):
+        """
+        Release what an unloaded chain's index holds outside the Python heap.
+
+        Sharded indexes stop their worker processes here instead of when the
+        interpreter exits. Eviction takes the least recently used tenant, so a
+        request still running on it is rare; such a request fails and is
+        answered after a reload on retry.
+        """
+        index = getattr(rag_chain.vector_store, "index", None)
+        if hasattr(index, "close"):
+            try:
+                index.close()
+            except Exception as e:
+                print(f"Error closing evicted tenant index: {e}")
+
+    def is_loaded(self, tenant_id: str) -> bool:
+        with self._lock:
+            return tenant_id in self._loaded
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get tenant loading metrics.
+
+        Returns:
+            Dict[str, Any]: Configured and loaded tenants, memory used against the budget, and load/eviction counts
+        """
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "configured": len(self.tenants),
+                "loaded": len(self._loaded),
+                "memory_mb": round(self._memory_bytes / 2 ** 20, 1),
+                "memory_budget_mb": round(self.memory_budget_bytes / 2 ** 20, 1),
+                "hits": self._hits,
+                "loads": self._loads,
+                "evictions": self._evictions,
+                "tenants": {
+                    tenant_id: {
+                        "memory_mb": round(loaded.memory_bytes / 2 ** 20, 1),
+                        "load_seconds": round(loaded.load_seconds, 2),
+                        "idle_seconds": round(now - loaded.last_used, 1),
+                    }
+                    for tenant_id, loaded in self._loaded.items()
+                },
+            }
+
+
+_tenant_manager = None
+_tenant_manager_lock = threading.Lock()
+
+
+def get_tenant_manager() -> TenantManager:
+    """
+    Get the process-wide tenant manager, reading the tenant definitions on first use.
+
+    Returns:
+        TenantManager: The shared manager
+    """
+    global _tenant_manager
+
+    with _tenant_manager_lock:
+        if _tenant_manager is None:
+            _tenant_manager = TenantManager(load_tenant_config())
+        return _tenant_manager
@@ -2,40 +2,62 @@
 Utility functions for the Gromo RAG Chatbot.
 """
 import os
+import shutil
 import time
 from typing import Dict, Any, Optional
 
-from src.data_loader import prepare_faq_documents
+from src.config import FAQ_DATA_PATH, INDEX_ARTIFACT_PATH, VECTOR_STORE_DIR
+from src.data_loader import convert_to_documents, load_faq_data, prepare_faq_documents, split_documents
 from src.embeddings import create_vector_store, load_vector_store
+from src.entity_index import entity_index_path
+from src.index_artifact import ArtifactError, corpus_hash, install_artifact, installed_manifest
 from src.rag_chain import RAGChain
 
 
-def initialize_rag_system(force_rebuild: bool = False) -> RAGChain:
+def initialize_rag_system(force_rebuild: bool = False, faq_path: str = FAQ_DATA_PATH,
+                          store_dir: str = VECTOR_STORE_DIR, artifact_path: str = INDEX_ARTIFACT_PATH) -> RAGChain:
     """
     Initialize the RAG system by loading or creating the vector store and RAG chain.
     
     Args:
         force_rebuild (bool, optional): Whether to force rebuilding the vector store. Defaults to False.
+        faq_path (str, optional): FAQ CSV the vector store is built from. Defaults to FAQ_DATA_PATH.
+        store_dir (str, optional): Vector store directory. Defaults to VECTOR_STORE_DIR.
+        artifact_path (str, optional): Prebuilt index artifact to install first ("" for none). Defaults to INDEX_ARTIFACT_PATH.
         
     Returns:
         RAGChain: The initialized RAG chain
     """
+    # Install the prebuilt index artifact, if configured, so nothing is re-embedded
+    if artifact_path and not force_rebuild:
+        # Chunking the FAQ is cheap next to embedding it, and tells whether the artifact is current
+        faq_hash = corpus_hash(split_documents(convert_to_documents(load_faq_data(faq_path))))
+        try:
+            install_artifact(artifact_path, store_dir, expected_corpus_hash=faq_hash)
+        except (ArtifactError, OSError) as e:
+            print(f"Could not install index artifact {artifact_path}, building the vector store locally: {e}")
+            installed = installed_manifest(store_dir)
+            if installed is not None and installed.get("corpus_hash") != faq_hash:
+                # An earlier artifact is installed but the FAQ has changed since
+                print(f"Installed index in {store_dir} was built from a different FAQ; rebuilding it")
+                shutil.rmtree(store_dir)
+    
     # Check if vector store exists
     vector_store = None
     if not force_rebuild:
-        vector_store = load_vector_store()
+        vector_store = load_vector_store(store_dir)
     
     # If vector store doesn't exist or force_rebuild is True, create it
     if vector_store is None or force_rebuild:
         print("Creating vector store...")
         # Prepare FAQ documents
-        documents = prepare_faq_documents()
+        documents = prepare_faq_documents(faq_path, entity_index_path(store_dir))
         
         # Create vector store
-        vector_store = create_vector_store(documents)
+        vector_store = create_vector_store(documents, store_dir=store_dir)
     
     # Create RAG chain
-    rag_chain = RAGChain(vector_store)
+    rag_chain = RAGChain(vector_store, store_dir)
     
     return rag_chain
 
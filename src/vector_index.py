@@ -0,0 +1,342 @@
+"""
+Module for array-backed vector indexes and the LangChain vector store that wraps them.
+
+Indexes store embeddings as numpy arrays and answer top-k inner-product
+queries (embeddings are normalized, so inner product is cosine similarity).
+ArrayVectorStore adapts any registered index to the LangChain VectorStore
+interface, so it can be used by RAGChain in place of Chroma.
+"""
+import json
+import os
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+# Index classes by their persisted type name
+_INDEX_TYPES = {}
+
+
+def register_index(name: str):
+    """
+    Class decorator registering an index type for persistence.
+
+    Args:
+        name (str): Type name written to index.json
+    """
+    def decorator(cls):
+        _INDEX_TYPES[name] = cls
+        cls.index_type = name
+        return cls
+    return decorator
+
+
+def load_index(directory: str):
+    """
+    Load a persisted index of any registered type.
+
+    Args:
+        directory (str): Directory the index was saved to
+
+    Returns:
+        The loaded index
+    """
+    with open(os.path.join(directory, "index.json")) as f:
+        info = json.load(f)
+    return _INDEX_TYPES[info["type"]].load(directory, info)
+
+
+def save_array(path: str, array: np.ndarray):
+    """
+    Write a .npy file through a temporary file and rename it into place.
+
+    Indexes memory-map their arrays after loading, so writing over the loaded
+    file in place would truncate the data still being read from it.
+
+    Args:
+        path (str): Target .npy path
+        array (np.ndarray): Array to write
+    """
+    with open(path + ".tmp", "wb") as f:
+        np.save(f, array)
+    os.replace(path + ".tmp", path)
+
+
+def top_k(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Select the k highest scores in each row, sorted in descending order.
+
+    Args:
+        scores (np.ndarray): Score matrix of shape (queries, candidates)
+        k (int): Number of results per row
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Scores and column indices, each of shape (queries, k)
+    """
+    k = min(k, scores.shape[1])
+    if k == 0:
+        empty = np.empty((scores.shape[0], 0))
+        return empty.astype(scores.dtype), empty.astype(np.int64)
+
+    if k < scores.shape[1]:
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.tile(np.arange(scores.shape[1]), (scores.shape[0], 1))
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1)
+    return np.take_along_axis(candidate_scores, order, axis=1), np.take_along_axis(candidates, order, axis=1)
+
+
+@register_index("exact")
+class ExactIndex:
+    """
+    Brute-force float32 index; the reference for recall measurements.
+    """
+
+    def __init__(self, dim: Optional[int] = None):
+        """
+        Initialize an empty index.
+
+        Args:
+            dim (int, optional): Embedding dimension, inferred from the first add if omitted
+        """
+        self.dim = dim
+        self.vectors = np.empty((0, dim or 0), dtype=np.float32)
+
+    def __len__(self) -> int:
+        return self.vectors.shape[0]
+
+    def add(self, vectors: np.ndarray):
+        """
+        Append vectors; ids are assigned sequentially.
+
+        Args:
+            vectors (np.ndarray): Vectors of shape (n, dim)
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if len(self) == 0:
+            self.dim = vectors.shape[1]
+            self.vectors = vectors.copy()
+        else:
+            self.vectors = np.vstack([self.vectors, vectors])
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the k nearest vectors for each query.
+
+        Args:
+            queries (np.ndarray): Query vectors of shape (m, dim)
+            k (int): Number of results per query
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Scores and ids, each of shape (m, k)
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        return top_k(queries @ self.vectors.T, k)
+
+    def memory_bytes(self) -> int:
+        """
+        Get the resident memory used by the index arrays.
+
+        Returns:
+            int: Bytes
+        """
+        return int(self.vectors.nbytes)
+
+    def save(self, directory: str):
+        """
+        Persist the index.
+
+        Args:
+            directory (str): Target directory
+        """
+        os.makedirs(directory, exist_ok=True)
+        save_array(os.path.join(directory, "vectors.npy"), self.vectors)
+        with open(os.path.join(directory, "index.json"), "w") as f:
+            json.dump({"type": self.index_type, "dim": self.dim}, f)
+
+    @classmethod
+    def load(cls, directory: str, info: Dict[str, Any]):
+        """
+        Load a persisted index.
+
+        Args:
+            directory (str): Directory the index was saved to
+            info (Dict[str, Any]): Contents of index.json
+
+        Returns:
+            ExactIndex: The loaded index
+        """
+        index = cls(info["dim"])
+        index.vectors = np.load(os.path.join(directory, "vectors.npy"))
+        return index
+
+
+def evaluate_recall(index, reference, queries: np.ndarray, k: int = 10) -> Dict[str, float]:
+    """
+    Measure recall@k of an index against a reference (usually exact) index.
+
+    Args:
+        index: Index under test
+        reference: Reference index holding the same vectors
+        queries (np.ndarray): Query vectors of shape (m, dim)
+        k (int, optional): Number of neighbours compared. Defaults to 10.
+
+    Returns:
+        Dict[str, float]: Recall@k and memory usage of both indexes
+    """
+    _, found = index.search(queries, k)
+    _, expected = reference.search(queries, k)
+
+    hits = sum(len(set(f) & set(e)) for f, e in zip(found.tolist(), expected.tolist()))
+    total = expected.shape[0] * expected.shape[1]
+    memory = index.memory_bytes()
+    reference_memory = reference.memory_bytes()
+
+    return {
+        f"recall@{k}": round(hits / total, 4) if total else 1.0,
+        "memory_bytes": memory,
+        "reference_memory_bytes": reference_memory,
+        "memory_saved_bytes": reference_memory - memory,
+        "compression_ratio": round(reference_memory / memory, 2) if memory else 0.0,
+    }
+
+
+class ArrayVectorStore(VectorStore):
+    """
+    LangChain vector store backed by an array index and in-memory document list.
+    """
+
+    def __init__(self, embedding: Embeddings, index, texts: Optional[List[str]] = None,
+                 metadatas: Optional[List[dict]] = None):
+        """
+        Initialize the vector store.
+
+        Args:
+            embedding (Embeddings): Embeddings model used for documents and queries
+            index: Array index holding the document vectors
+            texts (List[str], optional): Document texts, aligned with index ids
+            metadatas (List[dict], optional): Document metadata, aligned with index ids
+        """
+        self._embedding = embedding
+        self.index = index
+        self.texts = texts or []
+        self.metadatas = metadatas or [{} for _ in self.texts]
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None, **kwargs: Any) -> List[str]:
+        """
+        Embed and add texts to the store.
+
+        Args:
+            texts (Iterable[str]): Texts to add
+            metadatas (List[dict], optional): Metadata for each text
+
+        Returns:
+            List[str]: Ids of the added texts
+        """
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = metadatas or [{} for _ in texts]
+
+        vectors = np.asarray(self._embedding.embed_documents(texts), dtype=np.float32)
+        start = len(self.texts)
+        self.index.add(vectors)
+        self.texts.extend(texts)
+        self.metadatas.extend(dict(m) for m in metadatas)
+
+        return [str(i) for i in range(start, start + len(texts))]
+
+    def _to_documents(self, scores: np.ndarray, ids: np.ndarray) -> List[Tuple[Document, float]]:
+        return [
+            (Document(page_content=self.texts[i], metadata=dict(self.metadatas[i])), float(score))
+            for score, i in zip(scores.tolist(), ids.tolist())
+            if i >= 0
+        ]
+
+    def similarity_search_with_score_by_vectors(self, embeddings: List[List[float]], k: int = 4) -> List[List[Tuple[Document, float]]]:
+        """
+        Search for several query vectors in one stacked index call.
+
+        Args:
+            embeddings (List[List[float]]): Query vectors
+            k (int, optional): Number of results per query. Defaults to 4.
+
+        Returns:
+            List[List[Tuple[Document, float]]]: Documents and scores for each query
+        """
+        if len(self.texts) == 0 or len(embeddings) == 0:
+            return [[] for _ in embeddings]
+        scores, ids = self.index.search(np.asarray(embeddings, dtype=np.float32), k)
+        return [self._to_documents(row_scores, row_ids) for row_scores, row_ids in zip(scores, ids)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vectors([self._embedding.embed_query(query)], k)[0]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vectors([embedding], k)[0]]
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    def _select_relevance_score_fn(self):
+        # Scores are cosine similarities in [-1, 1]
+        return lambda score: (score + 1.0) / 2.0
+
+    def save(self, directory: str):
+        """
+        Persist the documents and index.
+
+        Args:
+            directory (str): Target directory
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.index.save(directory)
+        with open(os.path.join(directory, "documents.jsonl"), "w") as f:
+            for text, metadata in zip(self.texts, self.metadatas):
+                f.write(json.dumps({"text": text, "metadata": metadata}) + "\n")
+
+    @classmethod
+    def load(cls, directory: str, embedding: Embeddings) -> "ArrayVectorStore":
+        """
+        Load a persisted store.
+
+        Args:
+            directory (str): Directory the store was saved to
+            embedding (Embeddings): Embeddings model for queries
+
+        Returns:
+            ArrayVectorStore: The loaded store
+        """
+        texts, metadatas = [], []
+        with open(os.path.join(directory, "documents.jsonl")) as f:
+            for line in f:
+                record = json.loads(line)
+                texts.append(record["text"])
+                metadatas.append(record["metadata"])
+        return cls(embedding, load_index(directory), texts, metadatas)
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                   index=None, **kwargs: Any) -> "ArrayVectorStore":
+        """
+        Build a store from texts.
+
+        Args:
+            texts (List[str]): Texts to add
+            embedding (Embeddings): Embeddings model
+            metadatas (List[dict], optional): Metadata for each text
+            index (optional): Array index to fill; defaults to an ExactIndex
+
+        Returns:
+            ArrayVectorStore: The new store
+        """
+        store = cls(embedding, index if index is not None else ExactIndex())
+        store.add_texts(texts, metadatas)
+        return store
@@ -0,0 +1,162 @@
+"""
+Module for warming caches at startup by replaying the most frequent logged queries.
+
+After a restart the embedding model, vector index pages, tenant indexes, web
+corpus and LLM client are all cold, and the first users pay for it. Warm-up
+replays the top queries from the query log through retrieval (and optionally
+full answer generation) within a time budget, and the service reports ready
+only afterwards. The report compares the first replayed query's latency with
+the same query replayed again once warm, and the app adds the latency of the
+first real request served after warm-up.
+"""
+import statistics
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from src.config import (
+    WARMUP_ENABLED,
+    WARMUP_TOP_K,
+    WARMUP_TIME_BUDGET_SECONDS,
+    WARMUP_GENERATE_ANSWERS,
+    QUERY_LOG_MAX_QUERIES
+)
+from src.query_log import get_query_log
+
+
+class Warmup:
+    """
+    One startup warm-up run and the readiness it gates.
+    """
+
+    def __init__(self, get_chain: Callable[[str], Any], enabled: bool = WARMUP_ENABLED, top_k: int = WARMUP_TOP_K,
+                 budget: float = WARMUP_TIME_BUDGET_SECONDS, generate: bool = WARMUP_GENERATE_ANSWERS,
+                 tenant_ids: Optional[Iterable[str]] = None):
+        """
+        Initialize a pending warm-up.
+
+        Args:
+            get_chain (Callable[[str], RAGChain]): Returns the RAG chain of a tenant id, loading it if needed
+            enabled (bool, optional): If False, the service is ready immediately
+            top_k (int, optional): Most frequent logged queries to replay
+            budget (float, optional): Seconds after which no new query is started
+            generate (bool, optional): Generate full answers instead of running retrieval only
+            tenant_ids (Iterable[str], optional): Only replay queries of these tenants; all tenants if omitted
+        """
+        self.get_chain = get_chain
+        self.enabled = enabled
+        self.top_k = top_k
+        self.budget = budget
+        self.generate = generate
+        self.tenant_ids = set(tenant_ids) if tenant_ids is not None else None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._report = {"status": "pending"}
+        self._first_request_ms = None
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def _replay(self, tenant_id: str, query: str) -> float:
+        """
+        Run one query and return its latency in milliseconds.
+        """
+        started = time.perf_counter()
+        chain = self.get_chain(tenant_id)
+        if self.generate:
+            # Replays are not real traffic, so they stay out of the routing log and prefetch popularity
+            chain.invoke(query, record=False)
+        else:
+            chain.warm(query)
+        return 1000 * (time.perf_counter() - started)
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Replay the top logged queries until done or out of time, then mark the service ready.
+
+        Returns:
+            Dict[str, Any]: Warm-up report
+        """
+        if not self.enabled:
+            report = {"status": "disabled"}
+            with self._lock:
+                self._report = report
+            self._ready.set()
+            return report
+
+        queries = [
+            entry for entry in get_query_log().top(QUERY_LOG_MAX_QUERIES)
+            if self.tenant_ids is None or entry[0] in self.tenant_ids
+        ][:self.top_k]
+        print(f"Warming up with {len(queries)} logged queries ({'full answers' if self.generate else 'retrieval only'}, "
+              f"{self.budget:.0f}s budget)...")
+        started = time.monotonic()
+        latencies, errors, replayed = [], 0, 0
+        for tenant_id, query, _ in queries:
+            if time.monotonic() - started >= self.budget:
+                break
+            try:
+                latencies.append(self._replay(tenant_id, query))
+            except Exception as e:
+                errors += 1
+                print(f"Warm-up query failed for tenant {tenant_id}: {e}")
+            replayed += 1
+
+        report = {
+            "status": "done",
+            "mode": "generate" if self.generate else "retrieval",
+            "queries_logged": len(queries),
+            "queries_replayed": replayed,
+            "errors": errors,
+            "budget_exhausted": replayed < len(queries),
+            "elapsed_seconds": round(time.monotonic() - started, 2),
+        }
+        if latencies:
+            report["first_query_cold_ms"] = round(latencies[0], 1)
+            report["median_query_ms"] = round(statistics.median(latencies), 1)
+            # The first query again, now that everything it touches is warm
+            tenant_id, query, _ = queries[0]
+            try:
+                report["first_query_warm_ms"] = round(self._replay(tenant_id, query), 1)
+            except Exception as e:
+                print(f"Warm-up re-run failed: {e}")
+
+        with self._lock:
+            self._report = report
+        self._ready.set()
+        print(f"Warm-up finished: {report}")
+        return report
+
+    def start(self):
+        """
+        Run the warm-up in a background thread, so the server can answer /ready meanwhile.
+        """
+        threading.Thread(target=self.run, name="warmup", daemon=True).start()
+
+    def record_first_request(self, latency_ms: float):
+        """
+        Record the latency of the first request served after warm-up (later calls are ignored).
+
+        Args:
+            latency_ms (float): Request latency in milliseconds
+        """
+        if not self.ready:
+            return
+        with self._lock:
+            if self._first_request_ms is None:
+                self._first_request_ms = latency_ms
+                print(f"First request after warm-up took {latency_ms:.0f} ms")
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Get the warm-up report.
+
+        Returns:
+            Dict[str, Any]: Status, replay counts and latencies, and the first post-warm-up request latency
+        """
+        with self._lock:
+            report = dict(self._report)
+            if self._first_request_ms is not None:
+                report["first_request_after_warmup_ms"] = round(self._first_request_ms, 1)
+            return report
@@ -0,0 +1,392 @@
+"""
+Module for the local, persistent corpus of fetched web search results.
+
+Every result returned by SERP API (title, snippet, link, fetch time and the
+query that fetched it) is embedded and appended to the corpus, replacing any
+earlier copy of the same link. Web searches look here first and only call
+SERP API when the corpus has too few results that are both fresh and close
+enough to the query.
+
+On disk the corpus is an append-only JSON lines file of records and a raw
+float32 file of their vectors, row i belonging to line i, plus a small
+metadata file naming the embedding model. Superseded and expired rows are
+dropped when the corpus is loaded, and whenever it grows past its size cap
+(the most recently fetched results are kept). In memory, vectors live in a
+buffer that doubles in capacity, so an add copies only the new rows.
+"""
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+
+from src.config import (
+    EMBEDDING_MODEL_NAME,
+    WEB_CORPUS_DIR,
+    WEB_CORPUS_MAX_AGE_SECONDS,
+    WEB_CORPUS_MAX_RESULTS,
+    WEB_CORPUS_MIN_SIMILARITY,
+    WEB_CORPUS_MIN_RESULTS
+)
+
+RECORDS_FILE = "records.jsonl"
+VECTORS_FILE = "vectors.f32"
+META_FILE = "meta.json"
+
+
+def result_key(link: str, title: str, snippet: str) -> str:
+    """
+    Key used to deduplicate results: the link without scheme, "www." or trailing slash.
+
+    Args:
+        link (str): Result URL
+        title (str): Result title, used with the snippet when there is no link
+        snippet (str): Result snippet
+
+    Returns:
+        str: Deduplication key
+    """
+    if not link:
+        return f"{title}\n{snippet}"
+    key = link.split("#")[0].split("://", 1)[-1]
+    if key.startswith("www."):
+        key = key[4:]
+    return key.rstrip("/").lower()
+
+
+def result_content(title: str, snippet: str, link: str) -> str:
+    """
+    Document text of a web result, as placed in the prompt.
+    """
+    return f"Title: {title}\nSnippet: {snippet}\nSource: {link}"
+
+
+class WebCorpus:
+    """
+    Embedded, deduplicated store of web results with freshness metadata.
+    """
+
+    def __init__(self, directory: str = WEB_CORPUS_DIR, embeddings=None,
+                 max_age: float = WEB_CORPUS_MAX_AGE_SECONDS, min_similarity: float = WEB_CORPUS_MIN_SIMILARITY,
+                 min_results: int = WEB_CORPUS_MIN_RESULTS, max_results: int = WEB_CORPUS_MAX_RESULTS):
+        """
+        Initialize the corpus; records are read from disk on first use.
+
+        Args:
+            directory (str, optional): Directory the corpus is persisted to
+            embeddings (optional): Embeddings model; the shared model from get_embeddings_model() if omitted
+            max_age (float, optional): Seconds after fetching that a result stops being served
+            min_similarity (float, optional): Minimum query-result cosine similarity for a hit
+            min_results (int, optional): Relevant fresh results needed to answer a query from the corpus
+            max_results (int, optional): Results kept; once a margin past this is reached, the oldest are dropped
+        """
+        self.directory = directory
+        self.max_age = max_age
+        self.min_similarity = min_similarity
+        self.min_results = min_results
+        self.max_results = max_results
+        self._embeddings = embeddings
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._records = []
+        # _vectors and _fetched_at are views of the first rows of these buffers; rows past them are free capacity
+        self._vector_buffer = np.zeros((0, 0), dtype=np.float32)
+        self._fetched_buffer = np.zeros(0, dtype=np.float64)
+        self._vectors = self._vector_buffer
+        self._fetched_at = self._fetched_buffer
+        self._active = np.zeros(0, dtype=bool)
+        self._rows_by_key = {}
+        self._hits = 0
+        self._misses = 0
+        self._added = 0
+        self._updated = 0
+
+    @property
+    def embeddings(self):
+        if self._embeddings is None:
+            from src.embeddings import get_embeddings_model
+            self._embeddings = get_embeddings_model()
+        return self._embeddings
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _ensure_loaded(self):
+        """
+        Read the corpus from disk, keeping the latest record per link. Call with the lock held.
+        """
+        if self._loaded:
+            return
+        self._loaded = True
+
+        meta_path = self._path(META_FILE)
+        if not os.path.exists(meta_path):
+            return
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get("embedding_model") != EMBEDDING_MODEL_NAME:
+            print(f"Web corpus in {self.directory} was embedded with {meta.get('embedding_model')}; starting a new corpus")
+            return
+
+        with open(self._path(RECORDS_FILE)) as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        raw = np.fromfile(self._path(VECTORS_FILE), dtype=np.float32)
+        vectors = raw[:len(raw) // meta["dim"] * meta["dim"]].reshape(-1, meta["dim"])
+        # A crash between the two appends leaves one file ahead of the other
+        count = min(len(records), len(vectors))
+
+        latest = {}
+        for i in range(count):
+            latest[result_key(records[i]["link"], records[i]["title"], records[i]["snippet"])] = i
+        keep = sorted(latest.values())
+        self._records = [records[i] for i in keep]
+        self._vector_buffer = self._vectors = np.ascontiguousarray(vectors[keep])
+        self._fetched_buffer = self._fetched_at = np.array([record["fetched_at"] for record in self._records],
+                                                           dtype=np.float64)
+        self._active = np.ones(len(keep), dtype=bool)
+        self._rows_by_key = {key: row for row, key in enumerate(sorted(latest, key=latest.get))}
+
+        expired = (self._fetched_at < time.time() - self.max_age).any()
+        if len(keep) < len(records) or raw.size != len(records) * meta["dim"] or expired or len(keep) > self.max_results:
+            self._prune()
+        print(f"Loaded web corpus with {len(self._records)} results from {self.directory}")
+
+    def _prune(self):
+        """
+        Drop superseded and expired rows and keep at most max_results, newest first. Call with the lock held.
+        """
+        rows = np.flatnonzero(self._active & (self._fetched_at >= time.time() - self.max_age))
+        if len(rows) > self.max_results:
+            rows = np.sort(rows[np.argsort(-self._fetched_at[rows], kind="stable")[:self.max_results]])
+        dropped = len(self._records) - len(rows)
+        self._rewrite(rows)
+        if dropped:
+            print(f"Pruned {dropped} superseded, expired or oldest rows from the web corpus")
+
+    def _rewrite(self, rows: np.ndarray):
+        """
+        Rewrite the files with only the given rows. Call with the lock held.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        records = [self._records[i] for i in rows]
+        vectors = np.ascontiguousarray(self._vectors[rows])
+
+        with open(self._path(RECORDS_FILE) + ".tmp", "w") as f:
+            f.writelines(json.dumps(record) + "\n" for record in records)
+        vectors.tofile(self._path(VECTORS_FILE) + ".tmp")
+        os.replace(self._path(RECORDS_FILE) + ".tmp", self._path(RECORDS_FILE))
+        os.replace(self._path(VECTORS_FILE) + ".tmp", self._path(VECTORS_FILE))
+
+        keys = [result_key(record["link"], record["title"], record["snippet"]) for record in records]
+        self._records = records
+        self._vector_buffer = self._vectors = vectors
+        self._fetched_buffer = self._fetched_at = self._fetched_at[rows]
+        self._active = np.ones(len(records), dtype=bool)
+        self._rows_by_key = {key: row for row, key in enumerate(keys)}
+
+    def search(self, query: str, k: int, query_vector: Optional[List[float]] = None) -> List[Document]:
+        """
+        Find fresh results relevant to a query.
+
+        Args:
+            query (str): User query
+            k (int): Maximum results
+            query_vector (List[float], optional): Embedding of the query, if already computed
+
+        Returns:
+            List[Document]: Up to k results, best first; empty unless at least min_results qualify
+        """
+        with self._lock:
+            self._ensure_loaded()
+            vectors, fetched_at, active, records = self._vectors, self._fetched_at, self._active, self._records
+        if len(records) == 0:
+            with self._lock:
+                self._misses += 1
+            return []
+
+        if query_vector is None:
+            query_vector = self.embeddings.embed_query(query)
+        scores = vectors @ np.asarray(query_vector, dtype=np.float32)
+        eligible = active & (fetched_at >= time.time() - self.max_age) & (scores >= self.min_similarity)
+        rows = np.flatnonzero(eligible)
+
+        with self._lock:
+            if len(rows) < max(1, self.min_results):
+                self._misses += 1
+                return []
+            self._hits += 1
+
+        best = rows[np.argsort(-scores[rows], kind="stable")[:k]]
+        documents = []
+        for row in best:
+            record = records[row]
+            documents.append(Document(
+                page_content=result_content(record["title"], record["snippet"], record["link"]),
+                metadata={
+                    "source": "web_search",
+                    "title": record["title"],
+                    "link": record["link"],
+                    "fetched_at": record["fetched_at"],
+                    "from_corpus": True,
+                    "similarity": round(float(scores[row]), 4),
+                }
+            ))
+        return documents
+
+    def expires_in(self, query: str, query_vector: Optional[List[float]] = None) -> float:
+        """
+        Time until the corpus can no longer answer a query, without counting a lookup.
+
+        Args:
+            query (str): User query
+            query_vector (List[float], optional): Embedding of the query, if already computed
+
+        Returns:
+            float: Seconds until fewer than min_results relevant results are fresh (0 if that is already the case)
+        """
+        with self._lock:
+            self._ensure_loaded()
+            vectors, fetched_at, active = self._vectors, self._fetched_at, self._active
+        needed = max(1, self.min_results)
+        if len(fetched_at) < needed:
+            return 0.0
+
+        if query_vector is None:
+            query_vector = self.embeddings.embed_query(query)
+        scores = vectors @ np.asarray(query_vector, dtype=np.float32)
+        relevant = np.sort(fetched_at[active & (scores >= self.min_similarity)])[::-1]
+        if len(relevant) < needed:
+            return 0.0
+        return max(0.0, float(relevant[needed - 1]) + self.max_age - time.time())
+
+    def add(self, query: str, results: List[Dict[str, str]]) -> int:
+        """
+        Embed and append fetched results, replacing earlier copies of the same links.
+
+        Args:
+            query (str): Query the results were fetched for
+            results (List[Dict[str, str]]): Results with "title", "snippet" and "link"
+
+        Returns:
+            int: Number of results stored
+        """
+        results = [r for r in results if r.get("title") or r.get("snippet")]
+        if not results:
+            return 0
+
+        now = time.time()
+        records = [
+            {"query": query, "title": r.get("title", ""), "snippet": r.get("snippet", ""),
+             "link": r.get("link", ""), "fetched_at": now}
+            for r in results
+        ]
+        vectors = np.asarray(
+            self.embeddings.embed_documents([f"{record['title']}\n{record['snippet']}" for record in records]),
+            dtype=np.float32
+        )
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+        with self._lock:
+            self._ensure_loaded()
+            if len(self._records) == 0:
+                self._vector_buffer = self._vectors = np.zeros((0, vectors.shape[1]), dtype=np.float32)
+                os.makedirs(self.directory, exist_ok=True)
+                with open(self._path(META_FILE), "w") as f:
+                    json.dump({"embedding_model": EMBEDDING_MODEL_NAME, "dim": int(vectors.shape[1])}, f)
+                # Drop rows left over from a corpus embedded with another model
+                open(self._path(RECORDS_FILE), "w").close()
+                open(self._path(VECTORS_FILE), "wb").close()
+
+            with open(self._path(RECORDS_FILE), "a") as f:
+                f.writelines(json.dumps(record) + "\n" for record in records)
+            with open(self._path(VECTORS_FILE), "ab") as f:
+                f.write(vectors.tobytes())
+
+            start = len(self._records)
+            active = np.concatenate([self._active, np.ones(len(records), dtype=bool)])
+            for offset, record in enumerate(records):
+                key = result_key(record["link"], record["title"], record["snippet"])
+                previous = self._rows_by_key.get(key)
+                if previous is not None:
+                    if previous >= start:
+                        # The same link twice in one response; keep the first
+                        active[start + offset] = False
+                        continue
+                    active[previous] = False
+                    self._updated += 1
+                else:
+                    self._added += 1
+                self._rows_by_key[key] = start + offset
+            stored = int(active[start:].sum())
+
+            # Concurrent searches hold the previous arrays: the record list and active flags are
+            # replaced, and new vectors go into buffer rows past the end of their views
+            self._append_rows(vectors, now)
+            self._records = self._records + records
+            self._active = active
+            if len(self._records) > self.max_results + max(100, self.max_results // 10):
+                self._prune()
+            return stored
+
+    def _append_rows(self, vectors: np.ndarray, fetched_at: float):
+        """
+        Append vectors to the buffers, doubling their capacity when full. Call with the lock held.
+        """
+        size = len(self._records)
+        needed = size + vectors.shape[0]
+        if needed > self._vector_buffer.shape[0]:
+            capacity = max(needed, 2 * self._vector_buffer.shape[0], 64)
+            vector_buffer = np.empty((capacity, vectors.shape[1]), dtype=np.float32)
+            fetched_buffer = np.empty(capacity, dtype=np.float64)
+            vector_buffer[:size] = self._vectors
+            fetched_buffer[:size] = self._fetched_at
+            self._vector_buffer, self._fetched_buffer = vector_buffer, fetched_buffer
+        self._vector_buffer[size:needed] = vectors
+        self._fetched_buffer[size:needed] = fetched_at
+        self._vectors = self._vector_buffer[:needed]
+        self._fetched_at = self._fetched_buffer[:needed]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get corpus size and hit metrics.
+
+        Returns:
+            Dict[str, Any]: Stored and fresh results, queries answered from the corpus, and results added or refreshed
+        """
+        with self._lock:
+            self._ensure_loaded()
+            active = int(self._active.sum())
+            fresh = int((self._active & (self._fetched_at >= time.time() - self.max_age)).sum())
+            lookups = self._hits + self._misses
+            return {
+                "results": active,
+                "fresh_results": fresh,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+                "added": self._added,
+                "refreshed": self._updated,
+                "memory_mb": round((self._vector_buffer.nbytes + self._fetched_buffer.nbytes) / 2 ** 20, 2),
+            }
+
+
+_corpus = None
+_corpus_lock = threading.Lock()
+
+
+def get_web_corpus() -> WebCorpus:
+    """
+    Get the process-wide web result corpus.
+
+    Returns:
+        WebCorpus: The shared corpus
+    """
+    global _corpus
+
+    with _corpus_lock:
+        if _corpus is None:
+            _corpus = WebCorpus()
+        return _corpus
@@ -0,0 +1,285 @@
+"""
+Module for popularity-driven background refresh of web search results.
+
+Every user web search is counted in an exponentially decaying popularity
+table. A background thread periodically takes the most popular queries and,
+for those whose results in the web corpus are missing or about to expire,
+runs the SERP API search ahead of time so the next request is answered from
+the corpus instead of waiting on SERP API. Background calls are capped per
+hour, separately from inline searches.
+"""
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List
+
+from src.config import (
+    WEB_CORPUS_ENABLED,
+    WEB_PREFETCH_ENABLED,
+    WEB_PREFETCH_INTERVAL_SECONDS,
+    WEB_PREFETCH_TOP_N,
+    WEB_PREFETCH_REFRESH_MARGIN_SECONDS,
+    WEB_PREFETCH_MAX_CALLS_PER_HOUR,
+    WEB_PREFETCH_POPULARITY_HALF_LIFE,
+    WEB_PREFETCH_MIN_POPULARITY,
+    WEB_PREFETCH_MAX_TRACKED_QUERIES
+)
+from src.web_corpus import get_web_corpus
+
+
+def normalize_query(query: str) -> str:
+    """
+    Popularity key of a query: lowercase words without punctuation.
+
+    Args:
+        query (str): User query
+
+    Returns:
+        str: Normalized query
+    """
+    return " ".join(re.findall(r"\w+", query.lower()))
+
+
+class QueryPopularity:
+    """
+    Exponentially decaying request counts per query.
+    """
+
+    def __init__(self, half_life: float = WEB_PREFETCH_POPULARITY_HALF_LIFE,
+                 max_queries: int = WEB_PREFETCH_MAX_TRACKED_QUERIES):
+        """
+        Initialize an empty table.
+
+        Args:
+            half_life (float, optional): Seconds after which a request counts half
+            max_queries (int, optional): Distinct queries tracked; the least popular are dropped
+        """
+        self.half_life = half_life
+        self.max_queries = max_queries
+        self._lock = threading.Lock()
+        # Normalized query -> [score at last update, last update time, latest raw query]
+        self._entries = {}
+
+    def _decayed(self, entry: list, now: float) -> float:
+        return entry[0] * 0.5 ** ((now - entry[1]) / self.half_life)
+
+    def record(self, query: str):
+        """
+        Count one request for a query.
+
+        Args:
+            query (str): User query
+        """
+        key = normalize_query(query)
+        if not key:
+            return
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                if len(self._entries) >= self.max_queries:
+                    coldest = min(self._entries, key=lambda k: self._decayed(self._entries[k], now))
+                    del self._entries[coldest]
+                self._entries[key] = [1.0, now, query]
+            else:
+                entry[:] = [self._decayed(entry, now) + 1.0, now, query]
+
+    def top(self, n: int, min_score: float = 0.0) -> List[tuple]:
+        """
+        Get the most popular queries.
+
+        Args:
+            n (int): Maximum queries
+            min_score (float, optional): Minimum decayed count
+
+        Returns:
+            List[tuple]: (raw query, score) pairs, most popular first
+        """
+        now = time.monotonic()
+        with self._lock:
+            scored = [(entry[2], self._decayed(entry, now)) for entry in self._entries.values()]
+        scored = [item for item in scored if item[1] >= min_score]
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored[:n]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+class WebPrefetcher:
+    """
+    Background thread keeping the web corpus fresh for popular queries.
+    """
+
+    def __init__(self, enabled: bool = WEB_PREFETCH_ENABLED and WEB_CORPUS_ENABLED,
+                 interval: float = WEB_PREFETCH_INTERVAL_SECONDS, top_n: int = WEB_PREFETCH_TOP_N,
+                 refresh_margin: float = WEB_PREFETCH_REFRESH_MARGIN_SECONDS,
+                 max_calls_per_hour: int = WEB_PREFETCH_MAX_CALLS_PER_HOUR,
+                 min_popularity: float = WEB_PREFETCH_MIN_POPULARITY):
+        """
+        Initialize an idle prefetcher.
+
+        Args:
+            enabled (bool, optional): Whether start() launches the background thread
+            interval (float, optional): Seconds between prefetch passes
+            top_n (int, optional): Popular queries considered per pass
+            refresh_margin (float, optional): Refresh results expiring within this many seconds
+            max_calls_per_hour (int, optional): SERP API calls allowed per sliding hour
+            min_popularity (float, optional): Decayed request count below which queries are ignored
+        """
+        self.enabled = enabled
+        self.interval = interval
+        self.top_n = top_n
+        self.refresh_margin = refresh_margin
+        self.max_calls_per_hour = max_calls_per_hour
+        self.min_popularity = min_popularity
+        self.popularity = QueryPopularity()
+        self._search_tool = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._calls_at = deque()
+        # Normalized query -> monotonic time of its last prefetch
+        self._last_prefetched = {}
+        self._counters = {"passes": 0, "prefetched": 0, "already_fresh": 0, "skipped_over_quota": 0, "failed": 0}
+        self._last_pass = None
+
+    def record(self, query: str):
+        """
+        Count a user web search towards the query's popularity.
+
+        Args:
+            query (str): User query
+        """
+        if self.enabled:
+            self.popularity.record(query)
+
+    def start(self, search_tool):
+        """
+        Launch the background thread if it is enabled and not running.
+
+        Args:
+            search_tool (WebSearchTool): Tool whose search_web(query, refresh=True) fetches from SERP API
+        """
+        if not self.enabled or not search_tool.enabled or not search_tool.api_key:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._search_tool = search_tool
+            self._thread = threading.Thread(target=self._run, name="web-prefetch", daemon=True)
+            self._thread.start()
+        print(f"Started web prefetcher (top {self.top_n} queries every {self.interval:.0f}s, "
+              f"at most {self.max_calls_per_hour} SERP API calls per hour)")
+
+    def stop(self):
+        """
+        Stop the background thread.
+        """
+        self._stop.set()
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout=self.interval)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Error in web prefetch pass: {e}")
+
+    def _quota_left(self, now: float) -> int:
+        while self._calls_at and now - self._calls_at[0] > 3600:
+            self._calls_at.popleft()
+        return self.max_calls_per_hour - len(self._calls_at)
+
+    def run_once(self) -> int:
+        """
+        Refresh the popular queries whose corpus results are missing or about to expire.
+
+        Returns:
+            int: Number of SERP API searches made
+        """
+        corpus = get_web_corpus()
+        made = 0
+        for query, _ in self.popularity.top(self.top_n, self.min_popularity):
+            key = normalize_query(query)
+            now = time.monotonic()
+            with self._lock:
+                recently = now - self._last_prefetched.get(key, float("-inf")) < self.refresh_margin
+            if recently or corpus.expires_in(query) > self.refresh_margin:
+                # Fresh enough; a recent prefetch whose results did not match the query is not retried either
+                with self._lock:
+                    self._counters["already_fresh"] += 1
+                continue
+
+            with self._lock:
+                if self._quota_left(now) <= 0:
+                    self._counters["skipped_over_quota"] += 1
+                    break
+                self._calls_at.append(now)
+                self._last_prefetched[key] = now
+
+            documents = self._search_tool.search_web(query, refresh=True)
+            made += 1
+            with self._lock:
+                if any(doc.metadata.get("source") == "web_search" for doc in documents):
+                    self._counters["prefetched"] += 1
+                else:
+                    # SERP API is failing or its circuit is open; try again next pass
+                    self._counters["failed"] += 1
+                    self._last_prefetched.pop(key, None)
+                    break
+
+        with self._lock:
+            self._counters["passes"] += 1
+            self._last_pass = time.time()
+            # Forget prefetch times that can no longer suppress a refresh
+            cutoff = time.monotonic() - self.refresh_margin
+            self._last_prefetched = {k: t for k, t in self._last_prefetched.items() if t >= cutoff}
+        if made:
+            print(f"Prefetched web results for {made} popular queries")
+        return made
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get prefetch metrics.
+
+        Returns:
+            Dict[str, Any]: Pass outcomes, quota use and the number of tracked queries
+        """
+        with self._lock:
+            calls_in_window = self.max_calls_per_hour - self._quota_left(time.monotonic())
+            stats = {
+                **self._counters,
+                "enabled": self.enabled,
+                "running": self._thread is not None,
+                "calls_last_hour": calls_in_window,
+                "max_calls_per_hour": self.max_calls_per_hour,
+                "last_pass_age_seconds": round(time.time() - self._last_pass, 1) if self._last_pass else None,
+            }
+        # Only counts: /metrics is unauthenticated and query text is user input
+        stats["tracked_queries"] = len(self.popularity)
+        return stats
+
+
+_prefetcher = None
+_prefetcher_lock = threading.Lock()
+
+
+def get_web_prefetcher() -> WebPrefetcher:
+    """
+    Get the process-wide web prefetcher.
+
+    Returns:
+        WebPrefetcher: The shared prefetcher
+    """
+    global _prefetcher
+
+    with _prefetcher_lock:
+        if _prefetcher is None:
+            _prefetcher = WebPrefetcher()
+        return _prefetcher
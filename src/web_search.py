@@ -1,12 +1,110 @@
 """
 Module for integrating web search functionality using SERP API.
 """
-from typing import List
+from typing import Any, Dict, List, Optional
 import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from serpapi import GoogleSearch
 from langchain_core.documents import Document
 
-from src.config import WEB_SEARCH_ENABLED, WEB_SEARCH_NUM_RESULTS
+from src.config import (
+    WEB_SEARCH_ENABLED,
+    WEB_SEARCH_NUM_RESULTS,
+    WEB_CORPUS_ENABLED,
+    SERPAPI_BACKEND,
+    SERPAPI_TIMEOUT,
+    SERPAPI_RETRIES,
+    SERPAPI_HEDGE_ENABLED,
+    SERPAPI_TOTAL_TIMEOUT,
+    SERPAPI_MAX_IN_FLIGHT,
+    SPECULATIVE_WEB_SEARCH_WASTE_BUDGET,
+    SPECULATIVE_WEB_SEARCH_BUDGET_WINDOW
+)
+from src.resilience import CircuitOpenError, get_policy
+from src.web_corpus import get_web_corpus, result_content
+from src.web_prefetch import get_web_prefetcher
+
+# Pool for speculative searches started alongside FAQ retrieval
+_speculative_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="speculative-search")
+
+
+class SpeculationBudget:
+    """
+    Sliding-window cap on speculative web searches whose results were discarded.
+    """
+    
+    def __init__(self, max_wasted: int = SPECULATIVE_WEB_SEARCH_WASTE_BUDGET,
+                 window: float = SPECULATIVE_WEB_SEARCH_BUDGET_WINDOW):
+        """
+        Initialize the budget.
+        
+        Args:
+            max_wasted (int, optional): Maximum wasted searches per window
+            window (float, optional): Window length in seconds
+        """
+        self.max_wasted = max_wasted
+        self.window = window
+        self._wasted_at = deque()
+        self._lock = threading.Lock()
+        self._counters = {"launched": 0, "used": 0, "wasted": 0, "cancelled": 0, "skipped_over_budget": 0}
+    
+    def _expire(self, now: float):
+        while self._wasted_at and now - self._wasted_at[0] > self.window:
+            self._wasted_at.popleft()
+    
+    def try_launch(self) -> bool:
+        """
+        Check the budget before launching a speculative search.
+        
+        Returns:
+            bool: True if a speculative search may be launched
+        """
+        with self._lock:
+            self._expire(time.monotonic())
+            if len(self._wasted_at) >= self.max_wasted:
+                self._counters["skipped_over_budget"] += 1
+                return False
+            self._counters["launched"] += 1
+            return True
+    
+    def record(self, outcome: str):
+        """
+        Record how a speculative search ended.
+        
+        Args:
+            outcome (str): "used", "wasted" (the paid call was made but discarded) or "cancelled" (never sent)
+        """
+        with self._lock:
+            self._counters[outcome] += 1
+            if outcome == "wasted":
+                self._wasted_at.append(time.monotonic())
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get speculation metrics.
+        
+        Returns:
+            Dict[str, Any]: Outcome counters and wasted searches in the current window
+        """
+        with self._lock:
+            self._expire(time.monotonic())
+            return {**self._counters, "wasted_in_window": len(self._wasted_at), "max_wasted": self.max_wasted}
+
+
+_speculation_budget = SpeculationBudget()
+
+
+def get_speculation_budget() -> SpeculationBudget:
+    """
+    Get the process-wide speculative search budget.
+    
+    Returns:
+        SpeculationBudget: The shared budget
+    """
+    return _speculation_budget
 
 
 class WebSearchTool:
@@ -20,13 +118,49 @@ class WebSearchTool:
         """
         self.enabled = WEB_SEARCH_ENABLED
         self.api_key = os.getenv("SERPAPI_API_KEY", "")
+        self.policy = get_policy(
+            "serpapi",
+            timeout=SERPAPI_TIMEOUT,
+            retries=SERPAPI_RETRIES,
+            hedge=SERPAPI_HEDGE_ENABLED,
+            total_timeout=SERPAPI_TOTAL_TIMEOUT,
+            max_in_flight=SERPAPI_MAX_IN_FLIGHT
+        )
+        # Keep popular queries' results fresh in the web corpus (no-op if already running or disabled)
+        get_web_prefetcher().start(self)
     
-    def search_web(self, query: str) -> List[Document]:
+    def _fetch_results(self, params: dict) -> dict:
+        """
+        Run one SERP API request.
+        
+        Args:
+            params (dict): Search parameters
+            
+        Returns:
+            dict: Raw SERP API results
+        """
+        search = GoogleSearch(dict(params))
+        search.BACKEND = SERPAPI_BACKEND
+        search.timeout = SERPAPI_TIMEOUT
+        results = search.get_dict()
+        
+        # SERP API reports failures in the response body
+        if "error" in results:
+            raise RuntimeError(f"SERP API error: {results['error']}")
+        
+        return results
+    
+    def search_web(self, query: str, refresh: bool = False, record: bool = True) -> List[Document]:
         """
         Search the web for the given query and return results as documents.
         
+        Fresh, relevant results already in the local web corpus are returned
+        without calling SERP API; fetched results are added to the corpus.
+        
         Args:
             query (str): The search query
+            refresh (bool, optional): Always call SERP API and do not count the query's popularity (background prefetch)
+            record (bool, optional): Count the query's popularity; off for warm-up replays
             
         Returns:
             List[Document]: List of documents containing web search results
@@ -35,6 +169,18 @@ class WebSearchTool:
             print("Web search is disabled")
             return []
         
+        if record and not refresh:
+            get_web_prefetcher().record(query)
+        
+        if WEB_CORPUS_ENABLED and not refresh:
+            try:
+                corpus_results = get_web_corpus().search(query, WEB_SEARCH_NUM_RESULTS)
+                if corpus_results:
+                    print(f"Found {len(corpus_results)} web results in the local corpus for query: {query}")
+                    return corpus_results
+            except Exception as e:
+                print(f"Error searching the web corpus: {e}")
+        
         if not self.api_key:
             print("SERPAPI_API_KEY not set in environment variables")
             # Provide a fallback document when API key is not set
@@ -55,38 +201,47 @@ class WebSearchTool:
                 "num": WEB_SEARCH_NUM_RESULTS
             }
             
-            # Perform the search
-            search = GoogleSearch(params)
-            results = search.get_dict()
+            # Perform the search with a deadline, retries and the SERP API circuit breaker
+            results = self.policy.call(self._fetch_results, params)
             
             # Convert results to documents
             documents = []
+            organic_results = results.get("organic_results", [])[:WEB_SEARCH_NUM_RESULTS]
             
             # Process organic results
-            if "organic_results" in results:
-                for result in results["organic_results"][:WEB_SEARCH_NUM_RESULTS]:
-                    # Extract relevant information
-                    title = result.get("title", "")
-                    snippet = result.get("snippet", "")
-                    link = result.get("link", "")
-                    
-                    # Create document content
-                    content = f"Title: {title}\nSnippet: {snippet}\nSource: {link}"
-                    
-                    # Create metadata
-                    metadata = {
-                        "source": "web_search",
-                        "title": title,
-                        "link": link
-                    }
-                    
-                    # Create document
-                    doc = Document(page_content=content, metadata=metadata)
-                    documents.append(doc)
+            for result in organic_results:
+                # Extract relevant information
+                title = result.get("title", "")
+                snippet = result.get("snippet", "")
+                link = result.get("link", "")
+                
+                # Create metadata
+                metadata = {
+                    "source": "web_search",
+                    "title": title,
+                    "link": link
+                }
+                
+                # Create document
+                doc = Document(page_content=result_content(title, snippet, link), metadata=metadata)
+                documents.append(doc)
             
             print(f"Found {len(documents)} web search results for query: {query}")
+            
+            # Keep the results so repeat queries are answered locally
+            if WEB_CORPUS_ENABLED and organic_results:
+                try:
+                    get_web_corpus().add(query, organic_results)
+                except Exception as e:
+                    print(f"Error adding results to the web corpus: {e}")
+            
             return documents
         
+        except CircuitOpenError:
+            # SERP API is failing; skip web search entirely until the circuit recovers
+            print("Skipping web search: SERP API circuit breaker is open")
+            return []
+        
         except Exception as e:
             print(f"Error during web search: {e}")
             # Provide a fallback document when web search fails
@@ -94,4 +249,48 @@ class WebSearchTool:
                 page_content="Web search encountered an error. Relying on FAQ data only.",
                 metadata={"source": "web_search_fallback"}
             )
-            return [fallback_doc] 
\ No newline at end of file
+            return [fallback_doc] 
+    
+    def start_speculative_search(self, query: str, record: bool = True) -> Optional[Future]:
+        """
+        Start a web search in the background if the speculation budget allows it.
+        
+        Args:
+            query (str): The search query
+            record (bool, optional): Count the query's popularity; off for warm-up replays
+            
+        Returns:
+            Optional[Future]: Future resolving to the search results, or None if over budget
+        """
+        if not self.enabled or not self.api_key or not get_speculation_budget().try_launch():
+            return None
+        return _speculative_executor.submit(self.search_web, query, record=record)
+    
+    def finish_speculative_search(self, future: Future) -> List[Document]:
+        """
+        Wait for a speculative search whose results are needed.
+        
+        Args:
+            future (Future): Future returned by start_speculative_search
+            
+        Returns:
+            List[Document]: The search results
+        """
+        get_speculation_budget().record("used")
+        return future.result()
+    
+    def discard_speculative_search(self, future: Future):
+        """
+        Cancel a speculative search that is no longer needed, or discard its results.
+        
+        Args:
+            future (Future): Future returned by start_speculative_search
+        """
+        if future.cancel():
+            get_speculation_budget().record("cancelled")
+        elif (future.done() and not future.exception() and future.result()
+              and all(doc.metadata.get("from_corpus") for doc in future.result())):
+            # Answered from the local web corpus, so no SERP API call was spent
+            get_speculation_budget().record("cancelled")
+        else:
+            get_speculation_budget().record("wasted")
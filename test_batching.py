@@ -0,0 +1,58 @@
+"""
+Test script checking that the micro-batching scheduler keeps the whole prompt when tokenizing.
+
+The RAG prompt ends with the user's question, and with six FAQ chunks it
+can exceed the local model's 512-token limit. Tokenization must not cut it
+to model_max_length, or the model would answer without seeing the question.
+A small word-level tokenizer is built in memory, so no model is downloaded.
+
+Usage:
+    python test_batching.py
+"""
+from types import SimpleNamespace
+
+from tokenizers import Tokenizer
+from tokenizers.models import WordLevel
+from tokenizers.pre_tokenizers import Whitespace
+from transformers import PreTrainedTokenizerFast
+
+from src.batching import MicroBatchScheduler
+
+
+def word_tokenizer(words, model_max_length: int = 512) -> PreTrainedTokenizerFast:
+    """
+    Build a whitespace word-level tokenizer over a fixed vocabulary.
+
+    Args:
+        words: Words in the vocabulary
+        model_max_length (int, optional): Length the tokenizer would truncate to. Defaults to 512.
+
+    Returns:
+        PreTrainedTokenizerFast: The tokenizer
+    """
+    vocab = {"[PAD]": 0, "[UNK]": 1}
+    for word in words:
+        vocab.setdefault(word, len(vocab))
+    tokenizer = Tokenizer(WordLevel(vocab, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = Whitespace()
+    return PreTrainedTokenizerFast(tokenizer_object=tokenizer, model_max_length=model_max_length,
+                                   pad_token="[PAD]", unk_token="[UNK]")
+
+
+def test_long_prompt_keeps_question():
+    question = "User query : what is zest money RESPONSE :"
+    long_prompt = " ".join(["context"] * 1000) + " " + question
+    tokenizer = word_tokenizer(long_prompt.split())
+    model = SimpleNamespace(config=SimpleNamespace(is_encoder_decoder=True))
+    scheduler = MicroBatchScheduler(model, tokenizer)
+    try:
+        inputs = scheduler._tokenize([long_prompt, question])
+        assert len(inputs["input_ids"][0]) > tokenizer.model_max_length
+        assert tokenizer.decode(inputs["input_ids"][0]).endswith(question)
+    finally:
+        scheduler.shutdown()
+
+
+if __name__ == "__main__":
+    test_long_prompt_keeps_question()
+    print("Batching checks passed")
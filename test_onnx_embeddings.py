@@ -0,0 +1,83 @@
+"""
+Test script to check that the ONNX embedding backends agree with the PyTorch model.
+
+Embeds the FAQ questions and answers with each backend and reports the cosine
+similarity to the PyTorch vectors, plus how often the top-5 FAQ neighbours of
+each question stay the same. Exits with status 1 if any backend falls below
+the minimum cosine.
+
+Usage:
+    python test_onnx_embeddings.py
+    python test_onnx_embeddings.py --backends onnx-int8 --min-cosine 0.98
+"""
+import argparse
+import sys
+
+import numpy as np
+
+from src.data_loader import load_faq_data
+from src.embeddings import get_embeddings_model
+
+
+def neighbour_overlap(reference: np.ndarray, candidate: np.ndarray, queries: int, k: int = 5) -> float:
+    """
+    Fraction of top-k neighbours shared by two embeddings of the same corpus.
+
+    Args:
+        reference (np.ndarray): Reference vectors
+        candidate (np.ndarray): Candidate vectors, aligned with reference
+        queries (int): Number of leading rows used as queries
+        k (int, optional): Neighbours compared per query. Defaults to 5.
+
+    Returns:
+        float: Mean overlap between 0 and 1
+    """
+    overlaps = []
+    for i in range(queries):
+        expected = set(np.argsort(-(reference @ reference[i]))[:k])
+        found = set(np.argsort(-(candidate @ candidate[i]))[:k])
+        overlaps.append(len(expected & found) / k)
+    return float(np.mean(overlaps))
+
+
+def check_onnx_embeddings(backends: list, min_cosine: float) -> bool:
+    """
+    Compare ONNX backends against the PyTorch embeddings.
+
+    Args:
+        backends (list): Backends to check ("onnx", "onnx-int8")
+        min_cosine (float): Lowest acceptable per-text cosine similarity
+
+    Returns:
+        bool: True if every backend passed
+    """
+    df = load_faq_data()
+    questions = df["question"].tolist()
+    texts = questions + df["answer"].tolist()
+    print(f"Embedding {len(texts)} FAQ texts with torch...")
+    reference = np.asarray(get_embeddings_model("torch").embed_documents(texts), dtype=np.float32)
+
+    passed = True
+    for backend in backends:
+        print(f"Embedding {len(texts)} FAQ texts with {backend}...")
+        candidate = np.asarray(get_embeddings_model(backend).embed_documents(texts), dtype=np.float32)
+        cosines = (reference * candidate).sum(axis=1)
+        overlap = neighbour_overlap(reference, candidate, len(questions))
+        ok = cosines.min() >= min_cosine
+        passed = passed and ok
+
+        print(f"\n--- {backend} ---")
+        print(f"Cosine to torch: min={cosines.min():.4f}, mean={cosines.mean():.4f}, p1={np.percentile(cosines, 1):.4f}")
+        print(f"Top-5 neighbour overlap: {overlap:.3f}")
+        print("PASS" if ok else f"FAIL (min cosine below {min_cosine})")
+
+    return passed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check ONNX embeddings against the PyTorch model")
+    parser.add_argument("--backends", nargs="+", default=["onnx", "onnx-int8"], help="ONNX backends to check")
+    parser.add_argument("--min-cosine", type=float, default=0.98, help="Lowest acceptable cosine similarity")
+    args = parser.parse_args()
+
+    sys.exit(0 if check_onnx_embeddings(args.backends, args.min_cosine) else 1)
@@ -0,0 +1,54 @@
+"""
+Test script checking the resilience policy's circuit breaker and overall deadline.
+
+A half-open circuit lets one trial call through. A trial stream that the
+consumer closes early must still settle the breaker, or every later call
+would be rejected. A call that waits for an in-flight slot must give up at
+the policy's overall deadline rather than a full attempt timeout later.
+
+Usage:
+    python test_resilience.py
+"""
+import threading
+import time
+
+from src.resilience import CircuitBreaker, DeadlineExceeded, ResiliencePolicy
+
+
+def test_half_open_stream_closed_early_releases_trial():
+    policy = ResiliencePolicy("test-stream", timeout=5.0)
+    policy.breaker = CircuitBreaker("test-stream", failure_threshold=1, recovery_timeout=0.0)
+    policy.breaker.record_failure()
+
+    stream = policy.stream(lambda: iter(["first", "second", "third"]))
+    assert next(stream) == "first"
+    stream.close()
+
+    assert policy.breaker.stats()["state"] == CircuitBreaker.CLOSED
+    assert policy.breaker.allow_request()
+
+
+def test_slot_wait_counts_against_overall_deadline():
+    policy = ResiliencePolicy("test-deadline", timeout=1.0, total_timeout=1.0, max_in_flight=1)
+    release = threading.Event()
+    blocker = threading.Thread(target=lambda: policy.call(release.wait, 5.0))
+    blocker.start()
+    time.sleep(0.1)
+
+    # The slot frees up at 0.8s; the second call must not then wait another full second
+    threading.Timer(0.8, release.set).start()
+    started = time.monotonic()
+    try:
+        policy.call(time.sleep, 2.0)
+    except DeadlineExceeded:
+        pass
+    elapsed = time.monotonic() - started
+    blocker.join()
+
+    assert elapsed < 1.3, f"call ran {elapsed:.2f}s past a 1s overall deadline"
+
+
+if __name__ == "__main__":
+    test_half_open_stream_closed_early_releases_trial()
+    test_slot_wait_counts_against_overall_deadline()
+    print("Resilience checks passed")
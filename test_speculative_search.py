@@ -0,0 +1,81 @@
+"""
+Test script checking that speculative web searches only reach the prompt when FAQ retrieval falls short.
+
+A query without FAQ terms starts a web search alongside FAQ retrieval. If
+retrieval still finds enough chunks, the search must be cancelled or
+discarded and charged to the speculation budget, and no web results may
+appear in the context. Retrieval and web search are stubbed, so no model,
+index or SERP API key is needed.
+
+Usage:
+    python test_speculative_search.py
+"""
+from types import SimpleNamespace
+
+from langchain_core.documents import Document
+
+from src.rag_chain import RAGChain
+from src.web_search import WebSearchTool, get_speculation_budget
+
+
+class StubWebSearch(WebSearchTool):
+    """
+    Web search tool with the real speculation handling and a canned search.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.api_key = "test"
+        self.calls = 0
+
+    def search_web(self, query: str, refresh: bool = False, record: bool = True):
+        self.calls += 1
+        return [Document(page_content="web result", metadata={"source": "web"})]
+
+
+def stub_chain(num_chunks: int) -> SimpleNamespace:
+    """
+    Build the attributes _get_context needs, with retrieval returning num_chunks chunks.
+
+    Args:
+        num_chunks (int): Number of chunk ids FAQ retrieval returns
+
+    Returns:
+        SimpleNamespace: Stand-in for a RAGChain
+    """
+    return SimpleNamespace(
+        use_web_search=True,
+        web_search=StubWebSearch(),
+        _likely_needs_web_search=lambda query: True,
+        _hybrid_search=lambda query, **kwargs: list(range(num_chunks)),
+        chunk_store=SimpleNamespace(documents=lambda ids: [Document(page_content=f"faq {i}") for i in ids])
+    )
+
+
+def test_sufficient_retrieval_discards_speculation():
+    chain = stub_chain(6)
+    before = get_speculation_budget().stats()
+    context = RAGChain._get_context(chain, "weather in delhi today")
+    after = get_speculation_budget().stats()
+
+    assert "web search results" not in context
+    assert after["launched"] == before["launched"] + 1
+    assert after["used"] == before["used"]
+    assert after["wasted"] + after["cancelled"] == before["wasted"] + before["cancelled"] + 1
+
+
+def test_short_retrieval_uses_speculation():
+    chain = stub_chain(2)
+    before = get_speculation_budget().stats()
+    context = RAGChain._get_context(chain, "weather in delhi today")
+    after = get_speculation_budget().stats()
+
+    assert "Found 1 web search results" in context
+    assert chain.web_search.calls == 1
+    assert after["used"] == before["used"] + 1
+
+
+if __name__ == "__main__":
+    test_sufficient_retrieval_discards_speculation()
+    test_short_retrieval_uses_speculation()
+    print("Speculative search checks passed")